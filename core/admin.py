@@ -9,7 +9,7 @@ from django.utils import timezone
 from import_export.admin import ImportExportModelAdmin
 from .models import (
     SiteSettings, ContactMessage, NewsletterSubscriber,
-    Testimonial, Partner, FAQ, Page, SiteFeature
+    Testimonial, Partner, FAQ, Page, SiteFeature, SlowQuery
 )
 
 # =========================
@@ -382,4 +382,22 @@ class SiteFeatureAdmin(ImportExportModelAdmin):
         )
     icon_display.short_description = 'الأيقونة'
     
-    actions = [activate_items, deactivate_items]
\ No newline at end of file
+    actions = [activate_items, deactivate_items]
+
+
+# =========================
+# SLOW QUERIES ADMIN
+# =========================
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['duration_ms', 'function', 'call_site', 'view', 'created_at']
+    list_filter = ['view', 'created_at']
+    search_fields = ['fingerprint', 'function', 'call_site', 'view']
+    date_hierarchy = 'created_at'
+    readonly_fields = [
+        'fingerprint_hash', 'fingerprint', 'params', 'duration_ms',
+        'view', 'call_site', 'function', 'created_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = 'الموقع الأساسي'
\ No newline at end of file
+    verbose_name = 'الموقع الأساسي'
+
+    def ready(self):
+        from .signals import connect_page_cache_signals
+        connect_page_cache_signals()
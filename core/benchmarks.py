@@ -0,0 +1,248 @@
+"""
+قياس أداء الصفحات والـ endpoints الأساسية عبر Django test client
+
+لكل endpoint يُقاس: زمن الاستجابة (الوسيط)، عدد الاستعلامات، وأقصى ذاكرة
+مخصصة أثناء الطلب (tracemalloc). النتائج تُقارن بملف baseline بصيغة JSON
+ويُعتبر التغيير تراجعاً إذا تجاوز نسبة السماح.
+
+يُفترض تشغيله على بيانات مولدة (python manage.py seed_scale_data) ويُنفذ
+داخل transaction يتم التراجع عنها في النهاية، فلا تبقى الطلبات أو السلة
+أو التقييمات التي تنشئها الاختبارات في قاعدة البيانات. الكاش أثناء القياس
+LocMemCache خاص (BENCHMARK_CACHES)، فمسحه قبل كل طلب لا يمس كاش الموقع.
+"""
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .instrumentation import record_queries
+
+# role: anonymous / student / instructor / staff
+Endpoint = namedtuple('Endpoint', ['name', 'role', 'method', 'url', 'data', 'ajax'])
+Endpoint.__new__.__defaults__ = ('GET', None, None, False)
+
+AJAX_HEADERS = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+# كاش مستقل للقياس: cache.clear() في measure() لا يمسح كاش الموقع المشترك (Redis مثلاً)
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmarks',
+    },
+}
+
+
+class BenchmarkSetupError(Exception):
+    """لا توجد بيانات كافية لتشغيل الاختبارات"""
+
+
+def build_fixtures():
+    """اختيار البيانات المستخدمة في الطلبات من قاعدة البيانات الحالية"""
+    from courses.models import Course, Enrollment, Lesson, User
+    from notifications.models import Notification
+
+    course = (
+        Course.objects.filter(is_active=True, modules__lessons__isnull=False)
+        .order_by('-students_count', 'pk').first()
+    )
+    if course is None:
+        raise BenchmarkSetupError('لا توجد دورات نشطة بها دروس، شغّل seed_scale_data أولاً')
+    enrollment = (
+        Enrollment.objects.filter(course=course, status='enrolled')
+        .select_related('user').order_by('pk').first()
+    )
+    if enrollment is None:
+        raise BenchmarkSetupError(f'لا يوجد طالب مسجل في الدورة "{course.slug}"')
+    staff = User.objects.filter(is_staff=True, is_active=True).order_by('pk').first()
+    if staff is None:
+        raise BenchmarkSetupError('لا يوجد مستخدم staff')
+
+    paid_course = (
+        Course.objects.filter(is_active=True, price__gt=0)
+        .exclude(enrollments__user=enrollment.user).order_by('-students_count', 'pk').first()
+    )
+    notification = Notification.objects.filter(user=enrollment.user).order_by('created_at').first()
+    return {
+        'course': course,
+        'lesson': Lesson.objects.filter(module__course=course).order_by('module__order', 'order').first(),
+        'student': enrollment.user,
+        'instructor': course.instructor,
+        'staff': staff,
+        'paid_course': paid_course or course,
+        'category': course.category,
+        'notification': notification,
+    }
+
+
+def build_endpoints(fx):
+    """قائمة الـ endpoints المقاسة"""
+    course, lesson = fx['course'], fx['lesson']
+    endpoints = [
+        # صفحات عامة
+        Endpoint('home', 'anonymous', url=reverse('core:home')),
+        Endpoint('course_list', 'anonymous', url=reverse('courses:course_list')),
+        Endpoint('course_list_filtered', 'anonymous', url=reverse('courses:course_list'), data={
+            'category': fx['category'].slug, 'level': 'beginner', 'sort': '-rating', 'price_max': '500',
+        }),
+        Endpoint('course_list_search', 'anonymous', url=reverse('courses:course_list'), data={'search': 'بايثون'}),
+        Endpoint('course_detail', 'anonymous', url=reverse('courses:course_detail', args=[course.slug])),
+        Endpoint('course_detail_student', 'student', url=reverse('courses:course_detail', args=[course.slug])),
+        Endpoint('instructor_profile', 'anonymous', url=reverse('courses:instructor_profile', args=[fx['instructor'].pk])),
+        Endpoint('search', 'anonymous', url=reverse('core:search'), data={'q': 'تطوير'}),
+
+        # التعلم
+        Endpoint('course_learn', 'student', url=reverse('courses:course_learn', args=[course.slug])),
+        Endpoint('lesson_view', 'student', url=reverse('courses:lesson_view', args=[course.slug, lesson.pk])),
+
+        # لوحات التحكم
+        Endpoint('user_dashboard', 'student', url=reverse('courses:user_dashboard')),
+        Endpoint('instructor_dashboard', 'instructor', url=reverse('courses:instructor_dashboard')),
+        Endpoint('admin_dashboard', 'staff', url=reverse('courses:admin_dashboard')),
+        Endpoint('admin_reports', 'staff', url=reverse('courses:admin_reports')),
+
+        # AJAX
+        Endpoint('ajax_course_stats', 'student', url=reverse('courses:ajax_get_course_stats', args=[course.pk]), ajax=True),
+        Endpoint('ajax_dashboard_stats', 'staff', url=reverse('courses:ajax_dashboard_stats'), ajax=True),
+        Endpoint('ajax_chart_data', 'staff', url=reverse('courses:ajax_chart_data'), data={'type': 'users'}, ajax=True),
+        Endpoint('ajax_recent_activities', 'staff', url=reverse('courses:ajax_recent_activities'), ajax=True),
+        Endpoint('ajax_toggle_favorite', 'student', 'POST', reverse('courses:ajax_toggle_favorite'), {'course_id': course.pk}, True),
+        Endpoint('ajax_lesson_progress', 'student', 'POST', reverse('courses:ajax_update_lesson_progress'), {'lesson_id': lesson.pk, 'position': 120}, True),
+
+        # السلة والطلبات
+        Endpoint('cart_add', 'student', 'POST', reverse('courses:add_to_cart', args=[fx['paid_course'].pk]), ajax=True),
+        Endpoint('cart_view', 'student', url=reverse('courses:cart_view')),
+        Endpoint('submit_order', 'student', 'POST', reverse('courses:submit_order')),
+        Endpoint('order_history', 'student', url=reverse('courses:order_history')),
+
+        # الإشعارات
+        Endpoint('notifications', 'student', url=reverse('notifications:notifications')),
+        Endpoint('notifications_count', 'student', url=reverse('notifications:notifications_count'), ajax=True),
+    ]
+    if fx['notification'] is not None:
+        endpoints.append(Endpoint(
+            'notification_read', 'student', 'POST',
+            reverse('notifications:mark_notification_read', args=[fx['notification'].pk]), ajax=True,
+        ))
+    return endpoints
+
+
+def _request(client, endpoint):
+    send = client.post if endpoint.method == 'POST' else client.get
+    extra = AJAX_HEADERS if endpoint.ajax else {}
+    return send(endpoint.url, endpoint.data or {}, **extra)
+
+
+def measure(client, endpoint, repeat):
+    """
+    قياس endpoint واحد: طلب تمهيدي ثم repeat طلبات للزمن والاستعلامات ثم طلب للذاكرة.
+    الكاش (BENCHMARK_CACHES) يُمسح قبل كل طلب حتى يُقاس العرض الفعلي وليس نسخة page cache،
+    والزمن هو أقل قيمة (أقل تأثراً بضوضاء الجهاز من الوسيط).
+    """
+    cache.clear()
+    response = _request(client, endpoint)
+    timings, queries = [], []
+    for _ in range(repeat):
+        cache.clear()
+        with record_queries() as recorder:
+            started = time.perf_counter()
+            response = _request(client, endpoint)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(recorder.count)
+
+    cache.clear()
+    tracemalloc.start()
+    try:
+        _request(client, endpoint)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'time_ms': round(min(timings), 2),
+        'queries': int(statistics.median(queries)),
+        'memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(repeat=5, only=None):
+    """تشغيل كل القياسات داخل transaction يتم التراجع عنها"""
+    # سطر لكل طلب من QueryInstrumentationMiddleware لا فائدة منه هنا
+    instrumentation_logger = logging.getLogger('core.instrumentation')
+    previous_level = instrumentation_logger.level
+    instrumentation_logger.setLevel(logging.ERROR)
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            return _run(repeat, only)
+    finally:
+        instrumentation_logger.setLevel(previous_level)
+
+
+def _run(repeat, only):
+    results = {}
+    with transaction.atomic():
+        fixtures = build_fixtures()
+        clients = {'anonymous': Client()}
+        for role in ('student', 'instructor', 'staff'):
+            clients[role] = Client()
+            clients[role].force_login(fixtures[role])
+
+        for endpoint in build_endpoints(fixtures):
+            if only and endpoint.name not in only:
+                continue
+            results[endpoint.name] = measure(clients[endpoint.role], endpoint, repeat)
+        transaction.set_rollback(True)
+    return results
+
+
+# ==================== المقارنة مع الـ baseline ====================
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('endpoints', {})
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results, meta=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta or {}, 'endpoints': results}, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.25, query_slack=0, time_floor_ms=5,
+            memory_floor_kb=32, queries_only=False):
+    """
+    قائمة التراجعات مقارنة بالـ baseline.
+    الزمن والذاكرة نسبيان (مع حد أدنى مطلق لكل منهما لتجنب ضوضاء الطلبات الصغيرة)،
+    وعدد الاستعلامات مطلق (أي استعلام إضافي يعتبر تراجعاً افتراضياً).
+    queries_only: الحالة وعدد الاستعلامات فقط، لـ baseline مسجل على جهاز آخر
+    (الزمن والذاكرة يختلفان بين الأجهزة، والاستعلامات ثابتة لنفس البيانات).
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['status'] != previous['status']:
+            regressions.append(f"{name}: status {previous['status']} -> {current['status']}")
+        if current['queries'] > previous['queries'] + query_slack:
+            regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+        if queries_only:
+            continue
+        time_limit = max(previous['time_ms'] * (1 + time_tolerance), previous['time_ms'] + time_floor_ms)
+        if current['time_ms'] > time_limit:
+            regressions.append(f"{name}: time {previous['time_ms']}ms -> {current['time_ms']}ms")
+        memory_limit = max(previous['memory_kb'] * (1 + memory_tolerance), previous['memory_kb'] + memory_floor_kb)
+        if current['memory_kb'] > memory_limit:
+            regressions.append(f"{name}: memory {previous['memory_kb']}KB -> {current['memory_kb']}KB")
+    return regressions
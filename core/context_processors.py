@@ -280,4 +280,15 @@ def is_mobile(request):
     return {
         'is_mobile': is_mobile,
         'is_tablet': 'ipad' in user_agent or 'tablet' in user_agent,
-    }
\ No newline at end of file
+    }
+
+
+def site_content_version(request):
+    """
+    Context processor لإصدار محتوى الموقع (مفتاح أجزاء الرأس والتذييل المخزنة)
+    """
+    from .page_cache import get_site_content_version
+    return {
+        'site_content_version': get_site_content_version(),
+        'site_content_timeout': settings.SITE_CONTENT_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,122 @@
+"""
+توجيه قراءات التقارير والتحليلات إلى قاعدة بيانات replica
+
+- الـ views المعلّمة بـ @use_replica (أو الكود داخل read_from_replica())
+  تقرأ من الاتصال 'replica' إذا كان معرّفاً في DATABASES، وإلا من default.
+- الكتابة دائماً على default.
+- read-your-writes: بعد أي طلب كتابة (POST/PUT/PATCH/DELETE) يُضبط cookie
+  لمدة REPLICA_STICKY_SECONDS تبقى خلالها كل قراءات المستخدم على default
+  حتى لا يرى بيانات قديمة بسبب تأخر النسخ.
+- الجلسات و contenttypes تُقرأ دائماً من default.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+REPLICA_ALIAS = 'replica'
+STICKY_COOKIE = 'db_primary'
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+# تطبيقات يجب أن تُقرأ من default دائماً (الجلسة قد تكون أُنشئت للتو)
+PRIMARY_ONLY_APPS = {'sessions', 'contenttypes'}
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def is_sticky(request):
+    """المستخدم كتب مؤخراً ويجب أن يقرأ من default"""
+    return STICKY_COOKIE in request.COOKIES
+
+
+class ReplicaRouter:
+    """يوجه القراءات إلى replica فقط داخل سياق use_replica"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+            and replica_configured()
+        ):
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica نسخة من default، فالعلاقات بينهما صحيحة
+        if {obj1._state.db, obj2._state.db} <= {'default', REPLICA_ALIAS}:
+            return True
+        return None
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """تنفيذ القراءات داخل الكتلة على replica"""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def use_replica(view_func):
+    """
+    Decorator للـ views التحليلية (قراءة فقط).
+    يوضع أقرب ما يمكن للدالة (بعد staff_member_required / login_required)
+    حتى يُقرأ المستخدم نفسه من default.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            with read_from_replica(not is_sticky(request)):
+                return await view_func(request, *args, **kwargs)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with read_from_replica(not is_sticky(request)):
+                return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+# ==================== Middleware ====================
+
+class ReplicaStickinessMiddleware:
+    """ضبط cookie الـ read-your-writes بعد طلبات الكتابة (sync و async)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.set_sticky_cookie(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.set_sticky_cookie(request, await self.get_response(request))
+
+    def set_sticky_cookie(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
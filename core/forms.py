@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import *
+from .images import validate_image_dimensions
 from .models import ContactMessage, NewsletterSubscriber, Testimonial
 from django import forms
 from django.contrib.auth.forms import *
@@ -152,6 +153,16 @@ class TestimonialForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['rating'].choices = [(i, f'{i} نجوم') for i in range(1, 6)]
 
+    def clean_avatar(self):
+        avatar = self.cleaned_data.get('avatar')
+        validate_image_dimensions(avatar)
+        return avatar
+
+    def clean_company_logo(self):
+        company_logo = self.cleaned_data.get('company_logo')
+        validate_image_dimensions(company_logo)
+        return company_logo
+
 
 class SearchForm(forms.Form):
     """نموذج البحث"""
@@ -0,0 +1,263 @@
+"""
+خط معالجة الصور المرفوعة
+
+يولّد لكل صورة مرفوعة نسخاً بمقاسات ثابتة (thumbnail / card / hero) بصيغتي
+WebP و JPEG، بأسماء مشتقة من بصمة المحتوى (content hash) حتى يمكن تخزينها
+في المتصفح لمدة طويلة، مع حذف البيانات الوصفية (EXIF) ورفض الصور الضخمة.
+
+التوليد يتم خارج الطلبات عبر python manage.py process_images (--loop كعامل
+دائم)، والقوالب تقرأ الـ manifest فقط (prefetch_manifests لصور الصفحة دفعة واحدة).
+"""
+import hashlib
+import io
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# الإعدادات
+# =========================
+
+# مقاسات النسخ لكل نوع صورة (العرض، الارتفاع، طريقة القص)
+# cover: قص وتوسيط لملء المقاس بالكامل - contain: تصغير داخل المقاس بدون قص
+IMAGE_PROFILES = getattr(settings, 'IMAGE_PROFILES', {
+    'cover': {
+        'thumbnail': (320, 180, 'cover'),
+        'card': (640, 360, 'cover'),
+        'hero': (1280, 720, 'cover'),
+    },
+    'square': {
+        'thumbnail': (64, 64, 'cover'),
+        'card': (160, 160, 'cover'),
+        'hero': (400, 400, 'cover'),
+    },
+    'logo': {
+        'thumbnail': (160, 80, 'contain'),
+        'card': (320, 160, 'contain'),
+        'hero': (640, 320, 'contain'),
+    },
+})
+
+# الحقول التي تمر عبر خط المعالجة: {'app.Model': {'field': 'profile'}}
+IMAGE_FIELDS = getattr(settings, 'IMAGE_FIELDS', {
+    'courses.Course': {'image': 'cover'},
+    'courses.Category': {'img_gat': 'cover'},
+    'courses.User': {'avatar': 'square'},
+    'core.Testimonial': {'avatar': 'square', 'company_logo': 'logo'},
+    'core.Partner': {'logo': 'logo'},
+    'core.SiteSettings': {'site_logo': 'logo', 'site_logo_white': 'logo', 'site_og_image': 'cover'},
+    'core.Page': {'featured_image': 'cover'},
+})
+
+IMAGE_FORMATS = ('webp', 'jpeg')
+IMAGE_QUALITY = getattr(settings, 'IMAGE_QUALITY', {'webp': 80, 'jpeg': 82})
+IMAGE_MAX_INPUT_PIXELS = getattr(settings, 'IMAGE_MAX_INPUT_PIXELS', 40_000_000)
+IMAGE_MAX_INPUT_DIMENSION = getattr(settings, 'IMAGE_MAX_INPUT_DIMENSION', 8000)
+IMAGE_DERIVATIVES_DIR = getattr(settings, 'IMAGE_DERIVATIVES_DIR', 'derivatives')
+
+MANIFEST_CACHE_TIMEOUT = 60 * 60 * 24
+MISSING_CACHE_TIMEOUT = 60 * 5
+
+
+class ImageTooLarge(ValueError):
+    """أبعاد الصورة المرفوعة تتجاوز الحد المسموح"""
+
+
+# =========================
+# التحقق من الأبعاد
+# =========================
+
+def check_dimensions(width, height):
+    """رفع ImageTooLarge إذا تجاوزت الأبعاد الحد المسموح"""
+    if (
+        width * height > IMAGE_MAX_INPUT_PIXELS
+        or max(width, height) > IMAGE_MAX_INPUT_DIMENSION
+    ):
+        raise ImageTooLarge(f'{width}x{height}')
+
+
+def validate_image_dimensions(uploaded):
+    """مُتحقق للنماذج: رفض الصور التي تتجاوز الأبعاد المسموحة"""
+    image = getattr(uploaded, 'image', None)
+    if image is None:
+        return
+    try:
+        check_dimensions(*image.size)
+    except ImageTooLarge:
+        raise ValidationError(
+            'أبعاد الصورة كبيرة جداً (الحد الأقصى %(max)s بكسل لكل بُعد)',
+            params={'max': IMAGE_MAX_INPUT_DIMENSION},
+        )
+
+
+# =========================
+# توليد النسخ
+# =========================
+
+def _resize(image, width, height, mode):
+    if mode == 'cover':
+        return ImageOps.fit(image, (width, height), method=Image.LANCZOS)
+    copy = image.copy()
+    copy.thumbnail((width, height), Image.LANCZOS)
+    return copy
+
+
+def _encode(image, fmt):
+    """حفظ الصورة بدون أي بيانات وصفية (EXIF/ICC)"""
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=IMAGE_QUALITY['jpeg'], optimize=True, progressive=True)
+    else:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+        image.save(buffer, 'WEBP', quality=IMAGE_QUALITY['webp'], method=4)
+    return buffer.getvalue()
+
+
+def derivative_name(content_hash, profile, variant, fmt):
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    return f'{IMAGE_DERIVATIVES_DIR}/{content_hash[:2]}/{content_hash}_{profile}_{variant}.{ext}'
+
+
+def generate_derivatives(name, profile, storage=None):
+    """
+    توليد جميع النسخ لصورة مخزنة وإرجاع الـ manifest الخاص بها.
+    لا تتعامل مع قاعدة البيانات حتى يمكن تشغيلها داخل process pool.
+    """
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as source:
+        data = source.read()
+    content_hash = hashlib.sha256(data).hexdigest()[:20]
+
+    # Image.open يقرأ الترويسة فقط: فحص الأبعاد قبل فك الصورة (حماية من "قنابل الضغط")
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as exc:
+        raise ImageTooLarge(str(exc))
+    check_dimensions(*image.size)
+
+    variants = IMAGE_PROFILES[profile]
+    largest = max(variants.values(), key=lambda v: v[0] * v[1])
+    # تسريع فك JPEG الكبيرة بفكها مباشرة بدقة أقل
+    image.draft('RGB', (largest[0], largest[1]))
+    image = ImageOps.exif_transpose(image)
+    image.load()
+
+    manifest = {
+        'hash': content_hash,
+        'profile': profile,
+        'width': image.width,
+        'height': image.height,
+        'variants': {},
+    }
+    for variant, (width, height, mode) in variants.items():
+        resized = _resize(image, width, height, mode)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt in IMAGE_FORMATS:
+            target = derivative_name(content_hash, profile, variant, fmt)
+            # الأسماء مشتقة من المحتوى: وجود الملف يعني أنه مطابق
+            if not storage.exists(target):
+                storage.save(target, ContentFile(_encode(resized, fmt)))
+            entry[fmt] = target
+        manifest['variants'][variant] = entry
+    return manifest
+
+
+# =========================
+# الـ manifest والتخزين المؤقت
+# =========================
+
+def _cache_key(name):
+    return 'img:' + hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+def save_manifest(name, profile, manifest):
+    """حفظ الـ manifest في قاعدة البيانات والكاش"""
+    ResponsiveImage = apps.get_model('core', 'ResponsiveImage')
+    ResponsiveImage.objects.update_or_create(
+        source=name,
+        defaults={
+            'profile': profile,
+            'content_hash': manifest['hash'],
+            'width': manifest['width'],
+            'height': manifest['height'],
+            'variants': manifest['variants'],
+        },
+    )
+    cache.set(_cache_key(name), manifest, MANIFEST_CACHE_TIMEOUT)
+
+
+def _row_manifest(row):
+    return {
+        'hash': row.content_hash,
+        'profile': row.profile,
+        'width': row.width,
+        'height': row.height,
+        'variants': row.variants,
+    }
+
+
+def get_manifest(name):
+    """جلب الـ manifest لصورة (من الكاش أولاً ثم قاعدة البيانات)"""
+    if not name:
+        return None
+    key = _cache_key(name)
+    manifest = cache.get(key)
+    if manifest is None:
+        ResponsiveImage = apps.get_model('core', 'ResponsiveImage')
+        row = ResponsiveImage.objects.filter(source=name).first()
+        if row is None:
+            # تخزين النتيجة السلبية لفترة قصيرة لتجنب الاستعلام مع كل عرض
+            cache.set(key, {}, MISSING_CACHE_TIMEOUT)
+            return None
+        manifest = _row_manifest(row)
+        cache.set(key, manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest or None
+
+
+def prefetch_manifests(images):
+    """
+    تحميل manifests صور الصفحة إلى الكاش دفعة واحدة (get_many واستعلام واحد
+    لما ليس في الكاش) بدلاً من استعلام لكل وسم في القالب.
+    images: FieldFile أو أسماء ملفات (القيم الفارغة تُتجاهل)
+    """
+    keys = {}
+    for image in images:
+        name = getattr(image, 'name', image)
+        if name:
+            keys[_cache_key(name)] = name
+    if not keys:
+        return
+    cached = cache.get_many(list(keys))
+    missing = [name for key, name in keys.items() if key not in cached]
+    if not missing:
+        return
+
+    ResponsiveImage = apps.get_model('core', 'ResponsiveImage')
+    found = {row.source: _row_manifest(row) for row in ResponsiveImage.objects.filter(source__in=missing)}
+    cache.set_many({_cache_key(name): manifest for name, manifest in found.items()}, MANIFEST_CACHE_TIMEOUT)
+    cache.set_many({_cache_key(name): {} for name in missing if name not in found}, MISSING_CACHE_TIMEOUT)
+
+
+def iter_image_fields():
+    """إرجاع (model, field_name, profile) لكل الحقول المسجلة"""
+    for label, fields in IMAGE_FIELDS.items():
+        model = apps.get_model(label)
+        for field_name, profile in fields.items():
+            yield model, field_name, profile
@@ -0,0 +1,245 @@
+"""
+قياس استعلامات قاعدة البيانات لكل طلب واكتشاف أنماط N+1
+
+يعتمد على connection.execute_wrapper: كل استعلام يمر عبر QueryRecorder الذي
+يسجل زمنه وبصمته (SQL بعد استبدال القيم بـ ?) ومكان استدعائه في كود المشروع.
+إذا تكررت نفس البصمة من نفس المكان أكثر من N_PLUS_ONE_THRESHOLD مرة تُعتبر
+حلقة N+1.
+
+النتائج:
+- ترويسات X-DB-* في الاستجابة للمستخدمين من فريق العمل (staff)
+- سطر log منظم عبر logger "core.instrumentation"
+- assert_max_queries(url_name, n) للاستخدام في الاختبارات و CI
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+
+_PROJECT_ROOT = str(settings.BASE_DIR) + os.sep
+_IGNORED_PATHS = (
+    os.sep + 'site-packages' + os.sep,
+    os.sep + 'dist-packages' + os.sep,
+    # إطارات أدوات القياس نفسها (هذا الملف و slow_queries.py)
+    os.path.join(os.path.dirname(__file__), 'instrumentation.py'),
+    os.path.join(os.path.dirname(__file__), 'slow_queries.py'),
+)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """توحيد نص الاستعلام بحيث تتطابق الاستعلامات التي تختلف في القيم فقط"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+def project_frame(depth=2):
+    """
+    أول إطار في كود المشروع (خارج Django والمكتبات).
+    يرجع (الملف:السطر، اسم الدالة).
+    """
+    frame = sys._getframe(depth)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(_PROJECT_ROOT) and not any(part in filename for part in _IGNORED_PATHS):
+            return f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_lineno}', code.co_name
+        frame = frame.f_back
+    return '?', ''
+
+
+class QueryRecorder:
+    """execute_wrapper يسجل كل استعلام: الزمن والبصمة ومكان الاستدعاء"""
+
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.call_sites = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            normalized = fingerprint(sql)
+            self.fingerprints[normalized] += 1
+            self.call_sites[(normalized, project_frame()[0])] += 1
+
+    @property
+    def duplicates(self):
+        """عدد الاستعلامات المكررة (نفس البصمة)"""
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    @property
+    def n_plus_one(self):
+        """[(call_site, count, sql)] للبصمات المتكررة من نفس المكان أكثر من الحد"""
+        return sorted(
+            ((site, count, sql) for (sql, site), count in self.call_sites.items() if count > self.threshold),
+            key=lambda item: -item[1],
+        )
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'db_time_ms': round(self.duration * 1000, 2),
+            'duplicates': self.duplicates,
+            'n_plus_one': [
+                {'site': site, 'count': count, 'sql': sql[:200]}
+                for site, count, sql in self.n_plus_one
+            ],
+        }
+
+
+# ==================== wrappers على مستوى السياق ====================
+# الاتصالات محلية لكل thread، وفي ASGI تُنفذ الاستعلامات في thread آخر
+# (sync_to_async). لذلك يُركب على كل اتصال dispatcher واحد يقرأ الـ wrappers
+# النشطة من ContextVar الذي ينتقل مع sync_to_async و async_to_sync.
+
+_active_wrappers = ContextVar('query_wrappers', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    for wrapper in reversed(_active_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatcher(sender=None, connection=None, **kwargs):
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch)
+
+
+connection_created.connect(install_dispatcher, dispatch_uid='core.instrumentation.install_dispatcher')
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """مثل connection.execute_wrapper لكل الاتصالات في السياق الحالي (يشمل threads الـ sync_to_async)"""
+    for connection in connections.all():
+        install_dispatcher(connection=connection)
+    token = _active_wrappers.set(_active_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _active_wrappers.reset(token)
+
+
+@contextmanager
+def record_queries(threshold=N_PLUS_ONE_THRESHOLD):
+    """تسجيل استعلامات كل اتصالات قاعدة البيانات داخل الكتلة"""
+    recorder = QueryRecorder(threshold)
+    with execute_wrapper(recorder):
+        yield recorder
+
+
+# ==================== Middleware ====================
+
+class QueryInstrumentationMiddleware:
+    """
+    قياس استعلامات كل طلب (sync و async).
+    يُفعّل عبر QUERY_INSTRUMENTATION (افتراضياً في وضع DEBUG فقط).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        return self.process_summary(request, response, recorder.summary())
+
+    async def __acall__(self, request):
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        return self.process_summary(request, response, recorder.summary())
+
+    def process_summary(self, request, response, summary):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['X-DB-Queries'] = str(summary['queries'])
+            response['X-DB-Time-Ms'] = str(summary['db_time_ms'])
+            response['X-DB-Duplicates'] = str(summary['duplicates'])
+            if summary['n_plus_one']:
+                worst = summary['n_plus_one'][0]
+                response['X-DB-N-Plus-One'] = f"{len(summary['n_plus_one'])}; {worst['site']} x{worst['count']}"
+
+        level = logging.WARNING if summary['n_plus_one'] else logging.INFO
+        logger.log(
+            level,
+            'db_queries method=%s path=%s status=%s queries=%d db_time_ms=%.2f duplicates=%d n_plus_one=%d',
+            request.method, request.path, response.status_code,
+            summary['queries'], summary['db_time_ms'], summary['duplicates'], len(summary['n_plus_one']),
+            extra={'db': summary, 'path': request.path},
+        )
+        return response
+
+
+# ==================== الاختبارات ====================
+
+def assert_max_queries(url_name, n, client=None, args=None, kwargs=None, user=None, data=None,
+                       headers=None, allow_n_plus_one=False):
+    """
+    التأكد من أن صفحة لا تتجاوز n استعلاماً ولا تحتوي على حلقات N+1.
+
+        assert_max_queries('courses:course_list', 20)
+        assert_max_queries('courses:user_dashboard', 30, user=student)
+        assert_max_queries('core:search', 15, data={'q': 'بايثون'})
+        assert_max_queries('courses:ajax_dashboard_stats', 5, user=student,
+                           headers={'X-Requested-With': 'XMLHttpRequest'})
+    """
+    if client is None:
+        from django.test import Client
+        client = Client()
+    if user is not None:
+        client.force_login(user)
+    url = reverse(url_name, args=args, kwargs=kwargs)
+
+    with record_queries() as recorder:
+        response = client.get(url, data, headers=headers)
+
+    problems = []
+    if recorder.count > n:
+        problems.append(f'{recorder.count} queries (budget {n})')
+    if recorder.n_plus_one and not allow_n_plus_one:
+        problems.extend(
+            f'N+1 at {site}: {count}x {sql[:120]}'
+            for site, count, sql in recorder.n_plus_one
+        )
+    if problems:
+        raise AssertionError(f'{url_name} ({url}): ' + '; '.join(problems))
+    return response
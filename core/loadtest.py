@@ -0,0 +1,247 @@
+"""
+اختبار حمل عبر HTTP حقيقي (مستخدمون افتراضيون متزامنون)
+
+كل مستخدم افتراضي thread مستقل بـ cookies خاصة به ينفذ رحلات مستخدم
+موزونة (تصفح الكتالوج، أو تصفح ← تسجيل دخول ← تسجيل في دورة ← تعلم ←
+heartbeat للتقدم ← الإشعارات) ضد سيرفر يعمل فعلياً، وتُجمع الإحصائيات
+لكل اسم URL: عدد الطلبات، الأخطاء، و p50/p95/p99.
+
+بيانات الرحلات (الدورات، المستخدمون وتسجيلاتهم) تُقرأ مسبقاً من قاعدة
+البيانات المحلية، لذا يجب أن يعمل السيرفر المختبر على نفس قاعدة البيانات
+(python manage.py seed_scale_data).
+"""
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.urls import reverse
+
+from .slow_queries import percentile
+
+
+# ==================== الإحصائيات ====================
+
+class LoadStats:
+    """تجميع أزمنة الاستجابة لكل اسم URL (آمن بين الـ threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, name, duration_ms, error=None):
+        with self._lock:
+            self.samples.setdefault(name, []).append(duration_ms)
+            if error:
+                self.errors.setdefault(name, {})
+                self.errors[name][error] = self.errors[name].get(error, 0) + 1
+
+    def summary(self, elapsed):
+        """صف لكل URL + صف إجمالي باسم total"""
+        rows = []
+        all_durations = []
+        total_errors = 0
+        for name in sorted(self.samples):
+            durations = sorted(self.samples[name])
+            errors = sum(self.errors.get(name, {}).values())
+            all_durations.extend(durations)
+            total_errors += errors
+            rows.append(self._row(name, durations, errors, elapsed))
+        rows.append(self._row('total', sorted(all_durations), total_errors, elapsed))
+        return rows
+
+    @staticmethod
+    def _row(name, durations, errors, elapsed):
+        count = len(durations)
+        return {
+            'name': name,
+            'count': count,
+            'rps': round(count / elapsed, 2) if elapsed else 0,
+            'errors': errors,
+            'error_rate': round(errors / count * 100, 2) if count else 0,
+            'p50': round(percentile(durations, 0.50), 1),
+            'p95': round(percentile(durations, 0.95), 1),
+            'p99': round(percentile(durations, 0.99), 1),
+            'max': round(durations[-1], 1) if durations else 0,
+        }
+
+
+# ==================== المستخدم الافتراضي ====================
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """عدم اتباع التحويلات حتى يُقاس كل طلب منفصلاً"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class _InsecureCookiePolicy(http.cookiejar.DefaultCookiePolicy):
+    """إرسال cookies الـ Secure عبر HTTP (السيرفر المحلي خلف X-Forwarded-Proto)"""
+
+    def return_ok_secure(self, cookie, request):
+        return True
+
+
+class VirtualUser:
+    """عميل HTTP بجلسة مستقلة يسجل زمن كل طلب في LoadStats"""
+
+    def __init__(self, base_url, stats, host=None, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar(policy=_InsecureCookiePolicy())
+        self.opener = urllib.request.build_opener(
+            _NoRedirect, urllib.request.HTTPCookieProcessor(self.cookies),
+        )
+        # الإعدادات في الإنتاج تفرض HTTPS و ALLOWED_HOSTS
+        self.headers = {'X-Forwarded-Proto': 'https', 'User-Agent': 'loadtest'}
+        if host:
+            self.headers['Host'] = host
+            self.headers['Origin'] = f'https://{host}'
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, name, path, data=None, ajax=False, expected=(200, 301, 302)):
+        """تنفيذ طلب وتسجيله باسم name، يعيد (status, body)"""
+        headers = dict(self.headers)
+        body = None
+        if ajax:
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+        if data is not None:
+            token = self.csrf_token()
+            data = dict(data, csrfmiddlewaretoken=token)
+            headers['X-CSRFToken'] = token
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            body = urllib.parse.urlencode(data).encode()
+
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        started = time.perf_counter()
+        status, content, error = 0, b'', None
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, content = exc.code, exc.read()
+        except (urllib.error.URLError, OSError) as exc:
+            error = type(getattr(exc, 'reason', exc)).__name__
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        if error is None and status not in expected:
+            error = f'HTTP {status}'
+        self.stats.record(name, duration_ms, error)
+        return status, content
+
+
+# ==================== الرحلات ====================
+
+def browse_journey(vu, plan, rng):
+    """زائر: الرئيسية ← الكتالوج (بفلتر أحياناً) ← صفحتا دورة"""
+    vu.request('core:home', reverse('core:home'))
+    query = ''
+    if plan['categories'] and rng.random() < 0.5:
+        query = '?' + urllib.parse.urlencode({'category': rng.choice(plan['categories'])})
+    vu.request('courses:course_list', reverse('courses:course_list') + query)
+    for slug in rng.sample(plan['courses'], min(2, len(plan['courses']))):
+        vu.request('courses:course_detail', reverse('courses:course_detail', args=[slug]))
+
+
+def learner_journey(vu, plan, rng, heartbeats=5):
+    """طالب: تصفح ← دخول ← تسجيل ← صفحة التعلم ← درس ← heartbeat ← الإشعارات"""
+    if not plan['learners']:
+        return browse_journey(vu, plan, rng)
+    username, course_slug, lesson_ids = rng.choice(plan['learners'])
+
+    vu.request('courses:course_list', reverse('courses:course_list'))
+    vu.request('courses:course_detail', reverse('courses:course_detail', args=[course_slug]))
+
+    vu.cookies.clear()
+    login_url = reverse('courses:login')
+    vu.request('courses:login', login_url)
+    status, _ = vu.request('courses:login[POST]', login_url, {
+        'username': username, 'password': plan['password'],
+    }, expected=(302,))
+    if status != 302:
+        return
+
+    enroll_slug = rng.choice(plan['courses'])
+    vu.request('courses:enroll', reverse('courses:enroll', args=[enroll_slug]), {})
+    vu.request('courses:course_learn', reverse('courses:course_learn', args=[course_slug]))
+    if lesson_ids:
+        lesson_id = rng.choice(lesson_ids)
+        vu.request('courses:lesson_view', reverse('courses:lesson_view', args=[course_slug, lesson_id]))
+        progress_url = reverse('courses:ajax_update_lesson_progress')
+        for beat in range(heartbeats):
+            vu.request('courses:ajax_update_lesson_progress', progress_url, {
+                'lesson_id': lesson_id, 'position': (beat + 1) * 30,
+            }, ajax=True)
+    vu.request('notifications:notifications', reverse('notifications:notifications'))
+    vu.request('notifications:notifications_count', reverse('notifications:notifications_count'), ajax=True)
+
+
+# (الدالة، الوزن)
+JOURNEYS = {
+    'browse': (browse_journey, 7),
+    'learner': (learner_journey, 3),
+}
+
+
+def build_plan(user_prefix='seed', password='password123', sample=500):
+    """قراءة البيانات المستخدمة في الرحلات من قاعدة البيانات"""
+    from courses.models import Category, Course, Enrollment, Lesson
+
+    courses = list(
+        Course.objects.filter(is_active=True).order_by('-students_count')
+        .values_list('slug', flat=True)[:sample]
+    )
+    categories = list(Category.objects.values_list('slug', flat=True))
+
+    enrollments = list(
+        Enrollment.objects.filter(status='enrolled', user__username__startswith=f'{user_prefix}_')
+        .values_list('user__username', 'course_id', 'course__slug')[:sample]
+    )
+    lessons = {}
+    for lesson_id, course_id in Lesson.objects.filter(
+        module__course_id__in={course_id for _u, course_id, _s in enrollments}
+    ).values_list('id', 'module__course_id'):
+        lessons.setdefault(course_id, []).append(lesson_id)
+
+    return {
+        'courses': courses,
+        'categories': categories,
+        'learners': [(username, slug, lessons.get(course_id, [])) for username, course_id, slug in enrollments],
+        'password': password,
+    }
+
+
+def run_load(base_url, plan, users=20, duration=30, ramp_up=5, think_time=0.5, host=None, seed=None):
+    """تشغيل users مستخدماً افتراضياً لمدة duration ثانية، يعيد (LoadStats, المدة الفعلية)"""
+    stats = LoadStats()
+    names = list(JOURNEYS)
+    weights = [JOURNEYS[name][1] for name in names]
+    started = time.monotonic()
+    deadline = started + duration
+
+    def worker(index):
+        rng = random.Random(None if seed is None else seed + index)
+        time.sleep(ramp_up * index / max(users, 1))
+        vu = VirtualUser(base_url, stats, host=host)
+        while time.monotonic() < deadline:
+            journey = JOURNEYS[rng.choices(names, weights)[0]][0]
+            journey(vu, plan, rng)
+            if think_time:
+                time.sleep(rng.uniform(0, 2 * think_time))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.monotonic() - started
@@ -0,0 +1,168 @@
+"""
+اختبار حمل لرحلات المستخدم الأساسية مع مقارنة أنواع عمال gunicorn
+
+    python manage.py seed_scale_data --scale 0.05
+    python manage.py loadtest --server sync gthread uvicorn --workers 4 --users 50 --duration 60
+    python manage.py loadtest --url http://127.0.0.1:8000 --host localhost --users 20
+
+مع --server يُشغل الأمر السيرفر بنفسه على منفذ محلي لكل نوع ثم يوقفه،
+ومع --url يُختبر سيرفر يعمل بالفعل. إذا كان عدد المستخدمين أكبر من
+سعة السيرفر (workers × threads) فجزء من الزمن انتظار في الطابور وليس
+وقت Python أو قاعدة البيانات.
+"""
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import build_plan, run_load
+
+# نوع العامل: (الوحدة المطلوبة، معاملات gunicorn، التطبيق)
+SERVER_CLASSES = {
+    'sync': ('gunicorn', ['--worker-class', 'sync'], 'mysite.wsgi:application'),
+    'gthread': ('gunicorn', ['--worker-class', 'gthread'], 'mysite.wsgi:application'),
+    'uvicorn': ('uvicorn', ['--worker-class', 'uvicorn.workers.UvicornWorker'], 'mysite.asgi:application'),
+    'runserver': (None, [], None),
+}
+
+
+class Command(BaseCommand):
+    help = 'اختبار حمل لرحلات المستخدم مع تقرير الإنتاجية و p50/p95/p99 ونسبة الأخطاء لكل URL'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument('--url', help='عنوان سيرفر يعمل بالفعل')
+        target.add_argument('--server', nargs='+', choices=list(SERVER_CLASSES), default=['sync'],
+                            help='أنواع العمال المطلوب تشغيلها ومقارنتها')
+        parser.add_argument('--host', default=settings.ALLOWED_HOSTS[0], help='ترويسة Host المرسلة')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4, help='عدد الـ threads لكل عامل (gthread)')
+        parser.add_argument('--users', type=int, default=20, help='عدد المستخدمين الافتراضيين المتزامنين')
+        parser.add_argument('--duration', type=int, default=30, help='مدة الاختبار بالثواني')
+        parser.add_argument('--ramp-up', type=float, default=5, help='مدة بدء كل المستخدمين تدريجياً')
+        parser.add_argument('--think-time', type=float, default=0.5, help='متوسط الانتظار بين الرحلات')
+        parser.add_argument('--user-prefix', default='seed', help='بادئة مستخدمي seed_scale_data')
+        parser.add_argument('--password', default='password123', help='كلمة مرور المستخدمين المولدين')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        plan = build_plan(options['user_prefix'], options['password'])
+        if not plan['courses']:
+            raise CommandError('لا توجد دورات نشطة، شغّل seed_scale_data أولاً')
+        if not plan['learners']:
+            self.stdout.write(self.style.WARNING(
+                f'لا يوجد مستخدمون مسجلون بالبادئة "{options["user_prefix"]}"، سيتم تشغيل رحلات التصفح فقط'
+            ))
+
+        if options['url']:
+            stats, elapsed = self._run(options['url'], plan, options)
+            self._report(options['url'], stats.summary(elapsed), stats.errors)
+            return
+
+        comparison = []
+        for server_class in options['server']:
+            process = self._start_server(server_class, options)
+            try:
+                stats, elapsed = self._run(f'http://127.0.0.1:{options["port"]}', plan, options)
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            rows = stats.summary(elapsed)
+            self._report(server_class, rows, stats.errors, capacity=self._capacity(server_class, options))
+            comparison.append((server_class, rows[-1]))
+
+        if len(comparison) > 1:
+            self.stdout.write(self.style.MIGRATE_HEADING('\nالمقارنة'))
+            self.stdout.write(f"{'server':<12}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors %':>10}")
+            for server_class, total in comparison:
+                self.stdout.write(
+                    f"{server_class:<12}{total['rps']:>9}{total['p50']:>9}{total['p95']:>9}"
+                    f"{total['p99']:>9}{total['error_rate']:>10}"
+                )
+
+    def _run(self, base_url, plan, options):
+        self.stdout.write(f"{options['users']} مستخدم لمدة {options['duration']}s على {base_url} ...")
+        return run_load(
+            base_url, plan,
+            users=options['users'],
+            duration=options['duration'],
+            ramp_up=options['ramp_up'],
+            think_time=options['think_time'],
+            host=options['host'],
+            seed=options['seed'],
+        )
+
+    # ==================== السيرفر ====================
+
+    def _capacity(self, server_class, options):
+        if server_class == 'gthread':
+            return options['workers'] * options['threads']
+        if server_class == 'sync':
+            return options['workers']
+        return None
+
+    def _start_server(self, server_class, options):
+        module, worker_args, app = SERVER_CLASSES[server_class]
+        address = f'127.0.0.1:{options["port"]}'
+        if self._port_open(options['port']):
+            raise CommandError(f'المنفذ {options["port"]} مستخدم بالفعل')
+
+        if server_class == 'runserver':
+            command = [sys.executable, 'manage.py', 'runserver', address, '--noreload']
+        else:
+            for required in {'gunicorn', module}:
+                if importlib.util.find_spec(required) is None:
+                    raise CommandError(f'"{required}" غير مثبت (pip install {required})')
+            command = [
+                sys.executable, '-m', 'gunicorn', app,
+                '--bind', address,
+                '--workers', str(options['workers']),
+                '--threads', str(options['threads'] if server_class == 'gthread' else 1),
+                '--timeout', '120',
+                *worker_args,
+            ]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n[{server_class}] ' + ' '.join(command[1:])))
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while not self._port_open(options['port']):
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise CommandError(f'فشل تشغيل السيرفر "{server_class}"')
+            time.sleep(0.2)
+        return process
+
+    @staticmethod
+    def _port_open(port):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            return sock.connect_ex(('127.0.0.1', port)) == 0
+
+    # ==================== التقرير ====================
+
+    def _report(self, label, rows, errors, capacity=None):
+        total = rows[-1]
+        self.stdout.write(f"{'url':<42}{'count':>7}{'rps':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>9}{'err %':>7}")
+        for row in rows:
+            line = (
+                f"{row['name']:<42}{row['count']:>7}{row['rps']:>8}{row['p50']:>8}"
+                f"{row['p95']:>8}{row['p99']:>8}{row['max']:>9}{row['error_rate']:>7}"
+            )
+            self.stdout.write(self.style.SUCCESS(line) if row is total else line)
+        for name, kinds in sorted(errors.items()):
+            details = ', '.join(f'{kind}: {count}' for kind, count in sorted(kinds.items(), key=lambda item: -item[1]))
+            self.stdout.write(self.style.WARNING(f'  {name} -> {details}'))
+        if capacity:
+            self.stdout.write(f'سعة [{label}]: {capacity} طلب متزامن')
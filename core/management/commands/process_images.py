@@ -0,0 +1,100 @@
+"""
+توليد النسخ المتجاوبة للصور المرفوعة التي ليس لها نسخ بعد
+
+    python manage.py process_images                 # مرة واحدة
+    python manage.py process_images --loop          # عامل دائم للصور الجديدة
+    python manage.py process_images --workers 8 --force
+
+حفظ النماذج لا يولّد النسخ (عمل Pillow ثقيل لا مكان له في الطلب)؛ حتى تتم
+معالجة الصورة تعرض وسوم image_tags الصورة الأصلية.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.images import ImageTooLarge, generate_derivatives, iter_image_fields, save_manifest
+
+
+def _process(name, profile):
+    """تعمل داخل العملية الفرعية: Pillow والتخزين فقط بدون قاعدة البيانات"""
+    try:
+        return name, profile, generate_derivatives(name, profile), None
+    except ImageTooLarge as exc:
+        return name, profile, None, f'oversized ({exc})'
+    except Exception as exc:
+        return name, profile, None, repr(exc)
+
+
+class Command(BaseCommand):
+    help = 'توليد نسخ WebP/JPEG المتجاوبة لكل الصور المرفوعة'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='عدد العمليات المتوازية',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='إعادة المعالجة حتى للصور التي لها نسخ مسبقاً (في أول دورة فقط مع --loop)',
+        )
+        parser.add_argument('--loop', action='store_true', help='التكرار باستمرار بدلاً من الخروج')
+        parser.add_argument('--sleep', type=float, default=10, help='ثوانٍ بين كل فحص للصور الجديدة')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        # الصور التي فشلت في هذا التشغيل لا تُعاد مع كل دورة
+        failed = set()
+        while True:
+            close_old_connections()
+            jobs = {
+                name: profile for name, profile in self.pending_images(force).items()
+                if name not in failed
+            }
+            if jobs:
+                self.process(jobs, options['workers'], failed)
+            elif not options['loop']:
+                self.stdout.write(self.style.SUCCESS('لا توجد صور بحاجة للمعالجة'))
+            if not options['loop']:
+                break
+            force = False
+            time.sleep(options['sleep'])
+
+    def pending_images(self, force):
+        """{الاسم: profile} للصور بدون manifest"""
+        processed = apps.get_model('core', 'ResponsiveImage').objects.values('source')
+        jobs = {}
+        for model, field_name, profile in iter_image_fields():
+            names = (
+                model.objects.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+            )
+            if not force:
+                names = names.exclude(**{f'{field_name}__in': processed})
+            for name in names.values_list(field_name, flat=True).distinct():
+                jobs[name] = profile
+        return jobs
+
+    def process(self, jobs, workers, failed):
+        self.stdout.write(f'معالجة {len(jobs)} صورة باستخدام {workers} عملية...')
+
+        # إغلاق الاتصالات قبل إنشاء العمليات الفرعية حتى لا تُنسخ إليها
+        connections.close_all()
+
+        done = errors = 0
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(_process, name, profile) for name, profile in jobs.items()]
+            for future in as_completed(futures):
+                name, profile, manifest, error = future.result()
+                if error:
+                    errors += 1
+                    failed.add(name)
+                    self.stderr.write(f'  ✗ {name}: {error}')
+                    continue
+                save_manifest(name, profile, manifest)
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'تمت معالجة {done} صورة ({errors} فشل)'))
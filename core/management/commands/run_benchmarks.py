@@ -0,0 +1,86 @@
+"""
+قياس أداء الـ endpoints الأساسية ومقارنتها بالـ baseline
+
+    python manage.py seed_scale_data --scale 0.01
+    python manage.py createsuperuser                      # مستخدم staff للوحات الإدارة
+    python manage.py run_benchmarks --update-baseline     # حفظ القياسات كمرجع
+    python manage.py run_benchmarks                       # يفشل عند التراجع
+    python manage.py run_benchmarks --queries-only        # مقارنة بـ baseline من جهاز آخر
+    python manage.py run_benchmarks --only course_list course_detail
+
+benchmarks/baseline.json المحفوظ في المستودع مسجل بهذه الخطوات على قاعدة
+بيانات SQLite فارغة؛ عدد الاستعلامات فيه صالح للمقارنة على أي جهاز، أما
+الزمن والذاكرة فيُقارنان فقط بعد تحديثه على نفس الجهاز.
+"""
+import os
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.benchmarks import (
+    BenchmarkSetupError, compare, load_baseline, run_benchmarks, save_baseline,
+)
+
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'قياس الزمن وعدد الاستعلامات والذاكرة لكل endpoint ومقارنتها بالـ baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='مسار ملف الـ baseline')
+        parser.add_argument('--update-baseline', action='store_true', help='حفظ النتائج الحالية كـ baseline')
+        parser.add_argument('--repeat', type=int, default=5, help='عدد مرات القياس لكل endpoint')
+        parser.add_argument('--only', nargs='*', help='قياس endpoints محددة بالاسم')
+        parser.add_argument('--time-tolerance', type=float, default=0.25, help='نسبة الزيادة المسموحة في الزمن')
+        parser.add_argument('--memory-tolerance', type=float, default=0.25, help='نسبة الزيادة المسموحة في الذاكرة')
+        parser.add_argument('--query-slack', type=int, default=0, help='عدد الاستعلامات الإضافية المسموحة')
+        parser.add_argument('--queries-only', action='store_true', help='مقارنة الحالة وعدد الاستعلامات فقط')
+
+    def handle(self, *args, **options):
+        # test client يستخدم المضيف testserver
+        with override_settings(ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False):
+            try:
+                results = run_benchmarks(repeat=options['repeat'], only=options['only'])
+            except BenchmarkSetupError as exc:
+                raise CommandError(str(exc))
+
+        self.stdout.write(f"{'endpoint':<28}{'status':>7}{'time ms':>10}{'queries':>9}{'mem KB':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28}{result['status']:>7}{result['time_ms']:>10}{result['queries']:>9}{result['memory_kb']:>10}"
+            )
+
+        path = options['baseline']
+        if options['update_baseline']:
+            baseline = load_baseline(path) or {}
+            baseline.update(results)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_baseline(path, baseline, meta={
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'repeat': options['repeat'],
+            })
+            self.stdout.write(self.style.SUCCESS(f'تم حفظ الـ baseline في {path}'))
+            return
+
+        baseline = load_baseline(path)
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(f'لا يوجد baseline في {path}، استخدم --update-baseline'))
+            return
+
+        regressions = compare(
+            results, baseline,
+            time_tolerance=options['time_tolerance'],
+            memory_tolerance=options['memory_tolerance'],
+            query_slack=options['query_slack'],
+            queries_only=options['queries_only'],
+        )
+        if regressions:
+            for line in regressions:
+                self.stderr.write(f'  {line}')
+            raise CommandError(f'{len(regressions)} تراجع في الأداء مقارنة بالـ baseline')
+        self.stdout.write(self.style.SUCCESS('لا يوجد تراجع في الأداء'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponsiveImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='مسار الصورة الأصلية')),
+                ('profile', models.CharField(max_length=20, verbose_name='نوع المقاسات')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='بصمة المحتوى')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='العرض الأصلي')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='الارتفاع الأصلي')),
+                ('variants', models.JSONField(default=dict, verbose_name='النسخ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'صورة متجاوبة',
+                'verbose_name_plural': 'الصور المتجاوبة',
+            },
+        ),
+    ]
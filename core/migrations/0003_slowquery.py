@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_responsiveimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint_hash', models.CharField(db_index=True, max_length=32, verbose_name='بصمة الاستعلام')),
+                ('fingerprint', models.TextField(verbose_name='الاستعلام الموحد')),
+                ('params', models.TextField(blank=True, verbose_name='المعاملات (مخفية)')),
+                ('duration_ms', models.FloatField(verbose_name='المدة (مللي ثانية)')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='الصفحة')),
+                ('call_site', models.CharField(blank=True, max_length=255, verbose_name='مكان الاستدعاء')),
+                ('function', models.CharField(blank=True, max_length=200, verbose_name='الدالة')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='وقت التنفيذ')),
+            ],
+            options={
+                'verbose_name': 'استعلام بطيء',
+                'verbose_name_plural': 'الاستعلامات البطيئة',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
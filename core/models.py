@@ -1,10 +1,17 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 import uuid
 
+from .slugs import save_with_unique_slug
+
 # =================== Core Models ===================
 
+SITE_SETTINGS_CACHE_KEY = 'core:site-settings:active'
+SITE_SETTINGS_CACHE_TIMEOUT = getattr(settings, 'SITE_CONTENT_CACHE_TIMEOUT', 300)
+
 class SiteSettings(models.Model):
     """
     إعدادات الموقع العامة
@@ -247,8 +254,12 @@ class SiteSettings(models.Model):
     
     @classmethod
     def get_active_settings(cls):
-        """الحصول على الإعدادات النشطة"""
-        return cls.objects.filter(is_active=True).first()
+        """الحصول على الإعدادات النشطة (من الكاش، تُحذف عند الحفظ أو الحذف)"""
+        settings_obj = cache.get(SITE_SETTINGS_CACHE_KEY)
+        if settings_obj is None:
+            settings_obj = cls.objects.filter(is_active=True).first() or False
+            cache.set(SITE_SETTINGS_CACHE_KEY, settings_obj, SITE_SETTINGS_CACHE_TIMEOUT)
+        return settings_obj or None
     
     @classmethod
     def get_site_name(cls):
@@ -529,8 +540,9 @@ class FAQ(models.Model):
     
     def increment_views(self):
         """زيادة عدد المشاهدات"""
+        # update() بدلاً من save() حتى لا تُبطل كل زيارة كاش الصفحات
+        type(self).objects.filter(pk=self.pk).update(views_count=models.F('views_count') + 1)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
 
 
 class Page(models.Model):
@@ -598,10 +610,16 @@ class Page(models.Model):
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            return save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
+        super().save(*args, **kwargs)
+    
     def increment_views(self):
         """زيادة عدد المشاهدات"""
+        # update() بدلاً من save() حتى لا تُبطل كل زيارة كاش الصفحات
+        type(self).objects.filter(pk=self.pk).update(views_count=models.F('views_count') + 1)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
     
     def publish(self):
         """نشر الصفحة"""
@@ -650,4 +668,48 @@ class SiteFeature(models.Model):
         ]
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class ResponsiveImage(models.Model):
+    """
+    النسخ المتجاوبة المولدة لصورة مرفوعة (انظر core/images.py)
+    """
+    source = models.CharField(_("مسار الصورة الأصلية"), max_length=255, unique=True)
+    profile = models.CharField(_("نوع المقاسات"), max_length=20)
+    content_hash = models.CharField(_("بصمة المحتوى"), max_length=64)
+    width = models.PositiveIntegerField(_("العرض الأصلي"), default=0)
+    height = models.PositiveIntegerField(_("الارتفاع الأصلي"), default=0)
+    variants = models.JSONField(_("النسخ"), default=dict)
+    
+    created_at = models.DateTimeField(_("تاريخ الإنشاء"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("تاريخ التحديث"), auto_now=True)
+    
+    class Meta:
+        verbose_name = _("صورة متجاوبة")
+        verbose_name_plural = _("الصور المتجاوبة")
+    
+    def __str__(self):
+        return self.source
+
+
+class SlowQuery(models.Model):
+    """
+    استعلام بطيء مسجل من الإنتاج (انظر core/slow_queries.py)
+    """
+    fingerprint_hash = models.CharField(_("بصمة الاستعلام"), max_length=32, db_index=True)
+    fingerprint = models.TextField(_("الاستعلام الموحد"))
+    params = models.TextField(_("المعاملات (مخفية)"), blank=True)
+    duration_ms = models.FloatField(_("المدة (مللي ثانية)"))
+    view = models.CharField(_("الصفحة"), max_length=200, blank=True)
+    call_site = models.CharField(_("مكان الاستدعاء"), max_length=255, blank=True)
+    function = models.CharField(_("الدالة"), max_length=200, blank=True)
+    
+    created_at = models.DateTimeField(_("وقت التنفيذ"), default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = _("استعلام بطيء")
+        verbose_name_plural = _("الاستعلامات البطيئة")
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.duration_ms:.0f}ms {self.function or self.call_site}"
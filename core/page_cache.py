@@ -0,0 +1,172 @@
+"""
+تخزين الصفحات العامة كاملة للزوار غير المسجلين (Anonymous page cache)
+
+- المفتاح: المضيف + اللغة الحالية + نوع الجهاز + المسار مع الـ query string
+  + أرقام إصدارات الـ tags التي تعتمد عليها الصفحة.
+- الإبطال: عند حفظ/حذف أي نموذج مرتبط (Course, Category, Review, Page, FAQ,
+  SiteSettings...) يتغير إصدار الـ tag الخاص به فتصبح كل الصفحات المعتمدة
+  عليه مفاتيح جديدة (لا حاجة لمعرفة المفاتيح القديمة أو حذفها).
+- رمز CSRF يُستبدل بعلامة قبل التخزين ويُولّد رمز جديد لكل زائر عند العرض.
+- عدادات المشاهدات تُحدّث في الطلبات المخدومة من الكاش عبر on_hit.
+"""
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+
+from .context_processors import is_mobile
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+PAGE_CACHE_PREFIX = 'page-cache'
+
+# نماذج يظهر محتواها في القالب الأساسي (الرأس، التذييل، context processors)
+# لذلك تعتمد عليها كل الصفحات المخزنة
+LAYOUT_TAGS = (
+    'core.sitesettings', 'core.page', 'core.faq', 'core.partner',
+    'core.testimonial', 'core.sitefeature', 'courses.category', 'courses.course',
+)
+
+# نماذج محتوى الرأس والتذييل (أجزاء {% cache %} في base.html)
+SITE_CONTENT_TAGS = ('core.sitesettings', 'core.page', 'core.partner')
+
+# كل النماذج التي تبطل الكاش عند تغييرها
+PAGE_CACHE_MODELS = (
+    'core.SiteSettings', 'core.Page', 'core.FAQ', 'core.Partner',
+    'core.Testimonial', 'core.SiteFeature',
+    'courses.Category', 'courses.Course', 'courses.Review',
+)
+
+CSRF_PLACEHOLDER = b'__PAGE_CACHE_CSRF_TOKEN__'
+# {% csrf_token %} و <meta name="csrf-token" content="{{ csrf_token }}">
+CSRF_TOKEN_RE = re.compile(rb'(?:csrfmiddlewaretoken|csrf-token)"\s+(?:value|content)="([A-Za-z0-9]{32,64})"')
+
+
+# ==================== الـ tags ====================
+
+def _tag_key(tag):
+    return f'{PAGE_CACHE_PREFIX}:tag:{tag}'
+
+
+def get_tag_versions(tags):
+    """إصدار كل tag (يُنشأ إصدار جديد إذا لم يكن موجوداً)"""
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [str(versions[key]) for key in keys]
+
+
+def invalidate_tags(*tags):
+    """إبطال كل الصفحات المعتمدة على هذه الـ tags"""
+    cache.set_many({_tag_key(tag): time.time_ns() for tag in tags}, timeout=None)
+
+
+def model_tag(model):
+    return model._meta.label_lower
+
+
+def get_site_content_version():
+    """إصدار محتوى الموقع العام (يتغير عند تعديل الإعدادات أو الصفحات أو الشركاء)"""
+    versions = ':'.join(get_tag_versions(SITE_CONTENT_TAGS))
+    return hashlib.md5(versions.encode('ascii')).hexdigest()[:12]
+
+
+# ==================== الطلب والاستجابة ====================
+
+def is_cacheable_request(request):
+    """طلب GET/HEAD من زائر غير مسجل بدون سلة أو رسائل معلقة"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    if request.session.get('cart'):
+        return False
+    return not len(get_messages(request))
+
+
+def page_cache_key(request, tags):
+    device = is_mobile(request)
+    parts = [
+        request.get_host(),
+        get_language() or '',
+        'm' if device['is_mobile'] else 'd',
+        't' if device['is_tablet'] else '',
+        request.get_full_path(),
+        *get_tag_versions(tags),
+    ]
+    digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+    return f'{PAGE_CACHE_PREFIX}:page:{digest}'
+
+
+def _is_cacheable_response(request, response):
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+        and not len(get_messages(request))
+    )
+
+
+def _strip_csrf_tokens(content):
+    for token in set(CSRF_TOKEN_RE.findall(content)):
+        content = content.replace(token, CSRF_PLACEHOLDER)
+    return content
+
+
+def _response_from_entry(request, entry):
+    content = entry['content']
+    if CSRF_PLACEHOLDER in content:
+        # get_token يضبط كوكي CSRF للزائر عبر CsrfViewMiddleware
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode('ascii'))
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def cache_page_for_anonymous(*tags, timeout=None, on_hit=None):
+    """
+    Decorator لتخزين الصفحة كاملة للزوار غير المسجلين.
+
+    tags: نماذج إضافية تعتمد عليها الصفحة (بجانب LAYOUT_TAGS)
+    on_hit: دالة (request, *args, **kwargs) تُنفذ عند الخدمة من الكاش
+    """
+    page_tags = tuple(dict.fromkeys(LAYOUT_TAGS + tags))
+    cache_timeout = PAGE_CACHE_TIMEOUT if timeout is None else timeout
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request, page_tags)
+            entry = cache.get(key)
+            if entry is not None:
+                if on_hit is not None:
+                    on_hit(request, *args, **kwargs)
+                return _response_from_entry(request, entry)
+
+            response = view_func(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                # TemplateResponse من الـ class-based views
+                response = response.render()
+            if _is_cacheable_response(request, response):
+                cache.set(key, {
+                    'content': _strip_csrf_tokens(response.content),
+                    'content_type': response['Content-Type'],
+                }, cache_timeout)
+                response['X-Page-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
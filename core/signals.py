@@ -0,0 +1,36 @@
+"""
+إشارات التطبيق الأساسي
+"""
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SITE_SETTINGS_CACHE_KEY, SiteSettings
+from .page_cache import PAGE_CACHE_MODELS, invalidate_tags, model_tag
+
+
+# =========================
+# كاش الصفحات العامة
+# =========================
+
+def invalidate_page_cache(sender, raw=False, **kwargs):
+    if raw:
+        return
+    tag = model_tag(sender)
+    transaction.on_commit(lambda: invalidate_tags(tag))
+
+
+def connect_page_cache_signals():
+    """إبطال الصفحات المخزنة عند تعديل أو حذف أي نموذج تعتمد عليه"""
+    for label in PAGE_CACHE_MODELS:
+        model = apps.get_model(label)
+        uid = f'page_cache:{model._meta.label}'
+        post_save.connect(invalidate_page_cache, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_page_cache, sender=model, dispatch_uid=uid)
+
+
+@receiver([post_save, post_delete], sender=SiteSettings, dispatch_uid='site_settings_cache')
+def clear_site_settings_cache(sender, **kwargs):
+    transaction.on_commit(lambda: cache.delete(SITE_SETTINGS_CACHE_KEY))
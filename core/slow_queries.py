@@ -0,0 +1,258 @@
+"""
+سجل الاستعلامات البطيئة في الإنتاج مع مكان الاستدعاء في كود Python
+
+- كل استعلام أبطأ من SLOW_QUERY_THRESHOLD_MS يُسجل (بنسبة SLOW_QUERY_SAMPLE_RATE)
+  مع الاستعلام الموحد، أنواع المعاملات فقط (بدون القيم)، المدة، اسم الـ view
+  والدالة التي استدعته من كود المشروع.
+- السجلات تُحفظ في ring buffer محدود لكل عامل (process) وتُفرّغ دورياً
+  (كل SLOW_QUERY_FLUSH_INTERVAL ثانية) إلى جدول SlowQuery أو إلى ملف JSONL
+  إذا تم ضبط SLOW_QUERY_LOG_FILE.
+- صفحة فريق العمل: core:admin_slow_queries (p50/p95/p99 لكل بصمة) تقرأ من
+  نفس المصدر: الجدول، أو ملف JSONL على هذا الخادم فقط (مع عدة خوادم يكتب كل
+  منها ملفه ولا تعرض الصفحة إلا عينات الخادم الذي خدم الطلب).
+"""
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .instrumentation import execute_wrapper, fingerprint, project_frame
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200)
+SLOW_QUERY_SAMPLE_RATE = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+SLOW_QUERY_BUFFER_SIZE = getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 1000)
+SLOW_QUERY_FLUSH_INTERVAL = getattr(settings, 'SLOW_QUERY_FLUSH_INTERVAL', 60)
+SLOW_QUERY_LOG_FILE = getattr(settings, 'SLOW_QUERY_LOG_FILE', '')
+
+# اسم الـ view الحالي (يُضبط في process_view)
+current_view = ContextVar('current_view', default='')
+
+_buffer = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def redact_params(params, many=False):
+    """أنواع المعاملات فقط بدون القيم (قد تحتوي بيانات شخصية)"""
+    if params is None:
+        return ''
+    if many:
+        return f'<{len(params)} rows>' if hasattr(params, '__len__') else '<many>'
+    if isinstance(params, dict):
+        params = params.values()
+    redacted = []
+    for value in params:
+        if value is None:
+            redacted.append('NULL')
+        elif isinstance(value, (str, bytes)):
+            redacted.append(f'<{type(value).__name__}:{len(value)}>')
+        else:
+            redacted.append(f'<{type(value).__name__}>')
+    return ', '.join(redacted)
+
+
+def slow_query_recorder(execute, sql, params, many, context):
+    """execute_wrapper يسجل الاستعلامات الأبطأ من الحد"""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= SLOW_QUERY_THRESHOLD_MS and random.random() < SLOW_QUERY_SAMPLE_RATE:
+            call_site, function = project_frame()
+            normalized = fingerprint(sql)
+            entry = {
+                'fingerprint_hash': hashlib.md5(normalized.encode('utf-8')).hexdigest(),
+                'fingerprint': normalized,
+                'params': redact_params(params, many),
+                'duration_ms': round(duration_ms, 2),
+                'view': current_view.get(),
+                'call_site': call_site,
+                'function': function,
+                'created_at': timezone.now(),
+            }
+            with _buffer_lock:
+                _buffer.append(entry)
+
+
+def _drain():
+    with _buffer_lock:
+        entries = list(_buffer)
+        _buffer.clear()
+    return entries
+
+
+def flush_due():
+    return time.monotonic() - _last_flush >= SLOW_QUERY_FLUSH_INTERVAL
+
+
+def flush(force=False):
+    """تفريغ الـ buffer إلى الجدول أو ملف JSONL (مرة كل SLOW_QUERY_FLUSH_INTERVAL)"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and not flush_due():
+        return 0
+    _last_flush = now
+    entries = _drain()
+    if not entries:
+        return 0
+    try:
+        if SLOW_QUERY_LOG_FILE:
+            with open(SLOW_QUERY_LOG_FILE, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, default=str, ensure_ascii=False) + '\n')
+        else:
+            from .models import SlowQuery
+            SlowQuery.objects.bulk_create([SlowQuery(**entry) for entry in entries])
+    except Exception:
+        logger.exception('Failed to flush %d slow queries', len(entries))
+        return 0
+    return len(entries)
+
+
+def percentile(sorted_values, fraction):
+    """النسبة المئوية (nearest-rank) من قائمة مرتبة"""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+SAMPLE_FIELDS = ('fingerprint_hash', 'fingerprint', 'duration_ms', 'view', 'function', 'call_site')
+
+
+def _file_samples(since):
+    """سجلات ملف JSONL منذ since (الأسطر التالفة تُتجاهل)"""
+    try:
+        f = open(SLOW_QUERY_LOG_FILE, encoding='utf-8')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                created_at = parse_datetime(entry['created_at'])
+            except (ValueError, KeyError, TypeError):
+                continue
+            if created_at is not None and created_at >= since and all(field in entry for field in SAMPLE_FIELDS):
+                yield entry
+
+
+def load_samples(since, view=''):
+    """
+    العينات منذ since من مصدر التخزين الحالي (ملف JSONL أو جدول SlowQuery).
+    يرجع (صفوف بترتيب SAMPLE_FIELDS، عددها، أسماء الـ views).
+    """
+    if SLOW_QUERY_LOG_FILE:
+        rows, views = [], set()
+        for entry in _file_samples(since):
+            views.add(entry['view'])
+            if not view or entry['view'] == view:
+                rows.append(tuple(entry[field] for field in SAMPLE_FIELDS))
+        return rows, len(rows), sorted(views)
+
+    from .models import SlowQuery
+    queryset = SlowQuery.objects.filter(created_at__gte=since)
+    views = queryset.order_by('view').values_list('view', flat=True).distinct()
+    if view:
+        queryset = queryset.filter(view=view)
+    rows = queryset.values_list(*SAMPLE_FIELDS).iterator(chunk_size=2000)
+    return rows, queryset.count(), views
+
+
+def aggregate_slow_queries(rows):
+    """تجميع الاستعلامات حسب البصمة مع p50/p95/p99، مرتبة حسب الزمن الإجمالي"""
+    groups = {}
+    for fingerprint_hash, normalized, duration_ms, view, function, call_site in rows:
+        group = groups.get(fingerprint_hash)
+        if group is None:
+            group = groups[fingerprint_hash] = {
+                'fingerprint_hash': fingerprint_hash,
+                'fingerprint': normalized,
+                'durations': [],
+                'sources': {},
+            }
+        group['durations'].append(duration_ms)
+        source = (view, function, call_site)
+        group['sources'][source] = group['sources'].get(source, 0) + 1
+
+    results = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        sources = group.pop('sources')
+        view, function, call_site = max(sources, key=sources.get)
+        group.update({
+            'count': len(durations),
+            'total_ms': round(sum(durations), 2),
+            'p50': percentile(durations, 0.50),
+            'p95': percentile(durations, 0.95),
+            'p99': percentile(durations, 0.99),
+            'max': durations[-1],
+            'view': view,
+            'function': function,
+            'call_site': call_site,
+            'sources_count': len(sources),
+        })
+        results.append(group)
+    results.sort(key=lambda group: -group['total_ms'])
+    return results
+
+
+# ==================== Middleware ====================
+
+class SlowQueryMiddleware:
+    """
+    تسجيل الاستعلامات البطيئة لكل طلب (sync و async).
+    يُفعّل عبر SLOW_QUERY_LOG.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_LOG', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = current_view.set(request.path)
+        try:
+            with execute_wrapper(slow_query_recorder):
+                response = self.get_response(request)
+        finally:
+            current_view.reset(token)
+        # التفريغ بعد انتهاء الـ wrapper حتى لا يُسجل استعلام الحفظ نفسه
+        flush()
+        return response
+
+    async def __acall__(self, request):
+        token = current_view.set(request.path)
+        try:
+            with execute_wrapper(slow_query_recorder):
+                response = await self.get_response(request)
+        finally:
+            current_view.reset(token)
+        # الكتابة في thread فقط عندما يحين موعد التفريغ
+        if flush_due():
+            await sync_to_async(flush)()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set(match.view_name if match else getattr(view_func, '__name__', request.path))
@@ -0,0 +1,89 @@
+"""
+توليد slug فريد لكل النماذج (Course, Category, Page)
+
+- العناوين العربية تُحوّل إلى حروف لاتينية (transliteration) لأن مسارات
+  الروابط تستخدم <slug:...> الذي يقبل ASCII فقط.
+- كل الـ slugs التي تبدأ بنفس الأساس تُجلب في استعلام واحد ويُختار أول
+  رقم متاح في الذاكرة بدلاً من فحص كل احتمال باستعلام منفصل.
+- عند تعارض متزامن على الـ slug (IntegrityError مع وجود صف آخر بنفس
+  الـ slug) تُعاد المحاولة داخل savepoint؛ أي IntegrityError آخر يُرفع فوراً.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+SLUG_SAVE_ATTEMPTS = 5
+
+ARABIC_TRANSLITERATION = {
+    'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'a', 'ٱ': 'a', 'ء': '', 'ؤ': 'o', 'ئ': 'e',
+    'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h', 'خ': 'kh',
+    'د': 'd', 'ذ': 'th', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh',
+    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh',
+    'ف': 'f', 'ق': 'q', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n',
+    'ه': 'h', 'ة': 'a', 'و': 'w', 'ي': 'y', 'ى': 'a',
+    'پ': 'p', 'چ': 'ch', 'گ': 'g', 'ژ': 'zh', 'ک': 'k', 'ی': 'y',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    'ـ': '',
+}
+_TRANSLITERATION_TABLE = str.maketrans(ARABIC_TRANSLITERATION)
+
+# التشكيل (الفتحة، الضمة، الكسرة، السكون، الشدة، التنوين...)
+ARABIC_DIACRITICS_RE = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]')
+
+
+def transliterate(value):
+    """تحويل النص العربي إلى حروف لاتينية تقريبية"""
+    return ARABIC_DIACRITICS_RE.sub('', str(value)).translate(_TRANSLITERATION_TABLE)
+
+
+def build_slug(value, max_length=50, fallback='item'):
+    """slug أساسي (ASCII) من نص قد يكون عربياً"""
+    slug = slugify(transliterate(value))[:max_length].strip('-')
+    return slug or fallback
+
+
+def next_free_slug(model, base, exclude_pk=None, max_length=50):
+    """
+    أول slug متاح بصيغة base أو base-N باستعلام واحد فقط.
+    """
+    queryset = model._default_manager.filter(slug__startswith=base)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    existing = set(queryset.values_list('slug', flat=True))
+    if base not in existing:
+        return base
+
+    suffix_re = re.compile(rf'^{re.escape(base)}-(\d+)$')
+    used = {int(m.group(1)) for slug in existing if (m := suffix_re.match(slug))}
+    number = 2
+    while number in used:
+        number += 1
+
+    suffix = f'-{number}'
+    if len(base) + len(suffix) > max_length:
+        # لا مكان للرقم: نقص الأساس ونعيد البحث بالبادئة الأقصر
+        return next_free_slug(model, base[:max_length - len(suffix)].rstrip('-'), exclude_pk, max_length)
+    return base + suffix
+
+
+def save_with_unique_slug(instance, value, save, *args, fallback=None, **kwargs):
+    """
+    تعيين slug فريد ثم استدعاء save الأصلي (super().save) داخل savepoint،
+    مع إعادة المحاولة إذا سبقنا طلب آخر لنفس الـ slug.
+    """
+    model = type(instance)
+    max_length = model._meta.get_field('slug').max_length
+    base = build_slug(value, max_length, fallback or model._meta.model_name)
+
+    for attempt in range(SLUG_SAVE_ATTEMPTS):
+        instance.slug = next_free_slug(model, base, instance.pk, max_length)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            # خطأ في قيد آخر (حقل فريد غير الـ slug، مفتاح أجنبي...) لا تحله إعادة المحاولة
+            conflict = model._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not conflict or attempt == SLUG_SAVE_ATTEMPTS - 1:
+                raise
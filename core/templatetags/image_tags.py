@@ -0,0 +1,73 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from core.images import get_manifest
+
+register = template.Library()
+
+
+def _resolve(image):
+    """إرجاع (الاسم، storage) من FieldFile أو مسار نصي"""
+    if not image:
+        return '', default_storage
+    if isinstance(image, str):
+        return image, default_storage
+    return image.name or '', getattr(image, 'storage', default_storage)
+
+
+def _original_url(name, storage):
+    return storage.url(name) if name else ''
+
+
+@register.simple_tag
+def image_url(image, variant='card', fmt='jpeg'):
+    """رابط نسخة معينة من الصورة، أو الصورة الأصلية إذا لم تُولد النسخ بعد"""
+    name, storage = _resolve(image)
+    manifest = get_manifest(name)
+    if manifest and variant in manifest['variants']:
+        return storage.url(manifest['variants'][variant][fmt])
+    return _original_url(name, storage)
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp'):
+    """قيمة srcset لكل النسخ المتاحة: "url 320w, url 640w, ..." """
+    name, storage = _resolve(image)
+    manifest = get_manifest(name)
+    if not manifest:
+        return ''
+    entries = sorted(manifest['variants'].values(), key=lambda v: v['width'])
+    return ', '.join(f"{storage.url(v[fmt])} {v['width']}w" for v in entries)
+
+
+@register.simple_tag
+def responsive_image(image, variant='card', alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    وسم <picture> كامل: مصدر WebP مع بديل JPEG.
+    إذا لم تُولد النسخ بعد يُعرض وسم <img> بالصورة الأصلية.
+    """
+    name, storage = _resolve(image)
+    if not name:
+        return ''
+    manifest = get_manifest(name)
+    if not manifest or variant not in manifest['variants']:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}">',
+            _original_url(name, storage), alt, css_class, loading,
+        )
+
+    entries = sorted(manifest['variants'].values(), key=lambda v: v['width'])
+    webp_srcset = format_html_join(', ', '{} {}w', ((storage.url(v['webp']), v['width']) for v in entries))
+    jpeg_srcset = format_html_join(', ', '{} {}w', ((storage.url(v['jpeg']), v['width']) for v in entries))
+    default = manifest['variants'][variant]
+    # display:contents حتى لا يؤثر <picture> على تنسيق الصورة داخل الحاوية
+    return format_html(
+        '<picture style="display:contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        webp_srcset, sizes,
+        storage.url(default['jpeg']), jpeg_srcset, sizes,
+        default['width'], default['height'], alt, css_class, loading,
+    )
@@ -1,3 +1,351 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Category, Course, CourseModule, Enrollment, Lesson, Review, User
+
+from . import db_router, images, page_cache, slow_queries, slugs
+from .instrumentation import assert_max_queries, execute_wrapper
+from .models import ResponsiveImage, SiteSettings
+from .slugs import save_with_unique_slug
+
+STUDENTS = 8
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class QueryBudgetTests(TestCase):
+    """
+    حد أقصى لعدد الاستعلامات في الصفحات الأساسية (بكاش فارغ)، مع بيانات
+    تكفي لظهور حلقات N+1: أكثر من N_PLUS_ONE_THRESHOLD طالب وتقييم ودرس.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username='instructor', role='instructor', first_name='أحمد')
+        cls.staff = User.objects.create(username='staff', role='admin', is_staff=True)
+        cls.students = [User.objects.create(username=f'student{i}') for i in range(STUDENTS)]
+        category = Category.objects.create(name='البرمجة', slug='programming')
+
+        cls.courses = []
+        for i in range(3):
+            course = Course.objects.create(
+                title=f'تطوير الويب {i}', slug=f'web-{i}', description='-', category=category,
+                instructor=cls.instructor, price=Decimal('199.00'), is_active=True, image=f'courses/web-{i}.jpg',
+            )
+            for module_order in range(2):
+                module = CourseModule.objects.create(course=course, title=f'وحدة {module_order}', order=module_order)
+                for lesson_order in range(3):
+                    Lesson.objects.create(
+                        module=module, title=f'درس {lesson_order}', content='مقدمة في البرمجة',
+                        order=lesson_order, duration_minutes=10, is_free=lesson_order == 0,
+                    )
+            for student in cls.students:
+                Enrollment.objects.create(user=student, course=course, status='enrolled')
+                Review.objects.create(user=student, course=course, rating=4, comment='ممتاز')
+            cls.courses.append(course)
+
+        cls.course = cls.courses[0]
+        cls.lesson = Lesson.objects.filter(module__course=cls.course).order_by('module__order', 'order').first()
+
+    def assertQueries(self, url_name, n, ajax=False, **kwargs):
+        # كل صفحة بكاش فارغ: الحد لا يعتمد على ترتيب الطلبات في الاختبار
+        cache.clear()
+        if ajax:
+            kwargs['headers'] = {'X-Requested-With': 'XMLHttpRequest'}
+        response = assert_max_queries(url_name, n, **kwargs)
+        self.assertEqual(response.status_code, 200, url_name)
+
+    def test_public_pages(self):
+        self.assertQueries('core:home', 16)
+        self.assertQueries('core:about', 12)
+        self.assertQueries('core:contact', 5)
+        # حلقة ثابتة على تصنيفات الأسئلة (FAQ.category_choices) وليست على البيانات
+        self.assertQueries('core:faq', 13, allow_n_plus_one=True)
+        self.assertQueries('core:search', 9, data={'q': 'تطوير'})
+        self.assertQueries('courses:course_list', 15)
+        self.assertQueries('courses:course_list', 15, data={'search': 'الويب', 'sort': '-rating'})
+        self.assertQueries('courses:course_list', 15, data={'category': 'programming', 'level': 'beginner'})
+        self.assertQueries('courses:course_detail', 17, args=[self.course.slug])
+        self.assertQueries('courses:instructor_profile', 13, args=[self.instructor.pk])
+        self.assertQueries('courses:login', 5)
+        self.assertQueries('courses:register', 5)
+        self.assertQueries('courses:cart_view', 5)
+        self.assertQueries('courses:cart_count', 0)
+        self.assertQueries('courses:ajax_search_suggestions', 3, data={'q': 'تطوير'})
+        self.assertQueries('courses:ajax_course_reviews', 3, args=[self.course.pk])
+
+    def test_student_pages(self):
+        student = self.students[0]
+        self.assertQueries('core:home', 22, user=student)
+        self.assertQueries('courses:course_list', 21, user=student)
+        self.assertQueries('courses:course_detail', 26, args=[self.course.slug], user=student)
+        self.assertQueries('courses:course_learn', 20, args=[self.course.slug], user=student)
+        self.assertQueries('courses:lesson_view', 15, args=[self.course.slug, self.lesson.pk], user=student)
+        self.assertQueries('courses:user_dashboard', 29, user=student)
+        self.assertQueries('courses:profile', 20, user=student)
+        self.assertQueries('courses:cart_view', 11, user=student)
+        # حلقة ثابتة على حالات التسجيل الأربع في القالب
+        self.assertQueries('courses:order_history', 27, user=student, allow_n_plus_one=True)
+        self.assertQueries('notifications:notifications', 14, user=student)
+        self.assertQueries('notifications:notifications_count', 3, ajax=True, user=student)
+        self.assertQueries('courses:ajax_recent_activities', 4, ajax=True, user=student)
+        self.assertQueries('courses:ajax_dashboard_stats', 6, ajax=True, user=student)
+        self.assertQueries('courses:ajax_search_lessons', 5, args=[self.course.pk], data={'q': 'برمجة'}, user=student)
+
+    def test_instructor_pages(self):
+        self.assertQueries('courses:instructor_dashboard', 19, user=self.instructor)
+        self.assertQueries('courses:ajax_get_course_stats', 7, ajax=True, args=[self.course.pk], user=self.instructor)
+        self.assertQueries('courses:ajax_dashboard_stats', 6, ajax=True, user=self.instructor)
+        # استعلام لكل شهر من الأشهر المطلوبة (عدد ثابت)
+        self.assertQueries('courses:ajax_chart_data', 8, ajax=True, user=self.instructor, allow_n_plus_one=True)
+
+    def test_admin_pages(self):
+        self.assertQueries('courses:admin_dashboard', 47, user=self.staff)
+        self.assertQueries('courses:admin_users', 17, user=self.staff)
+        self.assertQueries('courses:admin_user_detail', 17, args=[self.students[0].pk], user=self.staff)
+        self.assertQueries('courses:admin_courses', 21, user=self.staff)
+        self.assertQueries('courses:admin_course_detail', 26, args=[self.course.pk], user=self.staff)
+        self.assertQueries('courses:admin_categories', 13, user=self.staff)
+        self.assertQueries('courses:admin_enrollments', 15, user=self.staff)
+        self.assertQueries('courses:admin_reviews', 15, user=self.staff)
+        self.assertQueries('courses:admin_orders', 18, user=self.staff)
+        self.assertQueries('courses:admin_stats', 16, user=self.staff)
+        self.assertQueries('core:admin_slow_queries', 14, user=self.staff)
+        # حلقات ثابتة على الأشهر والأيام الأخيرة في التقارير
+        self.assertQueries('courses:admin_reports', 51, user=self.staff, allow_n_plus_one=True)
+
+
+class SaveWithUniqueSlugTests(TestCase):
+    def test_retries_when_another_row_took_the_slug(self):
+        Category.objects.create(name='تصميم')
+        real_next_free_slug = slugs.next_free_slug
+        # أول اختيار قديم: طلب متزامن حجز الـ slug بعد الاستعلام عنه
+        calls = iter([lambda *args: 'tsmym', real_next_free_slug])
+        with mock.patch.object(slugs, 'next_free_slug', lambda *args: next(calls)(*args)):
+            category = Category.objects.create(name='تصميم')
+        self.assertEqual(category.slug, 'tsmym-2')
+
+    def test_other_integrity_errors_are_raised_immediately(self):
+        save = mock.Mock(side_effect=IntegrityError('NOT NULL constraint failed: courses_category.name'))
+        with self.assertRaises(IntegrityError):
+            save_with_unique_slug(Category(name='تصميم'), 'تصميم', save)
+        self.assertEqual(save.call_count, 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class SiteContentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create(username='student'))
+
+    def test_header_follows_site_settings_edit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            site = SiteSettings.objects.create(site_name='أكاديمية الغد', is_active=True)
+        self.assertContains(self.client.get(reverse('courses:course_list')), 'أكاديمية الغد')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site.site_name = 'أكاديمية المستقبل'
+            site.save()
+        response = self.client.get(reverse('courses:course_list'))
+        self.assertContains(response, 'أكاديمية المستقبل')
+        self.assertNotContains(response, 'أكاديمية الغد')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username='instructor', role='instructor')
+        category = Category.objects.create(name='البرمجة', slug='programming')
+        cls.course = Course.objects.create(
+            title='تطوير الويب', slug='web', description='-', category=category,
+            instructor=instructor, price=Decimal('199.00'), is_active=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('courses:course_list')
+
+    def test_anonymous_hit_without_queries(self):
+        self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertContains(response, 'تطوير الويب')
+
+    def test_csrf_token_per_visitor(self):
+        first = self.client.get(self.url)
+        self.assertNotIn(page_cache.CSRF_PLACEHOLDER, first.content)
+
+        visitor = self.client_class()
+        response = visitor.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertNotIn(page_cache.CSRF_PLACEHOLDER, response.content)
+        tokens = set(page_cache.CSRF_TOKEN_RE.findall(response.content))
+        self.assertTrue(tokens)
+        self.assertFalse(tokens & set(page_cache.CSRF_TOKEN_RE.findall(first.content)))
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_model_change_invalidates_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'تحليل البيانات'
+            self.course.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'تحليل البيانات')
+
+    def test_logged_in_user_skips_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(User.objects.create(username='student'))
+        self.assertNotIn('X-Page-Cache', self.client.get(self.url))
+
+
+class PrefetchManifestsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_one_cache_round_trip_and_one_query(self):
+        ResponsiveImage.objects.create(source='courses/a.jpg', profile='card', content_hash='abc', width=800, height=450)
+        names = ['courses/a.jpg', 'courses/b.jpg', 'courses/c.jpg', '']
+
+        with mock.patch.object(images.cache, 'get_many', wraps=images.cache.get_many) as get_many:
+            with self.assertNumQueries(1):
+                images.prefetch_manifests(names)
+        self.assertEqual(get_many.call_count, 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(images.get_manifest('courses/a.jpg')['hash'], 'abc')
+            self.assertIsNone(images.get_manifest('courses/b.jpg'))
+
+
+@mock.patch.object(db_router, 'replica_configured', return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_use_replica_only_inside_context(self, configured):
+        self.assertIsNone(self.router.db_for_read(Course))
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Course), db_router.REPLICA_ALIAS)
+            # الجلسة قد تكون أُنشئت للتو على default
+            self.assertIsNone(self.router.db_for_read(Session))
+            self.assertEqual(self.router.db_for_write(Course), 'default')
+        self.assertIsNone(self.router.db_for_read(Course))
+
+    def test_without_replica_reads_stay_on_default(self, configured):
+        configured.return_value = False
+        with db_router.read_from_replica():
+            self.assertIsNone(self.router.db_for_read(Course))
+
+    def view_database(self, view, cookies=None):
+        request = self.factory.get('/reports/')
+        request.COOKIES.update(cookies or {})
+        return view(request).content.decode()
+
+    def test_use_replica_view_unless_sticky(self, configured):
+        @db_router.use_replica
+        def report(request):
+            return HttpResponse(self.router.db_for_read(Course) or 'default')
+
+        self.assertEqual(self.view_database(report), db_router.REPLICA_ALIAS)
+        self.assertEqual(self.view_database(report, {db_router.STICKY_COOKIE: '1'}), 'default')
+
+    def test_use_replica_async_view_unless_sticky(self, configured):
+        @db_router.use_replica
+        async def report(request):
+            return HttpResponse(self.router.db_for_read(Course) or 'default')
+
+        view = async_to_sync(report)
+        self.assertEqual(self.view_database(view), db_router.REPLICA_ALIAS)
+        self.assertEqual(self.view_database(view, {db_router.STICKY_COOKIE: '1'}), 'default')
+
+    def sticky_cookie(self, method, status=200, async_mode=False):
+        if async_mode:
+            async def get_response(request):
+                return HttpResponse(status=status)
+            middleware = db_router.ReplicaStickinessMiddleware(get_response)
+            response = async_to_sync(middleware)(self.factory.generic(method, '/'))
+        else:
+            middleware = db_router.ReplicaStickinessMiddleware(lambda request: HttpResponse(status=status))
+            response = middleware(self.factory.generic(method, '/'))
+        return response.cookies.get(db_router.STICKY_COOKIE)
+
+    def test_writes_set_sticky_cookie(self, configured):
+        for async_mode in (False, True):
+            with self.subTest(async_mode=async_mode):
+                cookie = self.sticky_cookie('POST', async_mode=async_mode)
+                self.assertEqual(cookie['max-age'], db_router.REPLICA_STICKY_SECONDS)
+                self.assertIsNone(self.sticky_cookie('GET', async_mode=async_mode))
+                self.assertIsNone(self.sticky_cookie('POST', status=403, async_mode=async_mode))
+
+    def test_middleware_unused_without_replica(self, configured):
+        configured.return_value = False
+        with self.assertRaises(MiddlewareNotUsed):
+            db_router.ReplicaStickinessMiddleware(lambda request: HttpResponse())
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        slow_queries._drain()
+
+    def test_redact_params(self):
+        self.assertEqual(slow_queries.redact_params(['secret', 3, None, b'xy']), '<str:6>, <int>, NULL, <bytes:2>')
+        self.assertEqual(slow_queries.redact_params({'email': 'a@b.c'}), '<str:5>')
+        self.assertEqual(slow_queries.redact_params([(1,), (2,)], many=True), '<2 rows>')
+        self.assertEqual(slow_queries.redact_params(None), '')
+
+    def test_records_call_site_without_values(self):
+        with mock.patch.object(slow_queries, 'SLOW_QUERY_THRESHOLD_MS', 0):
+            with execute_wrapper(slow_queries.slow_query_recorder):
+                User.objects.filter(username='secret-name').exists()
+        [entry] = slow_queries._drain()
+        self.assertEqual(entry['params'], '<int>, <str:11>')
+        self.assertNotIn('secret-name', entry['fingerprint'])
+        self.assertTrue(entry['call_site'].startswith(os.path.join('core', 'tests.py') + ':'))
+        self.assertEqual(entry['function'], 'test_records_call_site_without_values')
+
+    def test_below_threshold_not_recorded(self):
+        with execute_wrapper(slow_queries.slow_query_recorder):
+            User.objects.exists()
+        self.assertEqual(slow_queries._drain(), [])
+
+    def test_aggregate(self):
+        rows = [('a', 'SELECT a', ms, 'v1', 'f', 'x.py:1') for ms in range(1, 101)]
+        rows += [('b', 'SELECT b', 500, 'v2', 'g', 'y.py:2'), ('a', 'SELECT a', 1, 'v3', 'h', 'z.py:3')]
+        first, second = slow_queries.aggregate_slow_queries(rows)
+        self.assertEqual(
+            (first['fingerprint_hash'], first['count'], first['p50'], first['p95'], first['p99'], first['max']),
+            ('a', 101, 50, 95, 99, 100),
+        )
+        self.assertEqual((first['view'], first['sources_count']), ('v1', 2))
+        self.assertEqual((second['fingerprint_hash'], second['total_ms']), ('b', 500))
+
+    def test_jsonl_flush_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.jsonl')
+            with mock.patch.object(slow_queries, 'SLOW_QUERY_LOG_FILE', path), \
+                    mock.patch.object(slow_queries, 'SLOW_QUERY_THRESHOLD_MS', 0):
+                with execute_wrapper(slow_queries.slow_query_recorder):
+                    User.objects.exists()
+                self.assertEqual(slow_queries.flush(force=True), 1)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write('{"broken\n')
+                rows, count, views = slow_queries.load_samples(timezone.now() - timedelta(minutes=1))
+                self.assertEqual(count, 1)
+                self.assertEqual(rows[0][-2], 'test_jsonl_flush_and_load')
+                rows, count, views = slow_queries.load_samples(timezone.now() + timedelta(minutes=1))
+                self.assertEqual(count, 0)
@@ -26,6 +26,9 @@ urlpatterns = [
     # APIs
     path('api/contact/', views.contact_api, name='contact_api'),
     path('api/newsletter/', views.newsletter_api, name='newsletter_api'),
+    
+    # أدوات فريق العمل
+    path('admin/slow-queries/', views.admin_slow_queries, name='admin_slow_queries'),
 ]
 
 # =================== Error Handlers ===================
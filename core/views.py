@@ -3,19 +3,24 @@
 # =========================
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count, Avg, F
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.conf import settings
+from datetime import timedelta
 
 from .models import (
     SiteSettings, ContactMessage, NewsletterSubscriber,
-    Testimonial, Partner, FAQ, Page, SiteFeature
+    Testimonial, Partner, FAQ, Page, SiteFeature, SlowQuery
 )
 from .forms import ContactForm, NewsletterForm, SubscriberForm, TestimonialForm, PageForm
+from .images import prefetch_manifests
+from .page_cache import cache_page_for_anonymous
 
 # ==================== تعريف كلاسات CSS ====================
 TAILWIND_INPUT = "w-full px-4 py-2 border border-gray-300 dark:border-gray-600 rounded-lg focus:ring-2 focus:ring-primary-500 focus:border-transparent dark:bg-gray-700 dark:text-white transition"
@@ -26,23 +31,23 @@ TAILWIND_CHECKBOX = "w-4 h-4 text-primary-600 border-gray-300 rounded focus:ring
 # ==================== دوال مساعدة ====================
 
 def get_site_stats():
-    """الحصول على إحصائيات الموقع"""
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    
+    """الحصول على إحصائيات الموقع (من كاش courses.platform_stats)"""
     # محاولة استيراد موديلات courses إذا كانت موجودة
     try:
-        from courses.models import Course, Lesson, Review
+        from courses.platform_stats import get_platform_stats
+        platform = get_platform_stats()
         stats = {
-            'students_count': User.objects.filter(role='user').count(),
-            'courses_count': Course.objects.filter(is_active=True).count(),
-            'instructors_count': User.objects.filter(role='instructor').count(),
-            'lessons_count': Lesson.objects.count(),
-            'reviews_count': Review.objects.count(),
-            'avg_rating': Review.objects.aggregate(avg=Avg('rating'))['avg'] or 0,
+            'students_count': platform['total_students'],
+            'courses_count': platform['total_courses'],
+            'instructors_count': platform['total_instructors'],
+            'lessons_count': platform['total_lessons'],
+            'reviews_count': platform['total_reviews'],
+            'avg_rating': platform['avg_rating'],
         }
     except (ImportError, ModuleNotFoundError):
         # إذا لم يكن تطبيق courses مثبتاً
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
         stats = {
             'students_count': User.objects.filter(role='user').count(),
             'courses_count': 0,
@@ -57,20 +62,20 @@ def get_site_stats():
 # ==================== الصفحات العامة ====================
 
 
+@cache_page_for_anonymous('courses.review')
 def home_view(request):
     """
     الصفحة الرئيسية
     """
     # محاولة استيراد موديلات courses إذا كانت موجودة
     try:
-        from courses.models import Course, Category, Review
-        from courses.services import CourseService
+        from courses.category_index import get_categories
+        from courses.models import Review
+        from courses.shelves import get_shelf
         
-        featured_courses = CourseService.get_featured_courses()[:6] if hasattr(CourseService, 'get_featured_courses') else Course.objects.filter(is_featured=True, is_active=True)[:6]
-        latest_courses = Course.objects.filter(is_active=True).order_by('-created_at')[:8]
-        categories = Category.objects.annotate(
-            course_count=Count('courses', filter=Q(courses__is_active=True))
-        )[:8]
+        featured_courses = SimpleLazyObject(lambda: get_shelf('featured', 6))
+        latest_courses = SimpleLazyObject(lambda: get_shelf('latest', 8))
+        categories = get_categories()[:8]
         testimonials_from_courses = Review.objects.select_related('user', 'course').order_by('-rating')[:3]
     except (ImportError, ModuleNotFoundError, AttributeError):
         featured_courses = []
@@ -90,6 +95,17 @@ def home_view(request):
     # إحصائيات سريعة
     stats = get_site_stats()
     
+    # manifests كل صور الصفحة باستعلام واحد بدلاً من استعلام لكل صورة
+    prefetch_manifests([
+        *(category.img_gat for category in categories),
+        *(
+            image
+            for course in [*featured_courses, *latest_courses]
+            for image in (course.image, course.instructor.avatar)
+        ),
+        *(partner.logo for partner in partners),
+    ])
+    
     # نموذج الاشتراك في النشرة البريدية
     from .forms import NewsletterForm
     newsletter_form = NewsletterForm()
@@ -115,6 +131,7 @@ def home_view(request):
 
 
 
+@cache_page_for_anonymous()
 def about_view(request):
     """
     صفحة من نحن - تعرض:
@@ -130,11 +147,12 @@ def about_view(request):
     team_members = User.objects.filter(role='instructor', is_active=True)[:8]
     
     # إحصائيات
+    site_stats = get_site_stats()
     stats = {
         'years_experience': 5,
-        'happy_students': User.objects.filter(role='user', is_active=True).count(),
-        'courses_count': get_site_stats()['courses_count'],
-        'certified_instructors': User.objects.filter(role='instructor', is_active=True).count(),
+        'happy_students': site_stats['students_count'],
+        'courses_count': site_stats['courses_count'],
+        'certified_instructors': site_stats['instructors_count'],
     }
     
     # شركاء الموقع
@@ -209,6 +227,7 @@ def contact_view(request):
     return render(request, 'core/contact.html', context)
 
 
+@cache_page_for_anonymous()
 def faq_view(request):
     """
     صفحة الأسئلة الشائعة - تعرض:
@@ -246,6 +265,14 @@ def faq_view(request):
     return render(request, 'core/faq.html', context)
 
 
+def _count_page_view(request, slug):
+    """زيادة مشاهدات الصفحة عند خدمتها من الكاش"""
+    Page.objects.filter(slug=slug, is_active=True, is_published=True).update(
+        views_count=F('views_count') + 1
+    )
+
+
+@cache_page_for_anonymous(on_hit=_count_page_view)
 def page_detail_view(request, slug):
     """
     عرض صفحة ثابتة (من نحن، سياسة الخصوصية، الشروط...)
@@ -297,13 +324,17 @@ def search_view(request):
         
         # البحث في الدورات (إذا كان تطبيق courses مثبتاً)
         try:
+            from courses.cards import get_cards
             from courses.models import Course
-            courses = Course.objects.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(short_description__icontains=search_query),
-                is_active=True
-            )[:10]
+            courses = get_cards(
+                Course.objects.filter(
+                    Q(title__icontains=search_query) |
+                    Q(description__icontains=search_query) |
+                    Q(short_description__icontains=search_query),
+                    is_active=True
+                )[:10],
+                with_counts=True,
+            )
         except (ImportError, ModuleNotFoundError):
             courses = []
         
@@ -505,6 +536,37 @@ def newsletter_api(request):
     
     return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
 
+# ==================== أدوات فريق العمل ====================
+
+@staff_member_required
+def admin_slow_queries(request):
+    """
+    الاستعلامات البطيئة مجمعة حسب البصمة مع p50/p95/p99
+    """
+    from .slow_queries import SLOW_QUERY_LOG_FILE, aggregate_slow_queries, flush, load_samples
+    
+    # إظهار ما في buffer العامل الحالي أيضاً
+    flush(force=True)
+    
+    try:
+        days = max(1, min(int(request.GET.get('days', 7)), 90))
+    except ValueError:
+        days = 7
+    view_name = request.GET.get('view', '')
+    
+    rows, total_samples, views = load_samples(timezone.now() - timedelta(days=days), view_name)
+    
+    context = {
+        'groups': aggregate_slow_queries(rows)[:100],
+        'total_samples': total_samples,
+        'views': views,
+        'days': days,
+        'view_name': view_name,
+        'log_file': SLOW_QUERY_LOG_FILE,
+    }
+    return render(request, 'admin/slow_queries.html', context)
+
+
 # ==================== معالجات الأخطاء ====================
 
 def handler404(request, exception):
@@ -3,13 +3,15 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 from rangefilter.filters import DateRangeFilter
 from import_export.admin import ImportExportModelAdmin
 from .models import (
     User, Category, Course, CourseModule, Lesson,
-    Favorite, Enrollment, LessonProgress, Review
+    Favorite, Enrollment, LessonProgress, Review, VideoJob, DiscountCampaign
 )
+from .video import stale_q
 
 # =========================
 # ADMIN ACTIONS
@@ -295,7 +297,7 @@ class CourseModuleAdmin(admin.ModelAdmin):
 class LessonAdmin(admin.ModelAdmin):
     list_display = [
         'title', 'module', 'order', 'duration_minutes', 
-        'is_free', 'get_course', 'video_type'
+        'is_free', 'get_course', 'video_type', 'video_status'
     ]
     list_filter = [
         'is_free', 'module__course',
@@ -327,10 +329,94 @@ class LessonAdmin(admin.ModelAdmin):
         return 'None'
     video_type.short_description = 'Type'
     
+    def video_status(self, obj):
+        if obj.hls_manifest:
+            return format_html('<span style="color: green;">HLS ready</span>')
+        if not obj.video_file:
+            return '-'
+        job = obj.video_jobs.first()
+        if job is None:
+            return 'Not queued'
+        url = reverse('admin:courses_videojob_change', args=[job.pk])
+        return format_html('<a href="{}">{}</a>', url, job.get_status_display())
+    video_status.short_description = 'Video'
+    
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'module__course'
+        ).prefetch_related('video_jobs')
+
+# =========================
+# VIDEO JOB ADMIN
+# =========================
+@admin.action(description='Retry selected jobs')
+def retry_video_jobs(modeladmin, request, queryset):
+    # المهام قيد المعالجة فعلاً تُترك، والمتوقفة منها (تجاوزت المهلة) تُعاد
+    count = queryset.filter(~Q(status='processing') | stale_q()).update(status='pending', error='')
+    modeladmin.message_user(request, f'{count} jobs queued again')
+
+@admin.register(VideoJob)
+class VideoJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'lesson', 'status_badge', 'resolution', 'duration_display',
+        'attempts', 'created_at', 'finished_at'
+    ]
+    list_filter = ['status', ('created_at', DateRangeFilter)]
+    search_fields = ['lesson__title', 'source']
+    list_select_related = ['lesson']
+    actions = [retry_video_jobs]
+    list_per_page = 25
+    
+    readonly_fields = [
+        'lesson', 'source', 'status', 'duration_seconds', 'width', 'height',
+        'renditions', 'manifest', 'error', 'attempts',
+        'created_at', 'started_at', 'finished_at'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def status_badge(self, obj):
+        colors = {
+            'pending': 'gray',
+            'processing': 'orange',
+            'ready': 'green',
+            'failed': 'red',
+        }
+        return format_html(
+            '<span style="color: {};">{}</span>',
+            colors.get(obj.status, 'black'), obj.get_status_display()
         )
+    status_badge.short_description = 'Status'
+    status_badge.admin_order_field = 'status'
+    
+    def resolution(self, obj):
+        if obj.width and obj.height:
+            return f'{obj.width}x{obj.height}'
+        return '-'
+    resolution.short_description = 'Source'
+    
+    def duration_display(self, obj):
+        if obj.duration_seconds:
+            minutes, seconds = divmod(int(obj.duration_seconds), 60)
+            return f'{minutes}:{seconds:02d}'
+        return '-'
+    duration_display.short_description = 'Duration'
+
+# =========================
+# DISCOUNT CAMPAIGN ADMIN
+# =========================
+@admin.register(DiscountCampaign)
+class DiscountCampaignAdmin(admin.ModelAdmin):
+    list_display = [
+        'name', 'discount_percent', 'category', 'instructor',
+        'start_date', 'end_date', 'is_active', 'applied_at', 'ended_at'
+    ]
+    list_filter = ['is_active', 'category', ('start_date', DateRangeFilter)]
+    search_fields = ['name', 'category__name', 'instructor__username']
+    list_select_related = ['category', 'instructor']
+    readonly_fields = ['applied_at', 'ended_at', 'created_at']
+    autocomplete_fields = ['instructor']
 
 # =========================
 # ENROLLMENT ADMIN
@@ -430,7 +516,7 @@ class LessonProgressAdmin(admin.ModelAdmin):
 class ReviewAdmin(ImportExportModelAdmin):
     list_display = [
         'user', 'course', 'rating', 'comment_short', 
-        'created_at_date'
+        'helpful_count', 'created_at_date'
     ]
     list_filter = [
         'rating', 'created_at', 'course'
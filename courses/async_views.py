@@ -0,0 +1,300 @@
+"""
+نسخ async من الـ endpoints الصغيرة كثيرة الاستدعاء (AJAX و polling)
+
+تعمل على ASGI (mysite/asgi.py) دون حجز عامل sync كامل لكل طلب، وتعمل
+أيضاً على WSGI عبر التحويل التلقائي في Django. الاستعلامات المستقلة
+تُنفذ بـ asyncio.gather، والإحصائيات تُجمع في استعلام aggregate واحد لكل
+جدول بدلاً من count() منفصل لكل رقم.
+"""
+import asyncio
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.db.models import Avg, Count, Q, Sum
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.timesince import timesince
+
+from core.db_router import use_replica
+
+from . import lesson_search, review_feed, typeahead
+from .models import Course, CourseModule, Enrollment, Lesson, LessonProgress, Review
+from .services import FavoriteService
+
+User = get_user_model()
+
+
+# ==================== السلة ====================
+
+async def cart_count(request):
+    """إرجاع عدد العناصر في السلة (لطلبات AJAX)"""
+    cart = await request.session.aget('cart', [])
+    return JsonResponse({
+        'count': len(cart),
+        'status': 'success'
+    })
+
+
+# ==================== API-like Views (AJAX) ====================
+
+@login_required
+async def ajax_toggle_favorite(request):
+    """API لتبديل حالة المفضلة"""
+    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        course = await aget_object_or_404(Course, id=request.POST.get('course_id'))
+        user = await request.auser()
+
+        is_favorite, message = await FavoriteService.atoggle_favorite(user, course)
+
+        return JsonResponse({
+            'status': 'success',
+            'is_favorite': is_favorite,
+            'message': message
+        })
+
+    return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
+
+
+@login_required
+async def ajax_update_lesson_progress(request):
+    """API لتحديث تقدم الدرس (heartbeat أثناء المشاهدة)"""
+    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        position = request.POST.get('position', 0)
+        lesson = await aget_object_or_404(
+            Lesson.objects.select_related('module').only('id', 'module__course_id'),
+            id=request.POST.get('lesson_id'),
+        )
+        user = await request.auser()
+        enrollment = await Enrollment.objects.filter(
+            user=user,
+            course_id=lesson.module.course_id,
+            status='enrolled'
+        ).afirst()
+
+        if enrollment:
+            await LessonProgress.objects.aupdate_or_create(
+                enrollment=enrollment,
+                lesson=lesson,
+                defaults={'last_watched_position': position},
+            )
+            return JsonResponse({
+                'status': 'success',
+                'position': position
+            })
+
+    return JsonResponse({'status': 'error'}, status=400)
+
+
+@login_required
+async def ajax_get_course_stats(request, course_id):
+    """API للحصول على إحصائيات الدورة"""
+    course = await aget_object_or_404(Course.objects.only('id', 'rating'), id=course_id)
+
+    total_students, total_reviews, total_lessons, total_modules = await asyncio.gather(
+        Enrollment.objects.filter(course_id=course.id, status='enrolled').acount(),
+        Review.objects.filter(course_id=course.id).acount(),
+        Lesson.objects.filter(module__course_id=course.id).acount(),
+        CourseModule.objects.filter(course_id=course.id).acount(),
+    )
+
+    return JsonResponse({
+        'total_students': total_students,
+        'total_reviews': total_reviews,
+        'avg_rating': float(course.rating),
+        'total_lessons': total_lessons,
+        'total_modules': total_modules,
+    })
+
+
+# ==================== البحث الفوري ====================
+
+async def ajax_search_suggestions(request):
+    """اقتراحات البحث الفوري (دورات، مدربون، تصنيفات) من فهرس البادئات"""
+    query = request.GET.get('q', '')[:100]
+    results = await typeahead.asuggest(query)
+
+    response = JsonResponse({
+        'query': query,
+        'courses': results.get('course', []),
+        'instructors': results.get('instructor', []),
+        'categories': results.get('category', []),
+    })
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+@login_required
+async def ajax_search_lessons(request, course_id):
+    """البحث في دروس الدورة (المسجلون والمدرب يرون كل الدروس، غيرهم المجانية فقط)"""
+    course = await aget_object_or_404(Course.objects.only('id', 'instructor_id'), id=course_id, is_active=True)
+    user = await request.auser()
+    query = request.GET.get('q', '')[:100]
+
+    full_access = user.is_admin_user() or user.pk == course.instructor_id
+    if not full_access:
+        enrollment = await Enrollment.objects.filter(user=user, course_id=course.id, status='enrolled').afirst()
+        full_access = bool(enrollment and enrollment.has_access)
+
+    results = await lesson_search.asearch(course.id, query, full_access)
+    return JsonResponse({
+        'query': query,
+        'count': len(results),
+        'results': results,
+    })
+
+
+async def ajax_course_reviews(request, course_id):
+    """
+    تقييمات الدورة على دفعات
+    ?sort=newest|helpful&rating=5,4&cursor=...&limit=10
+    """
+    course = await aget_object_or_404(Course.objects.only('id'), id=course_id, is_active=True)
+    sort = request.GET.get('sort', 'newest')
+    if sort not in review_feed.SORTS:
+        sort = 'newest'
+    ratings = sorted({
+        int(value) for value in request.GET.get('rating', '').split(',')
+        if value.strip() in ('1', '2', '3', '4', '5')
+    })
+    try:
+        limit = min(max(int(request.GET.get('limit', review_feed.PAGE_SIZE)), 1), review_feed.MAX_PAGE_SIZE)
+    except ValueError:
+        limit = review_feed.PAGE_SIZE
+
+    try:
+        data = await review_feed.apage_data(course.id, sort, ratings, request.GET.get('cursor') or None, limit)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    response = JsonResponse(data)
+    # نفس النتائج لكل الزوار
+    patch_cache_control(response, public=True, max_age=30)
+    return response
+
+
+@login_required
+async def ajax_review_helpful(request, review_id):
+    """تبديل تصويت "مفيد" على تقييم"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
+
+    review = await aget_object_or_404(Review.objects.only('id', 'user_id'), id=review_id)
+    user = await request.auser()
+    if review.user_id == user.pk:
+        return JsonResponse({'status': 'error', 'message': 'لا يمكنك التصويت على تقييمك'}, status=400)
+
+    voted, helpful_count = await review_feed.atoggle_helpful(user, review)
+    return JsonResponse({
+        'status': 'success',
+        'voted': voted,
+        'helpful_count': helpful_count,
+    })
+
+
+# ==================== AJAX Helpers ====================
+
+@login_required
+@use_replica
+async def ajax_get_dashboard_stats(request):
+    """API للحصول على إحصائيات لوحة التحكم"""
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        days = 30
+    start_date = timezone.now() - timedelta(days=days)
+
+    users, courses, enrollments, reviews = await asyncio.gather(
+        User.objects.aaggregate(
+            total=Count('id'),
+            new=Count('id', filter=Q(date_joined__gte=start_date)),
+            students=Count('id', filter=Q(role='user')),
+            instructors=Count('id', filter=Q(role='instructor')),
+            admins=Count('id', filter=Q(role='admin')),
+        ),
+        Course.objects.aaggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            featured=Count('id', filter=Q(is_featured=True)),
+            new=Count('id', filter=Q(created_at__gte=start_date)),
+        ),
+        Enrollment.objects.aaggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            enrolled=Count('id', filter=Q(status='enrolled')),
+            completed=Count('id', filter=Q(status='completed')),
+            new=Count('id', filter=Q(enrolled_at__gte=start_date)),
+            revenue_total=Sum('course__price', filter=Q(status='enrolled')),
+            revenue_period=Sum('course__price', filter=Q(status='enrolled', enrolled_at__gte=start_date)),
+        ),
+        Review.objects.aaggregate(
+            total=Count('id'),
+            avg_rating=Avg('rating'),
+            new=Count('id', filter=Q(created_at__gte=start_date)),
+        ),
+    )
+
+    revenue = {
+        'total': enrollments.pop('revenue_total') or 0,
+        'period': enrollments.pop('revenue_period') or 0,
+    }
+    reviews['avg_rating'] = reviews['avg_rating'] or 0
+
+    return JsonResponse({
+        'users': users,
+        'courses': courses,
+        'enrollments': enrollments,
+        'reviews': reviews,
+        'revenue': revenue,
+    })
+
+
+@login_required
+async def ajax_get_recent_activities(request):
+    """API للحصول على أحدث الأنشطة"""
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    async def latest(queryset):
+        return [obj async for obj in queryset.select_related('user', 'course')[:5]]
+
+    enrollments, reviews = await asyncio.gather(
+        latest(Enrollment.objects.order_by('-enrolled_at')),
+        latest(Review.objects.order_by('-created_at')),
+    )
+
+    activities = []
+    for enrollment in enrollments:
+        activities.append({
+            'type': 'enrollment',
+            'user': enrollment.user.get_full_name() or enrollment.user.username,
+            'course': enrollment.course.title,
+            'time': enrollment.enrolled_at.isoformat(),
+            'time_ago': timesince(enrollment.enrolled_at),
+            'icon': 'user-plus',
+            'color': 'green'
+        })
+
+    for review in reviews:
+        activities.append({
+            'type': 'review',
+            'user': review.user.get_full_name() or review.user.username,
+            'course': review.course.title,
+            'rating': review.rating,
+            'time': review.created_at.isoformat(),
+            'time_ago': timesince(review.created_at),
+            'icon': 'star',
+            'color': 'yellow'
+        })
+
+    # Sort by time
+    activities.sort(key=lambda x: x['time'], reverse=True)
+
+    return JsonResponse({
+        'activities': activities[:10]
+    })
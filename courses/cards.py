@@ -0,0 +1,143 @@
+"""
+بطاقة دورة مختصرة (CourseCard) لعرض القوائم والشبكات
+
+تُبنى من projection واحد (values) يحمل حقول البطاقة فقط مع اسم التصنيف
+وبيانات المدرب، بدلاً من كائنات Course كاملة (الوصف الكامل، حقول
+الفيديو، ...). الكائنات تستخدم __slots__ وحالة الخصم والسعر الفعلي
+تُحسب مرة واحدة عند الإنشاء.
+
+واجهتها في القوالب مثل Course لحقول البطاقة: course.category.name،
+course.instructor.get_full_name، course.get_level_display،
+course.has_discount، course.discounted_price ...
+
+الصفوف (dict) قابلة للتخزين في الكاش كما هي (courses.shelves).
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Left
+
+from core.images import prefetch_manifests
+
+from .models import Course, Lesson, Review
+
+DESCRIPTION_EXCERPT = 200
+
+CARD_FIELDS = (
+    'id', 'slug', 'title', 'short_description', 'image', 'level',
+    'duration_hours', 'is_featured', 'price', 'discount_percent',
+    'discount_start_date', 'discount_end_date', 'rating', 'students_count',
+)
+CATEGORY_FIELDS = ('id', 'name', 'slug')
+INSTRUCTOR_FIELDS = ('id', 'username', 'first_name', 'last_name', 'avatar')
+
+LEVELS = dict(Course.LEVEL_CHOICES)
+
+
+def _count_subquery(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field)
+        .annotate(total=Count('*')).values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def card_values(queryset, with_counts=False):
+    """
+    queryset دورات ← queryset صفوف البطاقات (dict).
+    with_counts: إضافة lessons_count و reviews_count (subquery لكل صف معروض)
+    """
+    fields = [
+        *CARD_FIELDS, 'description_excerpt',
+        *(f'category__{field}' for field in CATEGORY_FIELDS),
+        *(f'instructor__{field}' for field in INSTRUCTOR_FIELDS),
+    ]
+    queryset = queryset.prefetch_related(None).annotate(
+        description_excerpt=Left('description', DESCRIPTION_EXCERPT),
+    )
+    if with_counts:
+        queryset = queryset.annotate(
+            lessons_count=_count_subquery(Lesson, 'module__course'),
+            reviews_count=_count_subquery(Review, 'course'),
+        )
+        fields += ['lessons_count', 'reviews_count']
+    return queryset.values(*fields)
+
+
+class CardCategory:
+    __slots__ = CATEGORY_FIELDS
+
+    def __init__(self, id, name, slug):
+        self.id = id
+        self.name = name
+        self.slug = slug
+
+    def __str__(self):
+        return self.name
+
+
+class CardInstructor:
+    __slots__ = INSTRUCTOR_FIELDS
+
+    def __init__(self, id, username, first_name, last_name, avatar):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+        # اسم الملف (وسوم image_tags تقبل المسار النصي)
+        self.avatar = avatar
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def __str__(self):
+        return self.get_full_name() or self.username
+
+
+class CourseCard:
+    __slots__ = CARD_FIELDS + (
+        'description', 'category', 'instructor', 'lessons_count',
+        'reviews_count', 'has_discount', 'effective_price', 'discount_ends_in',
+    )
+
+    def __init__(self, row):
+        for field in CARD_FIELDS:
+            setattr(self, field, row[field])
+        self.description = row['description_excerpt']
+        self.category = CardCategory(*(row[f'category__{field}'] for field in CATEGORY_FIELDS))
+        self.instructor = CardInstructor(*(row[f'instructor__{field}'] for field in INSTRUCTOR_FIELDS))
+        self.lessons_count = row.get('lessons_count')
+        self.reviews_count = row.get('reviews_count')
+
+        # نفس قواعد Course (مصدر واحد للحساب) مرة واحدة لكل بطاقة
+        self.has_discount = bool(Course.has_discount.fget(self))
+        self.effective_price = Course.discounted_price.fget(self)
+        self.discount_ends_in = Course.discount_ends_in.fget(self)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def discounted_price(self):
+        return self.effective_price
+
+    def get_level_display(self):
+        return LEVELS.get(self.level, self.level)
+
+    def get_lessons_count(self):
+        return self.lessons_count
+
+    def __str__(self):
+        return self.title
+
+
+def to_cards(rows):
+    """بطاقات الصفوف مع تحميل manifests صورها دفعة واحدة (بدلاً من استعلام لكل بطاقة)"""
+    cards = [CourseCard(row) for row in rows]
+    prefetch_manifests(card.image for card in cards)
+    return cards
+
+
+def get_cards(queryset, with_counts=False):
+    """بطاقات دورات queryset (مع الترتيب والتقطيع المطبقين عليه)"""
+    return to_cards(card_values(queryset, with_counts=with_counts))
@@ -0,0 +1,77 @@
+"""
+فهرس التصنيفات في الكاش (الاسم، الـ slug، الأيقونة، الصورة وعدد الدورات)
+
+يُبنى باستعلام واحد ويُحذف من الكاش عند تغيّر تصنيف أو تغيّر حالة تفعيل
+دورة أو تصنيفها (courses.signals)، مع مدة صلاحية محدودة كشبكة أمان إذا
+لم يكن الكاش مشتركاً بين العمال. يحتوي أيضاً على خريطة
+slug ← id حتى تصبح فلترة الكتالوج بالتصنيف بحثاً على category_id.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+CACHE_KEY = 'courses:category-index'
+CATEGORY_INDEX_TIMEOUT = getattr(settings, 'CATEGORY_INDEX_TIMEOUT', 600)
+
+
+def build_index():
+    """بناء الفهرس من قاعدة البيانات"""
+    from .models import Category
+
+    rows = list(
+        Category.objects.annotate(
+            course_count=Count('courses', filter=Q(courses__is_active=True)),
+            courses_count=Count('courses'),
+        ).values('id', 'name', 'slug', 'icon', 'img_gat', 'parent_id', 'course_count', 'courses_count')
+    )
+    return {
+        'categories': rows,
+        'slugs': {row['slug']: row['id'] for row in rows},
+    }
+
+
+def get_index():
+    index = cache.get(CACHE_KEY)
+    if index is None:
+        index = build_index()
+        cache.set(CACHE_KEY, index, CATEGORY_INDEX_TIMEOUT)
+    return index
+
+
+def invalidate():
+    """حذف الفهرس بعد نجاح الـ transaction الحالية"""
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def get_categories(with_courses=False, order_by=None):
+    """
+    التصنيفات ككائنات Category (غير محفوظة) تحمل course_count (الدورات
+    النشطة) و courses_count (كل الدورات) بدون استعلامات.
+    order_by: اسم حقل مثل '-course_count'
+    """
+    from .models import Category
+
+    rows = get_index()['categories']
+    if with_courses:
+        rows = [row for row in rows if row['course_count'] > 0]
+    if order_by:
+        field = order_by.lstrip('-')
+        rows = sorted(rows, key=lambda row: row[field], reverse=order_by.startswith('-'))
+
+    categories = []
+    for row in rows:
+        values = dict(row)
+        course_count = values.pop('course_count')
+        courses_count = values.pop('courses_count')
+        category = Category(**values)
+        category._state.adding = False
+        category._state.db = 'default'
+        category.course_count = course_count
+        category.courses_count = courses_count
+        categories.append(category)
+    return categories
+
+
+def category_id_for_slug(slug):
+    return get_index()['slugs'].get(slug)
@@ -1,5 +1,6 @@
 from .models import *
 from django.db.models import Count
+from django.utils.functional import SimpleLazyObject
 
 def site_settings(request):
     """
@@ -17,12 +18,13 @@ def categories_processor(request):
     """
     عرض التصنيفات في جميع الصفحات
     """
-    categories = Category.objects.annotate(
-        course_count=Count('courses', filter=models.Q(courses__is_active=True))
-    ).filter(course_count__gt=0)
+    from .category_index import get_categories
+    
+    # lazy: فهرس التصنيفات يُقرأ من الكاش فقط إذا استخدمه القالب
+    categories = SimpleLazyObject(lambda: get_categories(with_courses=True))
     
     return {
-        'nav_categories': categories[:10],  # آخر 10 تصنيفات للقائمة
+        'nav_categories': SimpleLazyObject(lambda: categories[:10]),  # أول 10 تصنيفات للقائمة
         'all_categories': categories,
     }
 
@@ -30,13 +32,11 @@ def featured_courses_processor(request):
     """
     عرض الدورات المميزة
     """
-    featured_courses = Course.objects.filter(
-        is_active=True, 
-        is_featured=True
-    ).select_related('category', 'instructor')[:6]
+    from .shelves import get_shelf
     
+    # lazy: الرف يُقرأ من الكاش فقط إذا عرضه القالب
     return {
-        'featured_courses': featured_courses,
+        'featured_courses': SimpleLazyObject(lambda: get_shelf('featured', 6)),
     }
 
 def user_data_processor(request):
@@ -68,19 +68,13 @@ def user_data_processor(request):
 
 def stats_processor(request):
     """
-    إحصائيات عامة
+    إحصائيات عامة (من الكاش، انظر courses.platform_stats)
     """
-    from django.db.models import Count, Avg
-    
-    stats = {
-        'total_courses': Course.objects.filter(is_active=True).count(),
-        'total_students': User.objects.filter(role='user').count(),
-        'total_instructors': User.objects.filter(role='instructor').count(),
-        'total_enrollments': Enrollment.objects.filter(status='enrolled').count(),
-    }
+    from .platform_stats import get_platform_stats
     
+    # ✅ lazy: الكاش يُقرأ فقط إذا استخدم القالب site_stats
     return {
-        'site_stats': stats,
+        'site_stats': SimpleLazyObject(get_platform_stats),
     }
 
 def breadcrumbs_processor(request):
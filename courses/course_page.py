@@ -0,0 +1,124 @@
+"""
+صفحة تفاصيل الدورة: جزء عام مشترك + طبقة خاصة بالمستخدم
+
+- get_public_context(): ما يراه كل الزوار (المنهج بالوحدات والدروس،
+  الإحصائيات، الدورات المشابهة، أول صفحة من التقييمات) محفوظ في الكاش
+  لكل دورة ولغة. رقم إصدار لكل دورة يُرفع عند تغيير الدورة أو وحداتها أو
+  دروسها أو تقييماتها أو تسجيلاتها (courses.signals)، والدورات المشابهة
+  تتجدد بانتهاء COURSE_PAGE_CACHE_TIMEOUT.
+- get_user_context(): حالة المستخدم (المفضلة، التسجيل، طلب الشراء المعلق،
+  تقييمه) من استعلام واحد، مع جلب التسجيل أو التقييم فقط إذا وُجدا.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
+from django.utils.translation import get_language
+
+CACHE_PREFIX = 'courses:page:'
+COURSE_PAGE_CACHE_TIMEOUT = getattr(settings, 'COURSE_PAGE_CACHE_TIMEOUT', 300)
+
+# حقول الدروس المعروضة في المنهج (بدون المحتوى وحقول الفيديو)
+LESSON_FIELDS = ('id', 'module_id', 'title', 'order', 'is_free', 'duration_minutes')
+
+
+def _version_key(course_id):
+    return f'{CACHE_PREFIX}version:{course_id}'
+
+
+# ==================== الجزء العام ====================
+
+def build_public_context(course):
+    """بيانات الصفحة المشتركة بين كل الزوار"""
+    from . import review_feed
+    from .models import Lesson
+    from .services import CourseService
+
+    modules = list(
+        course.modules.prefetch_related(
+            Prefetch('lessons', queryset=Lesson.objects.only(*LESSON_FIELDS)),
+        )
+    )
+    for module in modules:
+        # بدلاً من get_total_duration (استعلام لكل وحدة)
+        module.total_duration = sum(lesson.duration_minutes for lesson in module.lessons.all())
+
+    # أول صفحة من التقييمات، والباقي من /ajax/course-reviews/ عند الطلب
+    reviews, reviews_cursor = review_feed.get_page(course.pk)
+    histogram = review_feed.rating_histogram(course.pk)
+
+    return {
+        'modules': modules,
+        'reviews': reviews,
+        'reviews_cursor': reviews_cursor,
+        'rating_rows': [
+            {
+                'stars': stars,
+                'count': histogram['counts'][stars],
+                'percent': round(histogram['counts'][stars] * 100 / histogram['total']) if histogram['total'] else 0,
+            }
+            for stars in range(5, 0, -1)
+        ],
+        'related_courses': CourseService.get_related_courses(course),
+        'total_students': course.enrollments.filter(status='enrolled').count(),
+        'total_reviews': histogram['total'],
+        'total_modules': len(modules),
+        'total_lessons': sum(len(module.lessons.all()) for module in modules),
+        'instructor_courses_count': course.instructor.courses_taught.count(),
+    }
+
+
+def get_public_context(course):
+    version = cache.get_or_set(_version_key(course.pk), time.time_ns, timeout=None)
+    key = f'{CACHE_PREFIX}{course.pk}:{get_language() or ""}:{version}'
+    context = cache.get(key)
+    if context is None:
+        context = build_public_context(course)
+        cache.set(key, context, COURSE_PAGE_CACHE_TIMEOUT)
+    return context
+
+
+def invalidate(course_id):
+    """رفع إصدار الدورة بعد نجاح الـ transaction الحالية"""
+    def run():
+        try:
+            cache.incr(_version_key(course_id))
+        except ValueError:
+            pass
+
+    transaction.on_commit(run)
+
+
+# ==================== طبقة المستخدم ====================
+
+def get_user_context(user, course):
+    """حالة المستخدم في الدورة (للمستخدم المسجل الدخول)"""
+    from .models import Course, Enrollment, Favorite, LessonProgress, Order, Review
+
+    state = Course.objects.filter(pk=course.pk).annotate(
+        is_favorite=Exists(Favorite.objects.filter(user=user, course=OuterRef('pk'))),
+        has_pending_order=Exists(
+            Order.objects.filter(user=user, items__course=OuterRef('pk'), status='pending')
+        ),
+        enrollment_id=Subquery(Enrollment.objects.filter(user=user, course=OuterRef('pk')).values('pk')[:1]),
+        review_id=Subquery(Review.objects.filter(user=user, course=OuterRef('pk')).values('pk')[:1]),
+    ).values('is_favorite', 'has_pending_order', 'enrollment_id', 'review_id').get()
+
+    enrollment = Enrollment.objects.get(pk=state['enrollment_id']) if state['enrollment_id'] else None
+    is_enrolled = enrollment is not None and enrollment.status == 'enrolled'
+
+    context = {
+        'is_favorite': state['is_favorite'],
+        'has_pending_order': state['has_pending_order'],
+        'existing_enrollment': enrollment,
+        'is_enrolled': is_enrolled,
+        'user_review': Review.objects.get(pk=state['review_id']) if state['review_id'] else None,
+    }
+    if is_enrolled:
+        context['enrollment'] = enrollment
+        context['lesson_progress'] = LessonProgress.objects.filter(
+            enrollment=enrollment
+        ).select_related('lesson')
+    return context
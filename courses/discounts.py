@@ -0,0 +1,163 @@
+"""
+محرك الخصومات: السعر الفعلي كتعبير SQL وجدولة نوافذ الخصم بالجملة
+
+- CourseQuerySet.with_effective_price() يضيف is_discount_active و
+  effective_price لكل صف، فيمكن الفلترة والترتيب وجمع السعر الذي يدفعه
+  المستخدم فعلاً داخل قاعدة البيانات. خصائص Course (has_discount،
+  discounted_price) تقرأ هذه القيم إن وُجدت بدلاً من timezone.now().
+- run_discount_schedule() (python manage.py apply_discounts) يطبق حملات
+  الخصم (DiscountCampaign) التي بدأت على دورات تصنيف أو مدرب، ويزيل
+  الحملات المنتهية، ثم يزامن is_discounted لكل الدورات بأمر UPDATE واحد.
+  الدورات التي لها نافذة خصم يدوية (بدون حملة) لم تنته لا تمسها الحملات،
+  فلا يُستبدل الخصم اليدوي ولا يُصفر عند انتهاء الحملة.
+"""
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+CENT = Decimal('0.01')
+
+
+class PriceField(models.DecimalField):
+    """
+    DecimalField للأسعار المحسوبة: SQLite يرجع ROUND() كعدد عشري (float)
+    فيصل Decimal('424.150000000000')؛ التقريب لخانتين عند القراءة
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', 10)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(**kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).quantize(CENT)
+
+
+def discount_active_q(now=None):
+    """شرط الخصم الساري الآن"""
+    now = now or timezone.now()
+    return Q(discount_percent__gt=0, discount_start_date__lte=now, discount_end_date__gte=now)
+
+
+def discount_inactive_q(now=None):
+    """عكس discount_active_q مع الحقول الفارغة (NOT مع NULL لا يطابق في SQL)"""
+    now = now or timezone.now()
+    return (
+        Q(discount_percent__lte=0) |
+        Q(discount_start_date__isnull=True) | Q(discount_end_date__isnull=True) |
+        Q(discount_start_date__gt=now) | Q(discount_end_date__lt=now)
+    )
+
+
+def effective_price_expression(now=None):
+    """السعر بعد الخصم الساري (أو السعر الأصلي)"""
+    # القسمة على 100.0 حتى لا تكون قسمة أعداد صحيحة في SQLite
+    discounted = Round(
+        ExpressionWrapper(
+            F('price') * (Value(100) - F('discount_percent')) / Value(100.0),
+            output_field=PriceField(),
+        ),
+        2,
+    )
+    return Case(
+        When(discount_active_q(now), then=discounted),
+        default=F('price'),
+        output_field=PriceField(),
+    )
+
+
+def manual_discount_q(now=None):
+    """نافذة خصم يدوية (بدون حملة) سارية أو قادمة"""
+    now = now or timezone.now()
+    return Q(discount_campaign__isnull=True, discount_percent__gt=0, discount_end_date__gte=now)
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_effective_price(self, now=None):
+        """إضافة is_discount_active و effective_price (قابلة للفلترة والترتيب)"""
+        now = now or timezone.now()
+        return self.annotate(
+            is_discount_active=Case(
+                When(discount_active_q(now), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+            effective_price=effective_price_expression(now),
+        )
+
+    def discounted(self, now=None):
+        return self.filter(discount_active_q(now))
+
+
+# ==================== الجدولة ====================
+
+def run_discount_schedule(now=None):
+    """
+    تطبيق/إنهاء الحملات ومزامنة is_discounted.
+    يرجع عدد الدورات المتأثرة بكل خطوة.
+    """
+    from . import facets, shelves
+    from .models import Course, DiscountCampaign
+
+    now = now or timezone.now()
+    result = {'started': 0, 'ended': 0, 'flagged': 0}
+
+    with transaction.atomic():
+        # حملات انتهت أو أُوقفت: إزالة خصمها من كل دوراتها بأمر واحد
+        # (الدورات التي عليها خصم يدوي لا تُربط بحملة أصلاً)
+        ending = DiscountCampaign.objects.filter(
+            Q(end_date__lte=now) | Q(is_active=False),
+            applied_at__isnull=False, ended_at__isnull=True,
+        )
+        result['ended'] = Course.objects.filter(discount_campaign__in=ending).update(
+            discount_percent=0,
+            discount_start_date=None,
+            discount_end_date=None,
+            discount_campaign=None,
+        )
+        ending.update(ended_at=now)
+
+        # الحملات السارية: UPDATE واحد لكل حملة على الدورات في نطاقها، بما فيها
+        # الحملات المطبقة سابقاً (دورات تحررت من حملة أكبر انتهت للتو)،
+        # بدون استبدال خصم يدوي أو خصم حملة سارٍ أكبر منها
+        running = DiscountCampaign.objects.filter(
+            is_active=True, ended_at__isnull=True,
+            start_date__lte=now, end_date__gt=now,
+        ).order_by('-discount_percent', 'pk')
+        for campaign in running:
+            result['started'] += campaign.courses_in_scope().exclude(
+                manual_discount_q(now),
+            ).exclude(
+                discount_active_q(now), discount_percent__gte=campaign.discount_percent,
+            ).update(
+                discount_percent=campaign.discount_percent,
+                discount_start_date=campaign.start_date,
+                discount_end_date=campaign.end_date,
+                discount_campaign=campaign,
+            )
+        running.filter(applied_at__isnull=True).update(applied_at=now)
+
+        # بداية/نهاية نوافذ الخصم: أمر UPDATE واحد لكل الدورات التي تغيرت حالتها
+        result['flagged'] = Course.objects.filter(
+            Q(discount_active_q(now), is_discounted=False) |
+            Q(discount_inactive_q(now), is_discounted=True)
+        ).update(
+            is_discounted=Case(
+                When(discount_active_q(now), then=Value(True)),
+                default=Value(False),
+            ),
+        )
+
+        if any(result.values()):
+            # update() لا يطلق الإشارات: إبطال ما يعرض الأسعار يدوياً
+            from core.page_cache import invalidate_tags, model_tag
+            shelves.invalidate()
+            facets.invalidate()
+            transaction.on_commit(lambda: invalidate_tags(model_tag(Course)))
+
+    return result
@@ -0,0 +1,223 @@
+"""
+فلترة الكتالوج مع أعداد الأوجه (facets) تحت الفلاتر الحالية
+
+كل أعداد الأوجه (التصنيف، المستوى، مجاني/مدفوع، شرائح السعر، شرائح
+التقييم، وجود خصم) تُحسب باستعلام aggregate واحد بعدّ شرطي: عدد كل خيار
+يطبق كل الفلاتر الحالية ما عدا فلتر وجهه نفسه، فيرى المستخدم كم نتيجة
+سيحصل عليها لو غير ذلك الخيار.
+
+النتيجة تُخزن في الكاش لكل مجموعة فلاتر موحدة (FACETS_CACHE_TIMEOUT)،
+وتُبطل كلها برفع رقم الإصدار عند تغير دورة أو تصنيف (courses.signals).
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .category_index import category_id_for_slug, get_categories
+from .discounts import discount_active_q
+
+CACHE_PREFIX = 'courses:facets:'
+VERSION_KEY = CACHE_PREFIX + 'version'
+FACETS_CACHE_TIMEOUT = getattr(settings, 'FACETS_CACHE_TIMEOUT', 300)
+
+PRICE_TYPES = (
+    ('free', 'مجانية'),
+    ('paid', 'مدفوعة'),
+)
+
+# شرائح السعر الفعلي بعد الخصم: المفتاح: (الاسم، أقل سعر، أعلى سعر غير شامل)
+PRICE_RANGES = {
+    '0-50': ('أقل من 50', 0, 50),
+    '50-100': ('50 - 100', 50, 100),
+    '100-200': ('100 - 200', 100, 200),
+    '200+': ('200 فأكثر', 200, None),
+}
+
+RATING_BANDS = (
+    ('4', '٤ نجوم فأكثر'),
+    ('3', '٣ نجوم فأكثر'),
+    ('2', 'نجمتين فأكثر'),
+)
+
+# الأوجه التي لها أعداد (كل وجه يتجاهل فلتره عند حساب أعداده)
+FACETS = ('category', 'level', 'price_type', 'price_range', 'rating', 'discount')
+
+
+def _decimal(value):
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def normalize_filters(params):
+    """
+    استخراج الفلاتر الصالحة فقط من GET وتوحيدها
+    (القيم الفارغة أو غير الصالحة تُهمل فلا تُنشئ مفاتيح كاش مختلفة)
+    """
+    from .models import Course
+
+    filters = {}
+    search = (params.get('search') or '').strip()
+    if search:
+        filters['search'] = search
+
+    category = params.get('category')
+    if category:
+        filters['category'] = category
+
+    level = params.get('level')
+    if level in dict(Course.LEVEL_CHOICES):
+        filters['level'] = level
+
+    price_type = params.get('price_type')
+    if price_type in dict(PRICE_TYPES):
+        filters['price_type'] = price_type
+
+    price_range = params.get('price_range')
+    if price_range in PRICE_RANGES:
+        filters['price_range'] = price_range
+
+    for name in ('price_min', 'price_max'):
+        value = _decimal(params.get(name))
+        if value is not None:
+            filters[name] = str(value)
+
+    rating = _decimal(params.get('rating'))
+    if rating is not None and 0 < rating <= 5:
+        filters['rating'] = str(rating)
+
+    if params.get('discount') in ('1', 'true', 'on'):
+        filters['discount'] = '1'
+
+    return filters
+
+
+def _price_range_q(key):
+    label, low, high = PRICE_RANGES[key]
+    condition = Q(effective_price__gte=low)
+    if high is not None:
+        condition &= Q(effective_price__lt=high)
+    return condition
+
+
+def _facet_q(name, value):
+    """شرط خيار واحد من وجه"""
+    if name == 'category':
+        return Q(category_id=category_id_for_slug(value))
+    if name == 'level':
+        return Q(level=value)
+    if name == 'price_type':
+        return Q(price=0) if value == 'free' else Q(price__gt=0)
+    if name == 'price_range':
+        return _price_range_q(value)
+    if name == 'rating':
+        return Q(rating__gte=value)
+    if name == 'discount':
+        return discount_active_q()
+    raise KeyError(name)
+
+
+def base_q(filters):
+    """الشروط التي لا تُعد كأوجه (البحث ونطاق السعر اليدوي بالسعر الفعلي)"""
+    condition = Q(is_active=True)
+    search = filters.get('search')
+    if search:
+        condition &= (
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(instructor__username__icontains=search)
+        )
+    if 'price_min' in filters:
+        condition &= Q(effective_price__gte=filters['price_min'])
+    if 'price_max' in filters:
+        condition &= Q(effective_price__lte=filters['price_max'])
+    return condition
+
+
+def facets_q(filters, exclude=None):
+    """شروط كل الأوجه المختارة ما عدا exclude"""
+    condition = Q()
+    for name in FACETS:
+        if name != exclude and name in filters:
+            condition &= _facet_q(name, filters[name])
+    return condition
+
+
+def apply_filters(queryset, filters):
+    """تطبيق الفلاتر الموحدة على queryset الدورات (مع effective_price)"""
+    if 'category' in filters and category_id_for_slug(filters['category']) is None:
+        return queryset.none()
+    return queryset.with_effective_price().filter(base_q(filters) & facets_q(filters))
+
+
+def _options():
+    """خيارات كل وجه: [(الوجه، القيمة، الاسم)]"""
+    from .models import Course
+
+    options = [('category', category.slug, category.name) for category in get_categories()]
+    options += [('level', value, label) for value, label in Course.LEVEL_CHOICES]
+    options += [('price_type', value, label) for value, label in PRICE_TYPES]
+    options += [('price_range', key, label) for key, (label, low, high) in PRICE_RANGES.items()]
+    options += [('rating', value, label) for value, label in RATING_BANDS]
+    options += [('discount', '1', 'عليها خصم')]
+    return options
+
+
+def compute_facets(filters):
+    """كل الأعداد باستعلام واحد"""
+    from .models import Course
+
+    if 'category' in filters and category_id_for_slug(filters['category']) is None:
+        filters = {name: value for name, value in filters.items() if name != 'category'}
+        unknown_category = True
+    else:
+        unknown_category = False
+
+    options = _options()
+    aggregates = {'total': Count('id', filter=facets_q(filters))}
+    for index, (name, value, label) in enumerate(options):
+        aggregates[f'o{index}'] = Count('id', filter=facets_q(filters, exclude=name) & _facet_q(name, value))
+    counts = Course.objects.with_effective_price().filter(base_q(filters)).aggregate(**aggregates)
+
+    facets = {name: [] for name in FACETS}
+    for index, (name, value, label) in enumerate(options):
+        facets[name].append({
+            'value': value,
+            'label': label,
+            'count': counts[f'o{index}'],
+            'selected': filters.get(name) == value,
+        })
+    return {'total': 0 if unknown_category else counts['total'], 'facets': facets}
+
+
+def _cache_key(filters):
+    version = cache.get_or_set(VERSION_KEY, 1, timeout=None)
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    return f'{CACHE_PREFIX}{version}:{digest}'
+
+
+def get_facets(filters):
+    """الأعداد من الكاش لمجموعة الفلاتر الموحدة"""
+    key = _cache_key(filters)
+    result = cache.get(key)
+    if result is None:
+        result = compute_facets(filters)
+        cache.set(key, result, timeout=FACETS_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate():
+    """إبطال كل الأعداد المخزنة بعد نجاح الـ transaction الحالية"""
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            pass
+
+    transaction.on_commit(bump)
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
+from core.images import validate_image_dimensions
 from .models import User, Course, Category, CourseModule, Lesson, Review, Enrollment
 
 # ==================== Tailwind CSS Classes ====================
@@ -84,6 +85,11 @@ class UserProfileForm(UserChangeForm):
             }),
         }
 
+    def clean_avatar(self):
+        avatar = self.cleaned_data.get('avatar')
+        validate_image_dimensions(avatar)
+        return avatar
+
 
 class LoginForm(forms.Form):
     username = forms.CharField(
@@ -157,8 +163,18 @@ class CourseForm(forms.ModelForm):
             if start_date >= end_date:
                 raise forms.ValidationError("تاريخ النهاية يجب أن يكون بعد تاريخ البداية")
 
+        # تعديل الخصم يدوياً يفصل الدورة عن حملتها حتى لا تصفره الحملة عند انتهائها
+        discount_fields = {'discount_percent', 'discount_start_date', 'discount_end_date'}
+        if self.instance.discount_campaign_id and discount_fields & set(self.changed_data):
+            self.instance.discount_campaign = None
+
         return cleaned_data
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        validate_image_dimensions(image)
+        return image
+
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
@@ -195,6 +211,11 @@ class CategoryForm(forms.ModelForm):
             }),
         }
 
+    def clean_img_gat(self):
+        img_gat = self.cleaned_data.get('img_gat')
+        validate_image_dimensions(img_gat)
+        return img_gat
+
                 
 
 class CourseModuleForm(forms.ModelForm):
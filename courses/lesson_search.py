@@ -0,0 +1,234 @@
+"""
+البحث في دروس الدورة (العنوان والمحتوى) مع مقتطفات مظللة
+
+نفس فهرس البادئات المستخدم في البحث الفوري (courses.typeahead.PrefixIndex)
+لكن فهرس مستقل لكل دورة، يُبنى عند أول بحث فيها باستعلام واحد ويُحتفظ
+بآخر MAX_INDEXED_COURSES دورة في ذاكرة العملية.
+
+تعديل درس (admin_lesson_edit أو غيره) يُطبق على فهرس الدورة مباشرة ويرفع
+رقم إصدار الدورة في الكاش، فتعيد بقية العمليات بناء فهرسها عند البحث
+التالي إذا كان الكاش مشتركاً. تعديل وحدة (العنوان أو الترتيب) يرفع الإصدار
+فقط. مع كاش خاص بكل عملية (locmem) يُعاد بناء الفهرس أيضاً إذا تجاوز عمره
+LESSON_SEARCH_INDEX_MAX_AGE.
+"""
+import html
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+
+from .typeahead import ARABIC_MARKS, PrefixIndex, index_words, query_terms
+
+CACHE_PREFIX = 'courses:lesson-search:'
+MAX_INDEXED_COURSES = 64
+MAX_RESULTS = 20
+SNIPPET_RADIUS = 60
+INDEX_MAX_AGE = getattr(settings, 'LESSON_SEARCH_INDEX_MAX_AGE', 300)
+
+# كلمة مع علامات التشكيل (حتى تطابق حدودها النص الأصلي)
+_TOKEN = re.compile(rf'[\w{ARABIC_MARKS}]+')
+
+
+def _version_key(course_id):
+    return f'{CACHE_PREFIX}{course_id}'
+
+
+# ==================== بناء الفهرس ====================
+
+def _lesson_entries(queryset):
+    lessons = queryset.values(
+        'id', 'title', 'content', 'order', 'is_free',
+        'module_id', 'module__title', 'module__order', 'module__course__slug',
+    )
+    for lesson in lessons:
+        content = html.unescape(strip_tags(lesson['content']))
+        yield lesson['id'], {
+            'kind': 'lesson',
+            'label': lesson['title'],
+            'score': 0,
+            'id': lesson['id'],
+            'content': content,
+            'is_free': lesson['is_free'],
+            'module': lesson['module__title'],
+            'position': (lesson['module__order'], lesson['module_id'], lesson['order'], lesson['id']),
+            'url': reverse('courses:lesson_view', args=[lesson['module__course__slug'], lesson['id']]),
+        }
+
+
+def _text(entry):
+    return f"{entry['label']} {entry['content']}"
+
+
+def _add(index, lesson_id, entry):
+    index.add(lesson_id, entry, text=_text(entry))
+
+
+def build_index(course_id):
+    from .models import Lesson
+
+    index = PrefixIndex()
+    index.extend(
+        (lesson_id, entry, _text(entry))
+        for lesson_id, entry in _lesson_entries(Lesson.objects.filter(module__course_id=course_id))
+    )
+    return index
+
+
+# ==================== فهارس العملية الحالية ====================
+
+_indexes = OrderedDict()  # course_id ← (الإصدار، وقت البناء، الفهرس)
+_lock = threading.Lock()
+
+
+def _current_version(course_id):
+    return cache.get_or_set(_version_key(course_id), time.time_ns, timeout=None)
+
+
+def get_index(course_id):
+    version = _current_version(course_id)
+    with _lock:
+        cached_version, built_at, index = _indexes.get(course_id, (None, 0.0, None))
+        if cached_version == version and time.monotonic() - built_at <= INDEX_MAX_AGE:
+            _indexes.move_to_end(course_id)
+            return index
+
+    index = build_index(course_id)
+    with _lock:
+        _indexes[course_id] = (version, time.monotonic(), index)
+        _indexes.move_to_end(course_id)
+        while len(_indexes) > MAX_INDEXED_COURSES:
+            _indexes.popitem(last=False)
+    return index
+
+
+# ==================== البحث ====================
+
+def _terms(query):
+    return query_terms(query)
+
+
+def _matches(token, terms):
+    """نفس مطابقة الفهرس: الكلمة بأداة التعريف أو بدونها"""
+    return any(word.startswith(term) for word in index_words(token) for term in terms)
+
+
+def highlight(text, terms, radius=None):
+    """
+    HTML آمن للنص مع <mark> حول الكلمات المطابقة.
+    radius: اقتطاع مقتطف حول أول كلمة مطابقة (None = النص كاملاً)
+    """
+    spans = [match.span() for match in _TOKEN.finditer(text) if _matches(match.group(), terms)]
+    start, end = 0, len(text)
+    if radius is not None:
+        if spans:
+            start = max(0, spans[0][0] - radius)
+            end = min(len(text), spans[0][1] + radius * 2)
+        else:
+            end = min(len(text), radius * 2)
+        # عدم قطع الكلمات عند الأطراف
+        if start > 0:
+            space = text.find(' ', start)
+            start = space + 1 if 0 <= space < spans[0][0] else start
+        if end < len(text):
+            space = text.rfind(' ', start, end)
+            end = space if space > (spans[0][1] if spans else start) else end
+
+    parts = ['…'] if start > 0 else []
+    position = start
+    for span_start, span_end in spans:
+        if span_start < start or span_end > end:
+            continue
+        parts.append(escape(text[position:span_start]))
+        parts.append(f'<mark>{escape(text[span_start:span_end])}</mark>')
+        position = span_end
+    parts.append(escape(text[position:end]))
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def search(course_id, query, full_access, limit=MAX_RESULTS):
+    """
+    الدروس المطابقة بترتيبها في الدورة.
+    full_access=False: الدروس المجانية فقط (غير المسجلين في الدورة)
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    matches = [
+        entry for entry in get_index(course_id).match(query)
+        if full_access or entry['is_free']
+    ]
+    matches.sort(key=lambda entry: entry['position'])
+
+    return [
+        {
+            'id': entry['id'],
+            'title': highlight(entry['label'], terms),
+            'module': entry['module'],
+            'snippet': highlight(entry['content'], terms, radius=SNIPPET_RADIUS),
+            'is_free': entry['is_free'],
+            'url': entry['url'],
+        }
+        for entry in matches[:limit]
+    ]
+
+
+async def asearch(course_id, query, full_access, limit=MAX_RESULTS):
+    """نسخة async: إعادة بناء الفهرس (عند الحاجة) في thread"""
+    return await sync_to_async(search)(course_id, query, full_access, limit)
+
+
+# ==================== التحديث التدريجي ====================
+
+def _publish(course_id, apply=None):
+    """
+    بعد نجاح الـ transaction: رفع إصدار الدورة، وتطبيق التغيير على فهرس
+    هذه العملية إن كان متزامناً (وإلا يُعاد بناؤه عند البحث التالي)
+    """
+    def run():
+        try:
+            version = cache.incr(_version_key(course_id))
+        except ValueError:
+            return
+        with _lock:
+            cached = _indexes.get(course_id)
+            if cached is None:
+                return
+            cached_version, built_at, index = cached
+            if apply is not None and cached_version == version - 1:
+                apply(index)
+                _indexes[course_id] = (version, built_at, index)
+            else:
+                del _indexes[course_id]
+
+    transaction.on_commit(run)
+
+
+def update_lesson(lesson, course_id):
+    from .models import Lesson
+
+    def apply(index):
+        entries = dict(_lesson_entries(Lesson.objects.filter(pk=lesson.pk, module__course_id=course_id)))
+        if lesson.pk in entries:
+            _add(index, lesson.pk, entries[lesson.pk])
+        else:
+            index.remove(lesson.pk)
+
+    _publish(course_id, apply)
+
+
+def remove_lesson(lesson, course_id):
+    _publish(course_id, lambda index: index.remove(lesson.pk))
+
+
+def invalidate(course_id):
+    _publish(course_id)
@@ -0,0 +1,33 @@
+"""
+تطبيق حملات الخصم المجدولة ومزامنة is_discounted مع نوافذ الخصم
+
+    python manage.py apply_discounts              # مرة واحدة (cron كل دقيقة مثلاً)
+    python manage.py apply_discounts --loop       # يعمل باستمرار
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from courses.discounts import run_discount_schedule
+
+
+class Command(BaseCommand):
+    help = 'تطبيق/إنهاء حملات الخصم وتحديث حالة الخصم للدورات بأوامر UPDATE مجمعة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='التكرار باستمرار بدلاً من الخروج')
+        parser.add_argument('--sleep', type=float, default=60, help='ثوانٍ بين كل دورة تشغيل')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            result = run_discount_schedule()
+            self.stdout.write(
+                f"حملات بدأت: {result['started']} دورة، "
+                f"حملات انتهت: {result['ended']} دورة، "
+                f"تحديث is_discounted: {result['flagged']} دورة"
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,24 @@
+"""
+إعادة حساب جدول تشابه الدورات المستخدم في التوصيات والدورات المشابهة
+
+يُشغّل دورياً (cron) مثلاً كل ليلة:
+    python manage.py compute_course_similarity --top-k 20
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.recommendations import SIMILARITY_TOP_K, rebuild_similarity_table
+
+
+class Command(BaseCommand):
+    help = 'حساب أقرب الدورات لكل دورة من التسجيلات والمفضلة والتقييمات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=SIMILARITY_TOP_K, help='عدد الجيران لكل دورة')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_similarity_table(top_k=options['top_k'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'تم حفظ {count} علاقة تشابه في {elapsed:.1f} ثانية'))
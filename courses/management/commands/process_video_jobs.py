@@ -0,0 +1,43 @@
+"""
+عامل تحويل فيديوهات الدروس إلى HLS
+
+    python manage.py process_video_jobs           # يعمل باستمرار
+    python manage.py process_video_jobs --once    # ينفذ المهام المنتظرة ثم يخرج
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from courses.models import VideoJob
+from courses.video import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'تنفيذ مهام تحويل الفيديو (ffprobe + ffmpeg => HLS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='الخروج عند انتهاء المهام المنتظرة')
+        parser.add_argument('--sleep', type=float, default=5, help='ثوانٍ بين كل فحص للمهام الجديدة')
+        parser.add_argument('--retry-failed', action='store_true', help='إعادة المهام الفاشلة إلى الانتظار')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = VideoJob.objects.filter(status='failed').update(status='pending', error='')
+            self.stdout.write(f'أعيدت {count} مهمة إلى الانتظار')
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'تحويل فيديو الدرس #{job.lesson_id} ({job.source})...')
+            job = run_job(job)
+            if job.status == 'ready':
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {job.manifest}'))
+            else:
+                self.stderr.write(self.style.ERROR(f'  ✗ {job.error[:200]}'))
@@ -0,0 +1,25 @@
+"""
+إعادة حساب إحصائيات المنصة المخزنة في الكاش من قاعدة البيانات
+
+تتم تلقائياً كل PLATFORM_STATS_RECONCILE_INTERVAL ثانية، ويمكن تشغيلها
+دورياً (cron) أو بعد استيراد بيانات بالجملة:
+    python manage.py reconcile_platform_stats
+"""
+from django.core.management.base import BaseCommand
+
+from courses.platform_stats import get_platform_stats, reconcile
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب عدادات إحصائيات المنصة وتصحيح أي انحراف في الكاش'
+
+    def handle(self, *args, **options):
+        before = get_platform_stats()
+        after = reconcile()
+        for name, value in after.items():
+            drift = value - before[name]
+            line = f'{name:<20}{value:>10}'
+            if drift:
+                line += self.style.WARNING(f'  ({drift:+})')
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('تم تحديث إحصائيات المنصة'))
@@ -0,0 +1,25 @@
+"""
+إعادة بناء رفوف الدورات في الكاش (المميزة، الأحدث، الأكثر شهرة، ...)
+
+تتم تلقائياً عند انتهاء صلاحية الرف (SHELF_REFRESH_INTERVAL)، ويمكن
+تشغيلها دورياً (cron) حتى لا ينتظر أول زائر إعادة البناء:
+    python manage.py refresh_shelves
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.shelves import SHELVES, refresh
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء رفوف الدورات المحسوبة مسبقاً'
+
+    def add_arguments(self, parser):
+        parser.add_argument('shelves', nargs='*', help=f"رفوف محددة من: {', '.join(SHELVES)} (الافتراضي: الكل)")
+
+    def handle(self, *args, **options):
+        unknown = set(options['shelves']) - set(SHELVES)
+        if unknown:
+            raise CommandError(f"رفوف غير معروفة: {', '.join(sorted(unknown))}")
+        for name, records in refresh(options['shelves'] or None).items():
+            self.stdout.write(f'{name:<12}{len(records):>4} دورة')
+        self.stdout.write(self.style.SUCCESS('تم تحديث الرفوف'))
@@ -0,0 +1,417 @@
+"""
+توليد بيانات اصطناعية بحجم الإنتاج لاختبارات الأداء والحمل
+
+    python manage.py seed_scale_data                 # الأحجام الافتراضية الكاملة
+    python manage.py seed_scale_data --scale 0.01    # نسخة مصغرة لـ CI
+    python manage.py seed_scale_data --users 5000 --enrollments 40000 --seed 7
+
+- الإدخال عبر bulk_create على دفعات (بدون save() أو signals)، ثم يُبطل
+  الكاش المشتق (الفهارس، الرفوف، الأعداد، الصفحات المخزنة) مرة واحدة في النهاية.
+- شعبية الدورات والمدربين تتبع توزيع Zipf (قلة من الدورات تأخذ معظم التسجيلات).
+- النصوص عربية، والنتيجة ثابتة لنفس قيمة --seed.
+- تواريخ الإنشاء (auto_now_add) هي وقت التشغيل.
+"""
+import itertools
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.page_cache import invalidate_tags, model_tag
+from courses import (
+    category_index, course_page, facets, lesson_search, platform_stats, review_feed, shelves, typeahead,
+)
+from courses.models import (
+    Category, Course, CourseModule, Enrollment, Favorite, Lesson,
+    LessonProgress, Order, OrderItem, Review, User,
+)
+from notifications.models import Notification
+
+DEFAULTS = {
+    'users': 100_000,
+    'instructors': 1_000,
+    'categories': 40,
+    'courses': 2_000,
+    'modules': 5,
+    'lessons': 50,
+    'enrollments': 1_000_000,
+    'progress': 20_000_000,
+    'reviews': 200_000,
+    'favorites': 300_000,
+    'orders': 150_000,
+    'notifications': 500_000,
+}
+
+ZIPF_EXPONENT = 1.1
+
+FIRST_NAMES = [
+    'محمد', 'أحمد', 'محمود', 'علي', 'عمر', 'يوسف', 'خالد', 'مصطفى', 'إبراهيم', 'حسن',
+    'فاطمة', 'مريم', 'نور', 'سارة', 'آية', 'هدى', 'ليلى', 'رنا', 'دينا', 'سلمى',
+]
+LAST_NAMES = [
+    'عبدالله', 'السيد', 'حسين', 'إبراهيم', 'عثمان', 'الشريف', 'منصور', 'سليمان',
+    'النجار', 'الخطيب', 'عادل', 'فؤاد', 'رمضان', 'جمال', 'صبري', 'نبيل',
+]
+TOPICS = [
+    'البرمجة', 'بايثون', 'جافاسكريبت', 'تطوير الويب', 'قواعد البيانات', 'الذكاء الاصطناعي',
+    'تعلم الآلة', 'التصميم الجرافيكي', 'التسويق الرقمي', 'المحاسبة', 'إدارة المشاريع',
+    'اللغة الإنجليزية', 'التصوير', 'المونتاج', 'الأمن السيبراني', 'الشبكات', 'تحليل البيانات',
+    'ريادة الأعمال', 'تطوير تطبيقات الجوال', 'الرياضيات', 'الفيزياء', 'الكتابة الإبداعية',
+]
+TITLE_PATTERNS = [
+    'دورة {topic} الشاملة', 'أساسيات {topic} للمبتدئين', '{topic} من الصفر إلى الاحتراف',
+    'احتراف {topic}', 'مقدمة في {topic}', '{topic} المتقدم', 'مشاريع عملية في {topic}',
+]
+WORDS = [
+    'تعلم', 'مهارات', 'عملي', 'مشروع', 'تطبيق', 'أساسيات', 'شرح', 'مفهوم', 'أدوات', 'خطوة',
+    'الدرس', 'المحتوى', 'المدرب', 'ممتاز', 'مفيد', 'واضح', 'سهل', 'منظم', 'أمثلة', 'تمارين',
+    'بناء', 'تحليل', 'تصميم', 'نظام', 'بيانات', 'واجهة', 'أداء', 'تحسين', 'سريع', 'احترافي',
+]
+REVIEW_RATINGS = [1, 2, 3, 4, 5]
+REVIEW_WEIGHTS = [3, 5, 12, 35, 45]
+LEVELS = ['beginner', 'intermediate', 'advanced', 'all']
+PRICES = [Decimal(p) for p in ('0', '0', '99', '149', '199', '299', '399', '499', '799')]
+
+
+def zipf_cum_weights(n, exponent=ZIPF_EXPONENT):
+    """أوزان تراكمية لتوزيع Zipf على n عنصر (للاستخدام مع random.choices)"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'توليد بيانات اصطناعية كبيرة (مستخدمون، دورات، تسجيلات، تقدم...) لاختبار الأداء'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name}', type=int, default=None, help=f'الافتراضي {default:,}')
+        parser.add_argument('--scale', type=float, default=1.0, help='معامل ضرب لكل الأحجام الافتراضية (مثلاً 0.01)')
+        parser.add_argument('--seed', type=int, default=42, help='بذرة العشوائية (نفس البذرة = نفس البيانات)')
+        parser.add_argument('--chunk-size', type=int, default=5_000, help='عدد الصفوف في كل bulk_create')
+        parser.add_argument('--prefix', default='seed', help='بادئة أسماء المستخدمين والـ slugs المولدة')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.prefix = options['prefix']
+        self.sizes = {
+            name: options[name] if options[name] is not None else max(1, int(default * options['scale']))
+            for name, default in DEFAULTS.items()
+        }
+        # الأحجام الفرعية (الوحدات والدروس لكل دورة) لا تتأثر بـ --scale
+        for name in ('modules', 'lessons'):
+            if options[name] is None:
+                self.sizes[name] = DEFAULTS[name]
+
+        if User.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise CommandError(
+                f'توجد بيانات مولدة بالبادئة "{self.prefix}" بالفعل، استخدم --prefix مختلفة أو قاعدة بيانات جديدة'
+            )
+
+        if connection.vendor == 'sqlite':
+            # قاعدة بيانات اختبار: لا داعي لانتظار الكتابة على القرص بعد كل دفعة
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+                cursor.execute('PRAGMA journal_mode = MEMORY')
+
+        started = time.monotonic()
+        self.seed_users()
+        self.seed_categories()
+        self.seed_courses()
+        self.seed_modules_and_lessons()
+        self.seed_enrollments()
+        self.seed_progress()
+        self.seed_reviews()
+        self.seed_favorites()
+        self.seed_orders()
+        self.seed_notifications()
+        self.update_course_counters()
+        self.invalidate_caches()
+        self.stdout.write(self.style.SUCCESS(f'اكتمل التوليد في {time.monotonic() - started:.1f} ثانية'))
+
+    # ==================== أدوات ====================
+
+    def insert(self, model, rows, label):
+        """إدخال الصفوف على دفعات وإرجاع آخر pk قبل الإدخال (الصفوف الجديدة بعده)"""
+        started = time.monotonic()
+        before = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        total = 0
+        for chunk in chunked(rows, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.chunk_size)
+            total += len(chunk)
+        self.stdout.write(f'  {label}: {total:,} صف في {time.monotonic() - started:.1f} ثانية')
+        return before
+
+    def new_ids(self, model, before, *fields):
+        queryset = model.objects.filter(pk__gt=before).order_by('pk')
+        if fields:
+            return list(queryset.values_list('pk', *fields))
+        return list(queryset.values_list('pk', flat=True))
+
+    def sentence(self, words=8):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    def full_name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    # ==================== الجداول ====================
+
+    def seed_users(self):
+        password = make_password('password123')
+        instructors = self.sizes['instructors']
+
+        def rows():
+            for i in range(self.sizes['users'] + instructors):
+                first_name, last_name = self.full_name()
+                yield User(
+                    username=f'{self.prefix}_user_{i}',
+                    email=f'{self.prefix}_user_{i}@example.com',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password,
+                    role='instructor' if i < instructors else 'user',
+                )
+
+        before = self.insert(User, rows(), 'المستخدمون')
+        ids = self.new_ids(User, before)
+        self.instructor_ids = ids[:instructors]
+        self.student_ids = ids[instructors:]
+
+    def seed_categories(self):
+        rows = (
+            Category(
+                name=f'{TOPICS[i % len(TOPICS)]} {i // len(TOPICS) + 1}',
+                slug=f'{self.prefix}-category-{i}',
+                description=self.sentence(12),
+            )
+            for i in range(self.sizes['categories'])
+        )
+        before = self.insert(Category, rows, 'التصنيفات')
+        self.category_ids = self.new_ids(Category, before)
+
+    def seed_courses(self):
+        image = Course.objects.exclude(image='').values_list('image', flat=True).first() or 'courses/default.jpg'
+        instructor_weights = zipf_cum_weights(len(self.instructor_ids))
+        category_weights = zipf_cum_weights(len(self.category_ids))
+        count = self.sizes['courses']
+        instructors = self.rng.choices(self.instructor_ids, cum_weights=instructor_weights, k=count)
+        categories = self.rng.choices(self.category_ids, cum_weights=category_weights, k=count)
+
+        def rows():
+            for i in range(count):
+                topic = self.rng.choice(TOPICS)
+                yield Course(
+                    title=self.rng.choice(TITLE_PATTERNS).format(topic=topic),
+                    slug=f'{self.prefix}-course-{i}',
+                    description=self.sentence(60),
+                    short_description=self.sentence(15),
+                    image=image,
+                    category_id=categories[i],
+                    instructor_id=instructors[i],
+                    price=self.rng.choice(PRICES),
+                    level=self.rng.choice(LEVELS),
+                    duration_hours=self.rng.randint(2, 60),
+                    is_featured=self.rng.random() < 0.03,
+                    is_active=self.rng.random() < 0.95,
+                )
+
+        before = self.insert(Course, rows(), 'الدورات')
+        # الترتيب العشوائي للشعبية: الدورة الأولى في القائمة هي الأكثر طلباً
+        self.course_ids = self.new_ids(Course, before)
+        self.rng.shuffle(self.course_ids)
+        self.course_weights = zipf_cum_weights(len(self.course_ids))
+
+    def seed_modules_and_lessons(self):
+        modules_per_course = self.sizes['modules']
+        module_rows = (
+            CourseModule(course_id=course_id, title=f'الوحدة {order + 1}: {self.sentence(3)}', order=order)
+            for course_id in self.course_ids
+            for order in range(modules_per_course)
+        )
+        before = self.insert(CourseModule, module_rows, 'الوحدات')
+        modules = self.new_ids(CourseModule, before, 'course_id')
+
+        lessons_per_module = max(1, self.sizes['lessons'] // modules_per_course)
+        lesson_rows = (
+            Lesson(
+                module_id=module_id,
+                title=f'الدرس {order + 1}: {self.sentence(4)}',
+                content=self.sentence(40),
+                duration_minutes=self.rng.randint(3, 25),
+                order=order,
+                is_free=order == 0,
+            )
+            for module_id, _course_id in modules
+            for order in range(lessons_per_module)
+        )
+        before = self.insert(Lesson, lesson_rows, 'الدروس')
+
+        module_course = dict(modules)
+        self.course_lessons = {}
+        for lesson_id, module_id in self.new_ids(Lesson, before, 'module_id'):
+            self.course_lessons.setdefault(module_course[module_id], []).append(lesson_id)
+
+    def seed_enrollments(self):
+        target = min(self.sizes['enrollments'], len(self.student_ids) * len(self.course_ids))
+        seen = set()
+        multiplier = max(self.course_ids) + 1
+
+        def rows():
+            produced = 0
+            while produced < target:
+                batch = min(self.chunk_size, target - produced)
+                users = self.rng.choices(self.student_ids, k=batch)
+                courses = self.rng.choices(self.course_ids, cum_weights=self.course_weights, k=batch)
+                for user_id, course_id in zip(users, courses):
+                    key = user_id * multiplier + course_id
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    produced += 1
+                    roll = self.rng.random()
+                    status = 'enrolled' if roll < 0.8 else 'completed' if roll < 0.9 else 'pending' if roll < 0.97 else 'cancelled'
+                    yield Enrollment(
+                        user_id=user_id,
+                        course_id=course_id,
+                        status=status,
+                        progress=100 if status == 'completed' else self.rng.randint(0, 99),
+                    )
+
+        before = self.insert(Enrollment, rows(), 'التسجيلات')
+        self.enrollment_before = before
+        self.enrollment_pairs = [(user_id, course_id) for _pk, user_id, course_id in self.new_ids(Enrollment, before, 'user_id', 'course_id')]
+
+    def seed_progress(self):
+        target = self.sizes['progress']
+        average = max(1, target / max(1, len(self.enrollment_pairs)))
+
+        def rows():
+            produced = 0
+            enrollments = Enrollment.objects.filter(pk__gt=self.enrollment_before).values_list('pk', 'course_id')
+            for enrollment_id, course_id in enrollments.iterator(chunk_size=self.chunk_size):
+                lessons = self.course_lessons.get(course_id, [])
+                # الطلاب يتقدمون بالترتيب: أول k دروس
+                k = min(len(lessons), int(self.rng.expovariate(1 / average)) + 1, target - produced)
+                for index in range(k):
+                    completed = index < k - 1 or self.rng.random() < 0.5
+                    yield LessonProgress(
+                        enrollment_id=enrollment_id,
+                        lesson_id=lessons[index],
+                        is_completed=completed,
+                        last_watched_position=0 if completed else self.rng.randint(10, 900),
+                    )
+                produced += k
+                if produced >= target:
+                    return
+
+        self.insert(LessonProgress, rows(), 'تقدم الدروس')
+
+    def seed_reviews(self):
+        count = min(self.sizes['reviews'], len(self.enrollment_pairs))
+        pairs = self.rng.sample(self.enrollment_pairs, count)
+        ratings = self.rng.choices(REVIEW_RATINGS, weights=REVIEW_WEIGHTS, k=count)
+        rows = (
+            Review(user_id=user_id, course_id=course_id, rating=rating, comment=self.sentence(self.rng.randint(5, 30)))
+            for (user_id, course_id), rating in zip(pairs, ratings)
+        )
+        self.insert(Review, rows, 'التقييمات')
+
+    def seed_favorites(self):
+        target = min(self.sizes['favorites'], len(self.student_ids) * len(self.course_ids))
+        seen = set()
+
+        def rows():
+            while len(seen) < target:
+                user_id = self.rng.choice(self.student_ids)
+                course_id = self.rng.choices(self.course_ids, cum_weights=self.course_weights)[0]
+                if (user_id, course_id) in seen:
+                    continue
+                seen.add((user_id, course_id))
+                yield Favorite(user_id=user_id, course_id=course_id)
+
+        self.insert(Favorite, rows(), 'المفضلة')
+
+    def seed_orders(self):
+        prices = dict(Course.objects.filter(pk__in=self.course_ids).values_list('pk', 'price'))
+        count = self.sizes['orders']
+        users = self.rng.choices(self.student_ids, k=count)
+        carts = [
+            set(self.rng.choices(self.course_ids, cum_weights=self.course_weights, k=self.rng.choice((1, 1, 1, 2, 3))))
+            for _ in range(count)
+        ]
+        statuses = self.rng.choices(['completed', 'pending', 'processing', 'cancelled'], weights=[70, 15, 5, 10], k=count)
+        order_rows = (
+            Order(
+                user_id=user_id,
+                total=sum((prices[course_id] for course_id in cart), Decimal('0')),
+                status=status,
+                customer_name=' '.join(self.full_name()),
+                customer_email=f'{self.prefix}_user_{user_id}@example.com',
+            )
+            for user_id, cart, status in zip(users, carts, statuses)
+        )
+        before = self.insert(Order, order_rows, 'الطلبات')
+        item_rows = (
+            OrderItem(order_id=order_id, course_id=course_id, price=prices[course_id])
+            for order_id, cart in zip(self.new_ids(Order, before), carts)
+            for course_id in cart
+        )
+        self.insert(OrderItem, item_rows, 'عناصر الطلبات')
+
+    def seed_notifications(self):
+        count = self.sizes['notifications']
+        users = self.rng.choices(self.student_ids, k=count)
+        rows = (
+            Notification(
+                id=uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                user_id=user_id,
+                title=self.sentence(4),
+                message=self.sentence(15),
+                notification_type=self.rng.choice(['info', 'success', 'warning', 'error']),
+                is_read=self.rng.random() < 0.6,
+            )
+            for user_id in users
+        )
+        self.insert(Notification, rows, 'الإشعارات')
+
+    def update_course_counters(self):
+        """تحديث الحقول المجمعة (عدد الطلاب والتقييم) للدورات المولدة"""
+        started = time.monotonic()
+        students = (
+            Enrollment.objects.filter(course=OuterRef('pk'), status__in=['enrolled', 'completed'])
+            .values('course').annotate(total=Count('pk')).values('total')
+        )
+        rating = (
+            Review.objects.filter(course=OuterRef('pk'))
+            .values('course').annotate(average=Avg('rating')).values('average')
+        )
+        Course.objects.filter(pk__in=self.course_ids).update(
+            students_count=Coalesce(Subquery(students), 0),
+            rating=Coalesce(Subquery(rating), 0.0),
+        )
+        self.stdout.write(f'  تحديث عدادات الدورات: {time.monotonic() - started:.1f} ثانية')
+
+    def invalidate_caches(self):
+        """bulk_create و update() لا تطلق الإشارات التي تبطل الكاش، فنبطله هنا مرة واحدة"""
+        platform_stats.reconcile()
+        category_index.invalidate()
+        typeahead.invalidate()
+        shelves.invalidate()
+        facets.invalidate()
+        for course_id in self.course_ids:
+            course_page.invalidate(course_id)
+            lesson_search.invalidate(course_id)
+            review_feed.invalidate(course_id)
+        invalidate_tags(*(model_tag(model) for model in (Category, Course, Review)))
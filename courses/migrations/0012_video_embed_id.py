@@ -0,0 +1,45 @@
+# Generated by Django 5.2.11 on 2026-10-19 01:55
+
+from django.db import migrations, models
+
+
+def fill_video_embed_ids(apps, schema_editor):
+    from courses.video_urls import parse_video_url
+
+    for model_name in ('Course', 'Lesson'):
+        model = apps.get_model('courses', model_name)
+        for obj in model.objects.exclude(video_url='').exclude(video_url__isnull=True).only('id', 'video_url'):
+            ref = parse_video_url(obj.video_url)
+            if ref and ref.provider == 'youtube':
+                model.objects.filter(pk=obj.pk).update(video_embed_id=ref.video_id, video_start=ref.start)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_lesson_hls_manifest_videojob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='video_embed_id',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='video_start',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='video_embed_id',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='video_start',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_video_embed_ids, migrations.RunPython.noop),
+    ]
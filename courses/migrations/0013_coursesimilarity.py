@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-19 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_video_embed_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='courses.course')),
+                ('similar_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='courses.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'rank'], name='courses_cou_course__bf00ab_idx')],
+                'unique_together': {('course', 'similar_course')},
+            },
+        ),
+    ]
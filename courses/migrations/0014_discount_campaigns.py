@@ -0,0 +1,46 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:33
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_coursesimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscountCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='اسم الحملة')),
+                ('discount_percent', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)], verbose_name='نسبة الخصم')),
+                ('start_date', models.DateTimeField(verbose_name='تاريخ البداية')),
+                ('end_date', models.DateTimeField(verbose_name='تاريخ النهاية')),
+                ('is_active', models.BooleanField(default=True, verbose_name='مفعلة')),
+                ('applied_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('ended_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='discount_campaigns', to='courses.category', verbose_name='التصنيف')),
+                ('instructor', models.ForeignKey(blank=True, limit_choices_to={'role': 'instructor'}, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='discount_campaigns', to=settings.AUTH_USER_MODEL, verbose_name='المدرب')),
+            ],
+            options={
+                'verbose_name': 'حملة خصم',
+                'verbose_name_plural': 'حملات الخصم',
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='discount_campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='courses', to='courses.discountcampaign', verbose_name='حملة الخصم'),
+        ),
+        migrations.AddIndex(
+            model_name='discountcampaign',
+            index=models.Index(fields=['is_active', 'start_date'], name='courses_dis_is_acti_c5861b_idx'),
+        ),
+    ]
@@ -1,11 +1,29 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.utils.text import slugify
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from core.slugs import save_with_unique_slug
+from .discounts import CourseQuerySet
+from .video_urls import parse_video_url
+
+
+def set_video_embed(instance, save_kwargs):
+    """تخزين معرف فيديو يوتيوب ووقت البداية من video_url قبل الحفظ"""
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None and 'video_url' not in update_fields:
+        return
+    ref = parse_video_url(instance.video_url)
+    if ref and ref.provider == 'youtube':
+        instance.video_embed_id, instance.video_start = ref.video_id, ref.start
+    else:
+        instance.video_embed_id, instance.video_start = '', 0
+    if update_fields is not None:
+        save_kwargs['update_fields'] = {*update_fields, 'video_embed_id', 'video_start'}
+
 
 class User(AbstractUser):
     USER_ROLES = (
@@ -76,18 +94,14 @@ class Category(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.slug:
-            from django.utils.text import slugify
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Category.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            return save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
             
             
     def get_courses_count(self):
+        # محسوب مسبقاً إذا جاء التصنيف من category_index أو annotate
+        if hasattr(self, 'course_count'):
+            return self.course_count
         return self.courses.filter(is_active=True).count()
     
     def __str__(self):
@@ -127,7 +141,16 @@ class Course(models.Model):
         null=True, 
         blank=True
     )
+    # تُزامن مع نافذة الخصم عبر python manage.py apply_discounts
     is_discounted = models.BooleanField(_("مخفض"), default=False)
+    discount_campaign = models.ForeignKey(
+        'DiscountCampaign',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='courses',
+        verbose_name=_("حملة الخصم"),
+    )
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, default='beginner')
     duration_hours = models.IntegerField(default=0)
     is_featured = models.BooleanField(default=False)
@@ -143,6 +166,9 @@ class Course(models.Model):
         null=True,
         help_text="رابط فيديو يوتيوب (مثال: https://www.youtube.com/watch?v=...)"
     )
+    # معرف الفيديو المستخرج من video_url عند الحفظ (حتى لا تحلل القوالب الرابط)
+    video_embed_id = models.CharField(max_length=32, blank=True, editable=False)
+    video_start = models.PositiveIntegerField(default=0, editable=False)
     video_file = models.FileField(
         _("ملف فيديو"), 
         upload_to='courses/videos/',
@@ -153,9 +179,14 @@ class Course(models.Model):
     
     
     
+    objects = CourseQuerySet.as_manager()
+    
     @property
     def has_discount(self):
-        """التحقق من وجود خصم ساري"""
+        """التحقق من وجود خصم ساري (من with_effective_price إن وُجد)"""
+        is_discount_active = getattr(self, 'is_discount_active', None)
+        if is_discount_active is not None:
+            return is_discount_active
         now = timezone.now()
         return (self.discount_percent > 0 and 
                 self.discount_start_date and 
@@ -164,7 +195,10 @@ class Course(models.Model):
     
     @property
     def discounted_price(self):
-        """حساب السعر بعد الخصم"""
+        """حساب السعر بعد الخصم (من with_effective_price إن وُجد)"""
+        effective_price = getattr(self, 'effective_price', None)
+        if effective_price is not None:
+            return effective_price
         if self.has_discount:
             return self.price * (100 - self.discount_percent) / 100
         return self.price
@@ -210,6 +244,12 @@ class Course(models.Model):
         """التحقق من وجود فيديو تعريفي"""
         return bool(self.video_url or self.video_file)
 
+    def get_video_file_url(self):
+        """رابط بث الفيديو التعريفي المرفوع"""
+        if self.video_file:
+            return reverse('courses:course_preview_video', args=[self.slug])
+        return ''
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -219,8 +259,9 @@ class Course(models.Model):
         ]
     
     def save(self, *args, **kwargs):
+        set_video_embed(self, kwargs)
         if not self.slug:
-            self.slug = slugify(self.title)
+            return save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -255,6 +296,55 @@ class Course(models.Model):
     def __str__(self):
         return self.title
 
+class DiscountCampaign(models.Model):
+    """خصم لكل دورات تصنيف أو مدرب خلال فترة (يُطبق عبر apply_discounts)"""
+    name = models.CharField(_("اسم الحملة"), max_length=200)
+    discount_percent = models.IntegerField(
+        _("نسبة الخصم"),
+        validators=[MinValueValidator(1), MaxValueValidator(100)],
+    )
+    start_date = models.DateTimeField(_("تاريخ البداية"))
+    end_date = models.DateTimeField(_("تاريخ النهاية"))
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='discount_campaigns', verbose_name=_("التصنيف"),
+    )
+    instructor = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='discount_campaigns', verbose_name=_("المدرب"),
+        limit_choices_to={'role': 'instructor'},
+    )
+    is_active = models.BooleanField(_("مفعلة"), default=True)
+    applied_at = models.DateTimeField(null=True, blank=True, editable=False)
+    ended_at = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-start_date']
+        verbose_name = 'حملة خصم'
+        verbose_name_plural = 'حملات الخصم'
+        indexes = [
+            models.Index(fields=['is_active', 'start_date']),
+        ]
+    
+    def clean(self):
+        if not self.category_id and not self.instructor_id:
+            raise ValidationError('حدد تصنيفاً أو مدرباً للحملة')
+        if self.start_date and self.end_date and self.end_date <= self.start_date:
+            raise ValidationError({'end_date': 'تاريخ النهاية يجب أن يكون بعد البداية'})
+    
+    def courses_in_scope(self):
+        """الدورات النشطة التي تشملها الحملة (التصنيف و/أو المدرب)"""
+        courses = Course.objects.filter(is_active=True)
+        if self.category_id:
+            courses = courses.filter(category_id=self.category_id)
+        if self.instructor_id:
+            courses = courses.filter(instructor_id=self.instructor_id)
+        return courses
+    
+    def __str__(self):
+        return f"{self.name} ({self.discount_percent}%)"
+
 class CourseModule(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
     title = models.CharField(max_length=200)
@@ -284,6 +374,10 @@ class Lesson(models.Model):
     content = models.TextField(blank=True)
     order = models.IntegerField(default=0)
     is_free = models.BooleanField(default=False)
+    # مسار ملف HLS الرئيسي بعد التحويل (انظر courses/video.py)
+    hls_manifest = models.CharField(max_length=255, blank=True)
+    video_embed_id = models.CharField(max_length=32, blank=True, editable=False)
+    video_start = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['order']
@@ -291,11 +385,29 @@ class Lesson(models.Model):
             models.Index(fields=['module', 'order']),
         ]
     
+    def save(self, *args, **kwargs):
+        set_video_embed(self, kwargs)
+        super().save(*args, **kwargs)
+    
     def get_video_url(self):
+        if self.hls_manifest:
+            return self.get_hls_url()
         if self.video_file:
-            return self.video_file.url
+            return self.get_file_video_url()
         return self.video_url
     
+    def get_file_video_url(self):
+        """رابط الملف الأصلي عبر view محمي يتحقق من الاشتراك"""
+        if self.video_file:
+            return reverse('courses:lesson_video', args=[self.id])
+        return ''
+    
+    def get_hls_url(self):
+        """رابط ملف HLS الرئيسي (master.m3u8) إن كان جاهزاً"""
+        if self.hls_manifest:
+            return reverse('courses:lesson_hls', args=[self.id, 'master.m3u8'])
+        return ''
+    
     def is_watched_by_user(self, user):
         if user.is_authenticated:
             enrollment = Enrollment.objects.filter(
@@ -325,6 +437,26 @@ class Favorite(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.course.title}"
 
+
+class CourseSimilarity(models.Model):
+    """
+    أقرب الدورات لكل دورة (top-K) محسوبة مسبقاً من التسجيلات والمفضلة والتقييمات
+    انظر courses/recommendations.py
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='neighbors')
+    similar_course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='neighbor_of')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        unique_together = ['course', 'similar_course']
+        indexes = [
+            models.Index(fields=['course', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"{self.course_id} -> {self.similar_course_id} ({self.score:.3f})"
+
 class Enrollment(models.Model):
     STATUS_CHOICES = (
         ('pending', 'قيد الانتظار'),
@@ -420,12 +552,18 @@ class Review(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='reviews')
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])
     comment = models.TextField()
+    helpful_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['user', 'course']
         ordering = ['-created_at']
+        indexes = [
+            # صفحات التقييمات بالمؤشر (courses/review_feed.py)
+            models.Index(fields=['course', '-created_at', '-id']),
+            models.Index(fields=['course', '-helpful_count', '-created_at', '-id']),
+        ]
     
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -438,6 +576,19 @@ class Review(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.course.title} ({self.rating}/5)"
+
+
+class ReviewVote(models.Model):
+    """تصويت مستخدم بأن التقييم مفيد (Review.helpful_count هو عدد هذه الأصوات)"""
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='votes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_votes')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['review', 'user']
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.review_id}"
     
     
     
@@ -487,3 +638,38 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.order.id} - {self.course.title}"
     
+
+
+class VideoJob(models.Model):
+    """مهمة تحويل فيديو درس إلى HLS بعدة جودات"""
+    STATUS_CHOICES = (
+        ('pending', 'في الانتظار'),
+        ('processing', 'قيد المعالجة'),
+        ('ready', 'جاهز'),
+        ('failed', 'فشل'),
+    )
+    
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='video_jobs')
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    duration_seconds = models.FloatField(null=True, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    renditions = models.JSONField(default=list, blank=True)
+    manifest = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'مهمة تحويل فيديو'
+        verbose_name_plural = 'مهام تحويل الفيديو'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lesson.title} ({self.get_status_display()})"
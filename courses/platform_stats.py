@@ -0,0 +1,114 @@
+"""
+إحصائيات المنصة العامة (عدد الدورات، الطلاب، المدربين، ...) من الكاش
+
+- كل عداد مفتاح مستقل في الكاش يُعدل بـ incr/decr من الإشارات
+  (courses.signals) عند تغير دور المستخدم، تفعيل الدورة، حالة التسجيل،
+  إضافة/حذف درس أو تقييم.
+- العمليات التي لا تطلق إشارات (update / bulk_create / queryset.delete)
+  تُصحح بإعادة الحساب من قاعدة البيانات: تلقائياً كل
+  PLATFORM_STATS_RECONCILE_INTERVAL ثانية عند القراءة التالية، أو يدوياً:
+      python manage.py reconcile_platform_stats
+- العدادات تحتاج كاشاً مشتركاً (Redis في docker-compose.yml). مع locmem
+  يكون لكل عامل نسخته، فلا تُعدل بـ incr وتُعاد قراءتها من قاعدة البيانات
+  كل PLATFORM_STATS_LOCAL_TIMEOUT ثانية حتى لا تختلف الأرقام بين الطلبات.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+CACHE_PREFIX = 'courses:platform-stats:'
+FRESH_KEY = CACHE_PREFIX + 'fresh'
+RECONCILE_INTERVAL = getattr(settings, 'PLATFORM_STATS_RECONCILE_INTERVAL', 3600)
+LOCAL_TIMEOUT = getattr(settings, 'PLATFORM_STATS_LOCAL_TIMEOUT', 60)
+
+COUNTERS = (
+    'total_courses',
+    'total_students',
+    'total_instructors',
+    'total_enrollments',
+    'total_lessons',
+    'total_reviews',
+    'rating_sum',
+)
+
+# دور المستخدم ← العداد (للمستخدمين النشطين فقط)
+ROLE_COUNTERS = {
+    'user': 'total_students',
+    'instructor': 'total_instructors',
+}
+
+
+def _key(name):
+    return CACHE_PREFIX + name
+
+
+def counters_are_shared():
+    """هل يرى كل العمال نفس العدادات (الكاش ليس locmem خاصاً بالعملية)"""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def compute_platform_stats():
+    """حساب كل العدادات من قاعدة البيانات (استعلام واحد لكل جدول)"""
+    from .models import Course, Enrollment, Lesson, Review
+    User = get_user_model()
+
+    users = User.objects.aggregate(
+        total_students=Count('id', filter=Q(role='user', is_active=True)),
+        total_instructors=Count('id', filter=Q(role='instructor', is_active=True)),
+    )
+    reviews = Review.objects.aggregate(total_reviews=Count('id'), rating_sum=Sum('rating'))
+    return {
+        **users,
+        'total_courses': Course.objects.filter(is_active=True).count(),
+        'total_enrollments': Enrollment.objects.filter(status='enrolled').count(),
+        'total_lessons': Lesson.objects.count(),
+        'total_reviews': reviews['total_reviews'],
+        'rating_sum': reviews['rating_sum'] or 0,
+    }
+
+
+def reconcile():
+    """إعادة حساب العدادات وتخزينها في الكاش"""
+    values = compute_platform_stats()
+    cache.set_many({_key(name): value for name, value in values.items()}, timeout=None)
+    cache.set(FRESH_KEY, True, timeout=RECONCILE_INTERVAL if counters_are_shared() else LOCAL_TIMEOUT)
+    return values
+
+
+def get_platform_stats():
+    """العدادات من الكاش (بدون استعلامات إلا عند إعادة الحساب الدورية)"""
+    cached = cache.get_many([FRESH_KEY] + [_key(name) for name in COUNTERS])
+    if FRESH_KEY in cached and all(_key(name) in cached for name in COUNTERS):
+        values = {name: cached[_key(name)] for name in COUNTERS}
+    else:
+        values = reconcile()
+
+    reviews = values['total_reviews']
+    values['avg_rating'] = round(values['rating_sum'] / reviews, 1) if reviews else 0
+    return values
+
+
+def adjust(**deltas):
+    """تعديل العدادات بعد نجاح الـ transaction الحالية"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas or not counters_are_shared():
+        return
+
+    def apply():
+        for name, delta in deltas.items():
+            try:
+                cache.incr(_key(name), delta)
+            except ValueError:
+                # المفتاح غير موجود (لم يُحسب بعد أو حُذف من الكاش)
+                cache.delete(FRESH_KEY)
+                return
+
+    transaction.on_commit(apply)
+
+
+def user_counter(role, is_active):
+    """العداد الذي يُحتسب فيه المستخدم (أو None)"""
+    return ROLE_COUNTERS.get(role) if is_active else None
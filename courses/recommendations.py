@@ -0,0 +1,102 @@
+"""
+حساب تشابه الدورات (item-to-item) من سلوك المستخدمين
+
+كل مستخدم يمثل متجهاً متفرقاً (sparse) من الدورات بأوزان حسب نوع التفاعل:
+التسجيل، الإضافة للمفضلة، والتقييم الإيجابي. التشابه بين دورتين هو
+تشابه جيب التمام (cosine) بين عمودَيهما في مصفوفة المستخدم × الدورة،
+مع عامل تقليص (shrinkage) حتى لا تتصدر أزواج قليلة الدعم.
+
+النتيجة تُحفظ في جدول CourseSimilarity (أعلى K جار لكل دورة) ويُعاد
+حسابها دورياً عبر: python manage.py compute_course_similarity
+"""
+import math
+from collections import defaultdict
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import CourseSimilarity, Enrollment, Favorite, Review
+
+SIMILARITY_TOP_K = getattr(settings, 'SIMILARITY_TOP_K', 20)
+SIMILARITY_SHRINKAGE = getattr(settings, 'SIMILARITY_SHRINKAGE', 5)
+
+# أوزان التفاعلات
+ENROLLMENT_WEIGHTS = {'enrolled': 1.0, 'completed': 1.0, 'pending': 0.3}
+FAVORITE_WEIGHT = 0.6
+POSITIVE_REVIEW_WEIGHT = 0.8
+POSITIVE_REVIEW_MIN_RATING = 4
+
+# الحد الأقصى لعدد الدورات لكل مستخدم (تجنب O(n²) للحسابات الشاذة)
+MAX_ITEMS_PER_USER = 200
+
+
+def build_interactions():
+    """مصفوفة المستخدم × الدورة المتفرقة: {user_id: {course_id: weight}}"""
+    interactions = defaultdict(lambda: defaultdict(float))
+
+    enrollments = Enrollment.objects.filter(
+        status__in=ENROLLMENT_WEIGHTS
+    ).values_list('user_id', 'course_id', 'status').iterator(chunk_size=5000)
+    for user_id, course_id, status in enrollments:
+        interactions[user_id][course_id] += ENROLLMENT_WEIGHTS[status]
+
+    favorites = Favorite.objects.values_list('user_id', 'course_id').iterator(chunk_size=5000)
+    for user_id, course_id in favorites:
+        interactions[user_id][course_id] += FAVORITE_WEIGHT
+
+    reviews = Review.objects.filter(
+        rating__gte=POSITIVE_REVIEW_MIN_RATING
+    ).values_list('user_id', 'course_id').iterator(chunk_size=5000)
+    for user_id, course_id in reviews:
+        interactions[user_id][course_id] += POSITIVE_REVIEW_WEIGHT
+
+    return interactions
+
+
+def compute_similarities(interactions, top_k=SIMILARITY_TOP_K, shrinkage=SIMILARITY_SHRINKAGE):
+    """
+    حساب أعلى K دورات مشابهة لكل دورة.
+    يرجع {course_id: [(similar_course_id, score), ...]} مرتبة تنازلياً.
+    """
+    dot = defaultdict(lambda: defaultdict(float))
+    support = defaultdict(lambda: defaultdict(int))
+    norms = defaultdict(float)
+
+    for items in interactions.values():
+        if len(items) > MAX_ITEMS_PER_USER:
+            items = dict(sorted(items.items(), key=lambda kv: -kv[1])[:MAX_ITEMS_PER_USER])
+        for course_id, weight in items.items():
+            norms[course_id] += weight * weight
+        for (a, wa), (b, wb) in combinations(items.items(), 2):
+            product = wa * wb
+            dot[a][b] += product
+            dot[b][a] += product
+            support[a][b] += 1
+            support[b][a] += 1
+
+    neighbors = {}
+    for course_id, row in dot.items():
+        norm_a = math.sqrt(norms[course_id])
+        scored = []
+        for other_id, value in row.items():
+            cosine = value / (norm_a * math.sqrt(norms[other_id]))
+            count = support[course_id][other_id]
+            scored.append((other_id, cosine * count / (count + shrinkage)))
+        scored.sort(key=lambda pair: -pair[1])
+        neighbors[course_id] = scored[:top_k]
+    return neighbors
+
+
+@transaction.atomic
+def rebuild_similarity_table(top_k=SIMILARITY_TOP_K):
+    """إعادة بناء جدول CourseSimilarity بالكامل"""
+    neighbors = compute_similarities(build_interactions(), top_k=top_k)
+    CourseSimilarity.objects.all().delete()
+    rows = [
+        CourseSimilarity(course_id=course_id, similar_course_id=other_id, score=score, rank=rank)
+        for course_id, scored in neighbors.items()
+        for rank, (other_id, score) in enumerate(scored, start=1)
+    ]
+    CourseSimilarity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
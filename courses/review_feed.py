@@ -0,0 +1,182 @@
+"""
+تقييمات الدورة على دفعات: صفحات بمؤشر (cursor) وتوزيع النجوم من الكاش
+
+- get_page(): تقييمات دورة مرتبة بالأحدث أو الأكثر فائدة، مع فلترة بعدد
+  النجوم. المؤشر هو قيم حقول الترتيب لآخر تقييم معروض (keyset)، فكل صفحة
+  استعلام واحد على فهرس (course, ...) مهما كان عمقها، بدون OFFSET أو count.
+- rating_histogram(): عدد التقييمات لكل نجمة والمتوسط، محفوظ في الكاش
+  لمدة REVIEW_HISTOGRAM_TIMEOUT ويُحذف عند حفظ/حذف تقييم (courses.signals).
+- toggle_helpful(): تصويت "مفيد" مع تحديث helpful_count بأمر UPDATE.
+"""
+import base64
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+CACHE_PREFIX = 'courses:reviews:histogram:'
+HISTOGRAM_TIMEOUT = getattr(settings, 'REVIEW_HISTOGRAM_TIMEOUT', 600)
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+# الترتيب: (الحقل، هل هو تاريخ) - كلها تنازلية وآخرها id لكسر التعادل
+SORTS = {
+    'newest': (('created_at', True), ('id', False)),
+    'helpful': (('helpful_count', False), ('created_at', True), ('id', False)),
+}
+REVIEW_USER_FIELDS = ('user__username', 'user__first_name', 'user__last_name', 'user__avatar')
+
+
+# ==================== المؤشر ====================
+
+def encode_cursor(review, sort):
+    values = [
+        getattr(review, field).isoformat() if is_date else getattr(review, field)
+        for field, is_date in SORTS[sort]
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """قيم حقول الترتيب من المؤشر (ValueError إذا كان غير صالح)"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if len(values) != len(SORTS[sort]):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if is_date else int(value)
+            for value, (field, is_date) in zip(values, SORTS[sort])
+        ]
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError('مؤشر غير صالح') from exc
+
+
+def _after(sort, values):
+    """التقييمات التالية لقيم المؤشر في ترتيب تنازلي"""
+    fields = [field for field, is_date in SORTS[sort]]
+    condition = Q()
+    for position, field in enumerate(fields):
+        step = Q(**{f'{field}__lt': values[position]})
+        for previous, value in zip(fields[:position], values):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+# ==================== الصفحات ====================
+
+def get_page(course_id, sort='newest', ratings=None, cursor=None, limit=PAGE_SIZE):
+    """
+    (التقييمات، مؤشر الصفحة التالية أو None)
+    ratings: أعداد النجوم المطلوبة (None = الكل)
+    """
+    from .models import Review
+
+    queryset = Review.objects.filter(course_id=course_id)
+    if ratings:
+        queryset = queryset.filter(rating__in=ratings)
+    if cursor:
+        queryset = queryset.filter(_after(sort, decode_cursor(cursor, sort)))
+
+    ordering = [f'-{field}' for field, is_date in SORTS[sort]]
+    reviews = list(
+        queryset.select_related('user')
+        .only('id', 'course_id', 'rating', 'comment', 'helpful_count', 'created_at', 'user_id', *REVIEW_USER_FIELDS)
+        .order_by(*ordering)[:limit + 1]
+    )
+    next_cursor = encode_cursor(reviews[limit - 1], sort) if len(reviews) > limit else None
+    return reviews[:limit], next_cursor
+
+
+def serialize(review):
+    user = review.user
+    return {
+        'id': review.id,
+        'user': user.get_full_name() or user.username,
+        'initial': (user.first_name[:1] or user.username[:1]).upper(),
+        'avatar': user.avatar.url if user.avatar else '',
+        'rating': review.rating,
+        'comment': review.comment,
+        'helpful_count': review.helpful_count,
+        'created_at': review.created_at.isoformat(),
+    }
+
+
+def page_data(course_id, sort='newest', ratings=None, cursor=None, limit=PAGE_SIZE):
+    """استجابة الـ API: الصفحة، المؤشر التالي، وتوزيع النجوم مع الصفحة الأولى"""
+    reviews, next_cursor = get_page(course_id, sort, ratings, cursor, limit)
+    data = {
+        'results': [serialize(review) for review in reviews],
+        'next_cursor': next_cursor,
+    }
+    if not cursor:
+        data['histogram'] = rating_histogram(course_id)
+    return data
+
+
+async def apage_data(course_id, sort='newest', ratings=None, cursor=None, limit=PAGE_SIZE):
+    return await sync_to_async(page_data)(course_id, sort, ratings, cursor, limit)
+
+
+# ==================== توزيع النجوم ====================
+
+def _histogram_key(course_id):
+    return f'{CACHE_PREFIX}{course_id}'
+
+
+def build_histogram(course_id):
+    from .models import Review
+
+    counts = Review.objects.filter(course_id=course_id).aggregate(**{
+        str(stars): Count('id', filter=Q(rating=stars)) for stars in range(1, 6)
+    })
+    total = sum(counts.values())
+    average = sum(int(stars) * count for stars, count in counts.items()) / total if total else 0
+    return {
+        'total': total,
+        'average': round(average, 1),
+        'counts': {int(stars): count for stars, count in counts.items()},
+    }
+
+
+def rating_histogram(course_id):
+    histogram = cache.get(_histogram_key(course_id))
+    if histogram is None:
+        histogram = build_histogram(course_id)
+        cache.set(_histogram_key(course_id), histogram, HISTOGRAM_TIMEOUT)
+    return histogram
+
+
+def invalidate(course_id):
+    transaction.on_commit(lambda: cache.delete(_histogram_key(course_id)))
+
+
+# ==================== التصويت ====================
+
+def toggle_helpful(user, review):
+    """(هل صوت المستخدم الآن، عدد الأصوات بعد التحديث)"""
+    from .models import Review, ReviewVote
+
+    with transaction.atomic():
+        deleted, _ = ReviewVote.objects.filter(review=review, user=user).delete()
+        if deleted:
+            Review.objects.filter(pk=review.pk).update(helpful_count=F('helpful_count') - 1)
+        else:
+            try:
+                with transaction.atomic():
+                    ReviewVote.objects.create(review=review, user=user)
+            except IntegrityError:
+                # طلب متزامن من نفس المستخدم سبقنا إلى التصويت
+                pass
+            else:
+                Review.objects.filter(pk=review.pk).update(helpful_count=F('helpful_count') + 1)
+        helpful_count = Review.objects.filter(pk=review.pk).values_list('helpful_count', flat=True).get()
+    return not deleted, helpful_count
+
+
+async def atoggle_helpful(user, review):
+    return await sync_to_async(toggle_helpful)(user, review)
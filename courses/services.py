@@ -5,6 +5,8 @@ from .models import (
     Course, Category, Enrollment, Favorite, Review, 
     User, CourseModule, Lesson, LessonProgress
 )
+from .cards import get_cards
+from .shelves import get_shelf
 
 class CourseService:
     """خدمات متقدمة للدورات"""
@@ -55,55 +57,37 @@ class CourseService:
     
     @staticmethod
     def get_categories_with_counts():
-        """الحصول على التصنيفات مع عدد الدورات"""
-        return Category.objects.annotate(
-            course_count=Count('courses', filter=Q(courses__is_active=True)),
-            active_courses=Count('courses', filter=Q(courses__is_active=True))
-        ).order_by('-course_count')
+        """الحصول على التصنيفات مع عدد الدورات (من فهرس التصنيفات في الكاش)"""
+        from .category_index import get_categories
+        categories = get_categories(order_by='-course_count')
+        for category in categories:
+            category.active_courses = category.course_count
+        return categories
     
     @staticmethod
     def get_featured_courses(limit=6):
-        """الحصول على الدورات المميزة"""
-        return Course.objects.filter(
-            is_active=True, 
-            is_featured=True
-        ).select_related('category', 'instructor')[:limit]
+        """الحصول على الدورات المميزة (من رفوف الكاش)"""
+        return get_shelf('featured', limit)
     
     @staticmethod
     def get_latest_courses(limit=8):
         """الحصول على أحدث الدورات"""
-        return Course.objects.filter(
-            is_active=True
-        ).select_related(
-            'category', 'instructor'
-        ).order_by('-created_at')[:limit]
+        return get_shelf('latest', limit)
     
     @staticmethod
     def get_popular_courses(limit=6):
         """الحصول على الدورات الأكثر شهرة (حسب عدد الطلاب)"""
-        return Course.objects.filter(
-            is_active=True
-        ).select_related(
-            'category', 'instructor'
-        ).order_by('-students_count', '-rating')[:limit]
+        return get_shelf('popular', limit)
     
     @staticmethod
     def get_top_rated_courses(limit=6):
         """الحصول على الدورات الأعلى تقييماً"""
-        return Course.objects.filter(
-            is_active=True,
-            rating__gt=0
-        ).select_related(
-            'category', 'instructor'
-        ).order_by('-rating', '-students_count')[:limit]
+        return get_shelf('top_rated', limit)
     
     @staticmethod
     def get_free_courses(limit=6):
         """الحصول على الدورات المجانية"""
-        return Course.objects.filter(
-            is_active=True,
-            price=0
-        ).select_related('category', 'instructor')[:limit]
+        return get_shelf('free', limit)
     
     @staticmethod
     def get_courses_by_category(category_slug):
@@ -142,15 +126,26 @@ class CourseService:
     
     @staticmethod
     def get_related_courses(course, limit=4):
-        """الحصول على دورات مشابهة"""
-        return Course.objects.filter(
-            Q(category=course.category) | Q(level=course.level),
-            is_active=True
-        ).exclude(id=course.id).select_related(
-            'category', 'instructor'
-        ).annotate(
-            relevance=Count('id')
-        ).order_by('-relevance', '-rating')[:limit]
+        """الحصول على دورات مشابهة كبطاقات (من جدول التشابه المحسوب مسبقاً)"""
+        related = get_cards(
+            Course.objects.filter(
+                is_active=True,
+                neighbor_of__course=course,
+            ).order_by('neighbor_of__rank')[:limit],
+            with_counts=True,
+        )
+        
+        if len(related) < limit:
+            # دورة جديدة بدون بيانات كافية: إكمال القائمة من نفس التصنيف والمستوى
+            fallback = Course.objects.filter(
+                Q(category_id=course.category_id) | Q(level=course.level),
+                is_active=True
+            ).exclude(
+                id__in=[course.id] + [c.id for c in related]
+            ).order_by('-rating', '-students_count')[:limit - len(related)]
+            related += get_cards(fallback, with_counts=True)
+        
+        return related
     
     @staticmethod
     def get_instructor_courses(instructor_id, limit=None):
@@ -213,39 +208,46 @@ class CourseService:
     
     @staticmethod
     def get_course_recommendations(user, limit=4):
-        """توصيات مخصصة للمستخدم بناءً على اهتماماته"""
+        """توصيات مخصصة للمستخدم (بطاقات) بناءً على الدورات المشابهة لما سجل فيه أو فضّله"""
         if not user.is_authenticated:
-            return CourseService.get_popular_courses(limit)
+            return list(CourseService.get_popular_courses(limit))
         
-        # الحصول على تصنيفات الدورات التي سجل فيها المستخدم
-        user_categories = Category.objects.filter(
-            courses__enrollments__user=user,
-            courses__enrollments__status='enrolled'
-        ).distinct()
+        enrolled_ids = Enrollment.objects.filter(
+            user=user,
+            status__in=['enrolled', 'completed', 'pending']
+        ).values('course_id')
+        favorite_ids = Favorite.objects.filter(user=user).values('course_id')
         
-        # الحصول على مستويات الدورات التي سجل فيها المستخدم
-        user_levels = Course.objects.filter(
-            enrollments__user=user,
-            enrollments__status='enrolled'
-        ).values_list('level', flat=True).distinct()
+        recommendations = get_cards(
+            Course.objects.filter(
+                Q(neighbor_of__course__in=enrolled_ids) | Q(neighbor_of__course__in=favorite_ids),
+                is_active=True
+            ).exclude(
+                Q(id__in=enrolled_ids) | Q(id__in=favorite_ids)
+            ).annotate(
+                match_score=Sum('neighbor_of__score')
+            ).order_by('-match_score', '-rating')[:limit]
+        )
         
-        # توصيات بناءً على التصنيفات والمستويات المفضلة
-        recommendations = Course.objects.filter(
-            Q(category__in=user_categories) | Q(level__in=user_levels),
-            is_active=True
-        ).exclude(
-            enrollments__user=user,
-            enrollments__status__in=['enrolled', 'completed']
-        ).select_related(
-            'category', 'instructor'
-        ).annotate(
-            match_score=Count('id')
-        ).order_by('-match_score', '-rating')[:limit]
+        if len(recommendations) < limit:
+            # مستخدم جديد (cold start): الأعلى تقييماً في تصنيفات اهتماماته ثم الأكثر شعبية
+            exclude_ids = [c.id for c in recommendations]
+            fallback = Course.objects.filter(
+                Q(category__courses__in=enrolled_ids) | Q(category__courses__in=favorite_ids),
+                is_active=True
+            ).exclude(
+                Q(id__in=enrolled_ids) | Q(id__in=favorite_ids) | Q(id__in=exclude_ids)
+            ).distinct().order_by('-rating', '-students_count')[:limit - len(recommendations)]
+            recommendations += get_cards(fallback)
         
-        if recommendations.count() < limit:
-            # إضافة دورات شائعة إذا لم تكن التوصيات كافية
-            popular = CourseService.get_popular_courses(limit - recommendations.count())
-            recommendations = list(recommendations) + list(popular)
+        if len(recommendations) < limit:
+            popular = Course.objects.filter(
+                is_active=True
+            ).exclude(
+                Q(id__in=enrolled_ids) | Q(id__in=favorite_ids) |
+                Q(id__in=[c.id for c in recommendations])
+            ).order_by('-students_count', '-rating')[:limit - len(recommendations)]
+            recommendations += get_cards(popular)
         
         return recommendations
 
@@ -406,6 +408,15 @@ class FavoriteService:
             favorite.delete()
             return False, 'تمت الإزالة من المفضلة'
         return True, 'تمت الإضافة إلى المفضلة'
+
+    @staticmethod
+    async def atoggle_favorite(user, course):
+        """نسخة async من toggle_favorite"""
+        favorite, created = await Favorite.objects.aget_or_create(user=user, course=course)
+        if not created:
+            await favorite.adelete()
+            return False, 'تمت الإزالة من المفضلة'
+        return True, 'تمت الإضافة إلى المفضلة'
     
     @staticmethod
     def is_favorite(user, course):
@@ -0,0 +1,66 @@
+"""
+رفوف الدورات المحسوبة مسبقاً (المميزة، الأحدث، الأكثر شهرة، الأعلى تقييماً، المجانية)
+
+كل رف قائمة مرتبة من صفوف بطاقات الدورات (courses.cards) محفوظة في
+الكاش:
+- تُبنى عند أول قراءة بعد انتهاء صلاحيتها (SHELF_REFRESH_INTERVAL) أو عبر
+      python manage.py refresh_shelves
+- تُحذف عند حفظ/حذف دورة أو تعديل تصنيف أو مدرب (courses.signals).
+
+القراءة تعيد كائنات CourseCard (حالة الخصم محسوبة عند القراءة) بدون
+استعلامات. في القوالب تُمرر كـ SimpleLazyObject فلا تكلف الصفحات التي لا
+تعرضها شيئاً.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+CACHE_PREFIX = 'courses:shelf:'
+SHELF_SIZE = 12
+SHELF_REFRESH_INTERVAL = getattr(settings, 'SHELF_REFRESH_INTERVAL', 900)
+
+# اسم الرف: (فلتر إضافي، الترتيب)
+SHELVES = {
+    'featured': (Q(is_featured=True), ('-created_at',)),
+    'latest': (Q(), ('-created_at',)),
+    'popular': (Q(), ('-students_count', '-rating')),
+    'top_rated': (Q(rating__gt=0), ('-rating', '-students_count')),
+    'free': (Q(price=0), ('-created_at',)),
+}
+
+
+def _key(name):
+    return CACHE_PREFIX + name
+
+
+def build_shelf(name):
+    """صفوف بطاقات الرف من قاعدة البيانات (استعلام واحد)"""
+    from .cards import card_values
+    from .models import Course
+
+    condition, ordering = SHELVES[name]
+    queryset = Course.objects.filter(condition, is_active=True).order_by(*ordering)
+    return list(card_values(queryset)[:SHELF_SIZE])
+
+
+def refresh(names=None):
+    """إعادة بناء الرفوف وتخزينها"""
+    shelves = {name: build_shelf(name) for name in (names or SHELVES)}
+    cache.set_many({_key(name): records for name, records in shelves.items()}, timeout=SHELF_REFRESH_INTERVAL)
+    return shelves
+
+
+def invalidate():
+    """حذف كل الرفوف بعد نجاح الـ transaction الحالية"""
+    transaction.on_commit(lambda: cache.delete_many([_key(name) for name in SHELVES]))
+
+
+def get_shelf(name, limit=6):
+    """أول limit دورة من الرف كبطاقات CourseCard"""
+    from .cards import to_cards
+
+    rows = cache.get(_key(name))
+    if rows is None:
+        rows = refresh([name])[name]
+    return to_cards(rows[:limit])
@@ -0,0 +1,332 @@
+"""
+إشارات تطبيق الدورات
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import (
+    category_index, course_page, facets, lesson_search, platform_stats, review_feed, shelves, typeahead,
+)
+from .models import Category, Course, CourseModule, Enrollment, Lesson, Review, User
+from .video import enqueue
+
+
+def _file_name(instance, field_name):
+    """اسم الملف بدون تحميل الحقل إذا كان مؤجلاً (deferred)"""
+    value = instance.__dict__.get(field_name)
+    return getattr(value, 'name', value) or ''
+
+
+# ==================== Video Transcoding ====================
+
+@receiver(post_init, sender=Lesson)
+def remember_lesson_video(sender, instance, **kwargs):
+    instance._original_video_file = _file_name(instance, 'video_file')
+
+
+@receiver(post_save, sender=Lesson)
+def enqueue_lesson_video(sender, instance, created, raw=False, **kwargs):
+    """إنشاء مهمة تحويل عند رفع فيديو جديد للدرس"""
+    if raw:
+        return
+    current = _file_name(instance, 'video_file')
+    if current == getattr(instance, '_original_video_file', ''):
+        return
+    instance._original_video_file = current
+
+    if instance.hls_manifest:
+        # الـ manifest القديم يخص الفيديو السابق
+        Lesson.objects.filter(pk=instance.pk).update(hls_manifest='')
+        instance.hls_manifest = ''
+
+    if current:
+        transaction.on_commit(lambda: enqueue(instance))
+
+
+# ==================== Platform Stats ====================
+
+# الحقول التي تحدد مساهمة الكائن في عدادات platform_stats
+STATS_FIELDS = {
+    User: ('role', 'is_active'),
+    Course: ('is_active',),
+    Enrollment: ('status',),
+    Lesson: (),
+    Review: ('rating',),
+}
+
+
+def _stats_contribution(sender, values):
+    """{العداد: القيمة} التي يساهم بها الكائن"""
+    if sender is User:
+        counter = platform_stats.user_counter(values['role'], values['is_active'])
+        return {counter: 1} if counter else {}
+    if sender is Course:
+        return {'total_courses': 1} if values['is_active'] else {}
+    if sender is Enrollment:
+        return {'total_enrollments': 1} if values['status'] == 'enrolled' else {}
+    if sender is Lesson:
+        return {'total_lessons': 1}
+    return {'total_reviews': 1, 'rating_sum': values['rating'] or 0}
+
+
+def remember_stats_contribution(sender, instance, **kwargs):
+    fields = STATS_FIELDS[sender]
+    if all(field in instance.__dict__ for field in fields):
+        instance._stats_contribution = _stats_contribution(sender, instance.__dict__)
+    else:
+        # حقل مؤجل (deferred): لا نعرف الحالة الأصلية
+        instance._stats_contribution = None
+
+
+def update_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or any(field not in instance.__dict__ for field in STATS_FIELDS[sender]):
+        # حقل مؤجل (deferred) لا يكتبه الحفظ، ولا نريد تحميله باستعلام إضافي
+        return
+    old = {} if created else getattr(instance, '_stats_contribution', None)
+    new = _stats_contribution(sender, {field: getattr(instance, field) for field in STATS_FIELDS[sender]})
+    instance._stats_contribution = new
+    if old is None or old == new:
+        return
+    platform_stats.adjust(**{
+        counter: new.get(counter, 0) - old.get(counter, 0) for counter in set(old) | set(new)
+    })
+
+
+def update_stats_on_delete(sender, instance, **kwargs):
+    contribution = getattr(instance, '_stats_contribution', None)
+    if contribution:
+        platform_stats.adjust(**{counter: -value for counter, value in contribution.items()})
+
+
+for _model in STATS_FIELDS:
+    post_init.connect(remember_stats_contribution, sender=_model, dispatch_uid=f'stats_init_{_model.__name__}')
+    post_save.connect(update_stats_on_save, sender=_model, dispatch_uid=f'stats_save_{_model.__name__}')
+    post_delete.connect(update_stats_on_delete, sender=_model, dispatch_uid=f'stats_delete_{_model.__name__}')
+
+
+# ==================== Category Index ====================
+
+def _course_category_state(instance):
+    return instance.__dict__.get('is_active'), instance.__dict__.get('category_id')
+
+
+@receiver(post_init, sender=Course)
+def remember_course_category_state(sender, instance, **kwargs):
+    instance._category_state = _course_category_state(instance)
+
+
+@receiver(post_save, sender=Course)
+def invalidate_category_index_on_course_save(sender, instance, created, raw=False, **kwargs):
+    """عدد الدورات النشطة لكل تصنيف يتغير فقط مع is_active أو category"""
+    state = _course_category_state(instance)
+    if created or state != getattr(instance, '_category_state', None):
+        category_index.invalidate()
+    instance._category_state = state
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_index(sender, **kwargs):
+    category_index.invalidate()
+
+
+# ==================== Course Shelves ====================
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_shelves(sender, raw=False, **kwargs):
+    if not raw:
+        shelves.invalidate()
+
+
+@receiver(post_save, sender=User)
+def invalidate_shelves_on_instructor_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """اسم المدرب وصورته تظهر في بطاقات الرفوف (تجاهل تحديث last_login)"""
+    if raw or not instance.is_instructor() or update_fields == frozenset({'last_login'}):
+        return
+    shelves.invalidate()
+
+
+# ==================== Catalog Facets ====================
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_facets(sender, raw=False, **kwargs):
+    if not raw:
+        facets.invalidate()
+
+
+# ==================== Typeahead Index ====================
+# (بعد Category Index حتى يُبطل فهرس التصنيفات قبل قراءته هنا)
+
+# حقول الدورة التي تظهر في الفهرس أو تغير عناصر المدرب والتصنيف
+# (students_count للترتيب فقط ويتجدد مع إعادة البناء التالية)
+TYPEAHEAD_COURSE_FIELDS = ('title', 'slug', 'is_active', 'instructor_id', 'category_id')
+
+
+def _typeahead_course_state(instance):
+    return tuple(instance.__dict__.get(field) for field in TYPEAHEAD_COURSE_FIELDS)
+
+
+@receiver(post_init, sender=Course)
+def remember_typeahead_course_state(sender, instance, **kwargs):
+    instance._typeahead_state = _typeahead_course_state(instance)
+
+
+@receiver(post_save, sender=Course)
+def update_typeahead_course(sender, instance, created, raw=False, **kwargs):
+    """update_rating() وغيره من الحفظ الجزئي لا يعيد بناء الفهرس"""
+    old = getattr(instance, '_typeahead_state', None)
+    state = _typeahead_course_state(instance)
+    instance._typeahead_state = state
+    if raw or (not created and state == old):
+        return
+    previous_instructor_id = old[3] if old and not created else None
+    typeahead.update_course(instance, previous_instructor_id)
+
+
+@receiver(post_delete, sender=Course)
+def remove_typeahead_course(sender, instance, **kwargs):
+    typeahead.remove_course(instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def update_typeahead_categories(sender, raw=False, **kwargs):
+    if not raw:
+        typeahead.update_categories()
+
+
+TYPEAHEAD_USER_FIELDS = ('role', 'is_active', 'username', 'first_name', 'last_name')
+
+
+def _typeahead_user_state(instance):
+    return tuple(instance.__dict__.get(field) for field in TYPEAHEAD_USER_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_typeahead_user_state(sender, instance, **kwargs):
+    instance._typeahead_state = _typeahead_user_state(instance)
+
+
+@receiver(post_save, sender=User)
+def update_typeahead_instructor(sender, instance, raw=False, **kwargs):
+    """اسم المدرب أو دوره أو تفعيله تغير (يشمل من لم يعد مدرباً)"""
+    old = getattr(instance, '_typeahead_state', None)
+    state = _typeahead_user_state(instance)
+    instance._typeahead_state = state
+    if raw or state == old:
+        return
+    if 'instructor' in (state[0], old and old[0]):
+        typeahead.update_instructor(instance)
+
+
+# ==================== Lesson Search ====================
+
+def _lesson_course_id(instance, module_id):
+    if Lesson.module.is_cached(instance) and instance.module.pk == module_id:
+        return instance.module.course_id
+    return CourseModule.objects.filter(pk=module_id).values_list('course_id', flat=True).first()
+
+
+@receiver(post_init, sender=Lesson)
+def remember_lesson_module(sender, instance, **kwargs):
+    instance._original_module_id = instance.__dict__.get('module_id')
+
+
+@receiver(post_save, sender=Lesson)
+def update_lesson_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course_id = _lesson_course_id(instance, instance.module_id)
+    lesson_search.update_lesson(instance, course_id)
+
+    # نقل الدرس إلى وحدة في دورة أخرى
+    old_module_id = getattr(instance, '_original_module_id', None)
+    if old_module_id and old_module_id != instance.module_id:
+        old_course_id = _lesson_course_id(instance, old_module_id)
+        if old_course_id and old_course_id != course_id:
+            lesson_search.remove_lesson(instance, old_course_id)
+    instance._original_module_id = instance.module_id
+
+
+@receiver(post_delete, sender=Lesson)
+def remove_lesson_search(sender, instance, **kwargs):
+    course_id = _lesson_course_id(instance, instance.module_id)
+    if course_id:
+        lesson_search.remove_lesson(instance, course_id)
+
+
+@receiver(post_save, sender=CourseModule)
+@receiver(post_delete, sender=CourseModule)
+def invalidate_lesson_search(sender, instance, raw=False, **kwargs):
+    """عنوان الوحدة وترتيبها جزء من نتائج كل دروسها"""
+    if not raw:
+        lesson_search.invalidate(instance.course_id)
+
+
+# ==================== Course Page ====================
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_page(sender, instance, raw=False, **kwargs):
+    if not raw:
+        course_page.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=CourseModule)
+@receiver(post_delete, sender=CourseModule)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_course_page_on_related_change(sender, instance, raw=False, **kwargs):
+    """المنهج والتقييمات جزء من الصفحة العامة"""
+    if not raw:
+        course_page.invalidate(instance.course_id)
+
+
+@receiver(post_init, sender=Enrollment)
+def remember_enrollment_status(sender, instance, **kwargs):
+    instance._course_page_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Enrollment)
+def invalidate_course_page_on_enrollment_save(sender, instance, created, raw=False, **kwargs):
+    """عدد الطلاب يتغير فقط مع status (وليس last_accessed أو التقدم)"""
+    if 'status' not in instance.__dict__:
+        # status مؤجل (deferred): الحفظ لا يكتبه، فلم يتغير
+        return
+    old = None if created else getattr(instance, '_course_page_status', None)
+    instance._course_page_status = instance.status
+    if not raw and old != instance.status and 'enrolled' in (old, instance.status):
+        course_page.invalidate(instance.course_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def invalidate_course_page_on_enrollment_delete(sender, instance, **kwargs):
+    if instance.__dict__.get('status', 'enrolled') == 'enrolled':
+        course_page.invalidate(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_course_page_on_lesson_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course_id = _lesson_course_id(instance, instance.module_id)
+    if course_id:
+        course_page.invalidate(course_id)
+
+
+# ==================== Review Histogram ====================
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_histogram(sender, instance, raw=False, **kwargs):
+    if not raw:
+        review_feed.invalidate(instance.course_id)
@@ -0,0 +1,139 @@
+"""
+تقديم ملفات الوسائط المحمية (فيديوهات الدروس) مع دعم طلبات Range
+
+الخطوات:
+- إذا تم ضبط PROTECTED_MEDIA_ACCEL_PREFIX يتم تسليم الملف للـ reverse proxy
+  عبر X-Accel-Redirect (nginx) ولا يبقى عامل gunicorn مشغولاً بالبث.
+- بخلاف ذلك يُقدّم الملف عبر FileResponse (يستفيد من wsgi.file_wrapper/sendfile)
+  مع دعم 206 Partial Content لطلبات Range.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+# أنواع ملفات HLS غير معرفة في بعض الأنظمة
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+STREAM_CHUNK_SIZE = getattr(settings, 'PROTECTED_MEDIA_CHUNK_SIZE', 64 * 1024)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """
+    تحليل ترويسة Range (نطاق واحد فقط).
+    ترجع (start, end) أو None إذا كانت غير قابلة للتلبية.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N  => آخر N بايت
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _range_iterator(file_obj, length):
+    try:
+        remaining = length
+        while remaining > 0:
+            chunk = file_obj.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file_obj.close()
+
+
+def serve_protected_file(request, field_file, cache_control='private, max-age=3600'):
+    """
+    إرجاع استجابة لملف محمي بعد التحقق من الصلاحيات في الـ view.
+    """
+    if not field_file:
+        raise Http404
+    name = field_file.name
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    # ✅ تسليم البث للـ reverse proxy
+    accel_prefix = getattr(settings, 'PROTECTED_MEDIA_ACCEL_PREFIX', '')
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(name)
+        response['Cache-Control'] = cache_control
+        return response
+
+    try:
+        path = field_file.path
+        stat = os.stat(path)
+    except (NotImplementedError, FileNotFoundError):
+        raise Http404
+
+    size = stat.st_size
+    etag = f'"{int(stat.st_mtime):x}-{size:x}"'
+    last_modified = http_date(stat.st_mtime)
+
+    # ✅ الطلبات الشرطية
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header:
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == etag or (
+            parse_http_date_safe(if_range) is not None
+            and parse_http_date_safe(if_range) >= int(stat.st_mtime)
+        ):
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+    file_obj = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file_obj, content_type=content_type)
+    else:
+        start, end = byte_range
+        file_obj.seek(start)
+        if end == size - 1:
+            # نطاق مفتوح حتى نهاية الملف: FileResponse يحسب الطول من الموضع الحالي
+            # ويبقى قابلاً للإرسال عبر sendfile
+            response = FileResponse(file_obj, status=206, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                _range_iterator(file_obj, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    if isinstance(response, FileResponse):
+        response.block_size = STREAM_CHUNK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = cache_control
+    return response
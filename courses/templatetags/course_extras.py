@@ -2,7 +2,9 @@ from django import template
 from django.db.models import Count, Q
 from django.urls import reverse
 from django.utils.text import slugify
-import re  # ⚠️ أضف هذا السطر المهم
+
+from courses import video_urls
+from courses.video_urls import is_direct_video_url, parse_video_url, youtube_id
 
 register = template.Library()
 
@@ -113,73 +115,22 @@ def render_course_card(context, course):
 def youtube_embed_id(url):
     """
     استخراج معرف الفيديو من رابط يوتيوب
-    يدعم جميع صيغ الروابط
+    يدعم جميع صيغ الروابط (انظر courses/video_urls.py)
     """
-    if not url:
-        return ''
-    
-    import re
-    
-    # تحويل الرابط إلى نص
-    url = str(url).strip()
-    
-    # قائمة بجميع الأنماط الممكنة لروابط يوتيوب
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=)([\w-]+)',
-        r'(?:youtube\.com\/watch\?.*&v=)([\w-]+)',
-        r'(?:youtu\.be\/)([\w-]+)',
-        r'(?:youtube\.com\/embed\/)([\w-]+)',
-        r'(?:youtube\.com\/v\/)([\w-]+)',
-        r'(?:youtube\.com\/shorts\/)([\w-]+)',
-        r'(?:youtube\.com\/live\/)([\w-]+)',
-        r'(?:youtube\.com\/watch\?v%3D)([\w-]+)',  # روابط مشفرة
-        r'(?:youtube\.com\/attribution_link\?.*v%3D)([\w-]+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            video_id = match.group(1)
-            print(f"✅ تم استخراج معرف الفيديو: {video_id}")  # للتصحيح
-            return video_id
-    
-    # إذا كان الرابط هو معرف بالفعل (عادة 11 حرف)
-    if re.match(r'^[a-zA-Z0-9_-]{11}$', url):
-        print(f"✅ الرابط هو معرف مباشر: {url}")
-        return url
-    
-    print(f"❌ لم نتمكن من استخراج معرف من الرابط: {url}")
-    return ''
+    return youtube_id(url)
 
 
 @register.filter
 def is_valid_youtube_url(url):
     """التحقق من صحة رابط يوتيوب"""
-    if not url:
-        return False
-    
-    video_id = youtube_embed_id(url)
-    return bool(video_id and len(video_id) == 11)
+    return len(youtube_id(url)) == 11
 
 @register.filter
 def is_valid_video_url(url):
     """التحقق من صحة رابط الفيديو"""
     if not url:
         return False
-    
-    # التحقق من رابط يوتيوب صالح
-    video_id = youtube_embed_id(url)
-    if video_id:
-        return True
-    
-    # التحقق من رابط مباشر
-    import re
-    video_extensions = ['.mp4', '.webm', '.ogg', '.mov']
-    url_lower = url.lower()
-    if any(ext in url_lower for ext in video_extensions):
-        return True
-    
-    return False
+    return bool(parse_video_url(url)) or is_direct_video_url(url)
 
 @register.filter
 def get_youtube_thumbnail(url, size='medium'):
@@ -187,7 +138,7 @@ def get_youtube_thumbnail(url, size='medium'):
     الحصول على رابط صورة مصغرة من رابط يوتيوب
     size: small, medium, large, maxres
     """
-    video_id = youtube_embed_id(url)
+    video_id = youtube_id(url)
     if not video_id:
         return ''
     
@@ -204,15 +155,4 @@ def get_youtube_thumbnail(url, size='medium'):
 @register.filter
 def is_youtube_url(url):
     """التحقق مما إذا كان الرابط من يوتيوب"""
-    if not url:
-        return False
-    youtube_patterns = [
-        r'youtube\.com',
-        r'youtu\.be',
-    ]
-    for pattern in youtube_patterns:
-        if re.search(pattern, str(url)):
-            return True
-    return False
-
-
+    return video_urls.is_youtube_url(url)
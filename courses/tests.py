@@ -1,3 +1,962 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import page_cache
+
+from . import (
+    category_index, course_page, facets, lesson_search, platform_stats, review_feed, shelves, typeahead,
+)
+from .cards import get_cards
+from .discounts import run_discount_schedule
+from .lesson_search import _terms, highlight
+from .models import (
+    Category, Course, CourseModule, CourseSimilarity, DiscountCampaign, Enrollment, Favorite, Lesson, LessonProgress,
+    Review, User, VideoJob,
+)
+from .recommendations import compute_similarities, rebuild_similarity_table
+from .services import CourseService
+from .streaming import _parse_range
+from .templatetags import course_extras
+from .video_urls import VideoRef, is_youtube_url, parse_video_url
+from .video import VIDEO_JOB_MAX_ATTEMPTS, VIDEO_JOB_TIMEOUT, claim_next_job
+from .typeahead import PrefixIndex, index_words, normalize, query_terms
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_removes_diacritics_and_tatweel(self):
+        self.assertEqual(normalize('البَرْمَجَـــة'), 'البرمجه')
+
+    def test_unifies_letter_forms_and_digits(self):
+        self.assertEqual(normalize('إدارة أعمال آمنة ٢٠٢٤'), 'اداره اعمال امنه 2024')
+        self.assertEqual(normalize('مستوى مبتدئ'), 'مستوي مبتدي')
+
+    def test_casefolds_latin(self):
+        self.assertEqual(normalize('Python  Django!'), 'python django')
+
+    def test_index_words_include_form_without_article(self):
+        words = index_words('علم البيانات والبرمجة للمبتدئين')
+        self.assertTrue({'البيانات', 'بيانات', 'والبرمجه', 'برمجه', 'للمبتديين', 'مبتديين'} <= words)
+
+    def test_short_words_keep_article(self):
+        # "الب" بداية كتابة "البرمجة" وليست أداة تعريف + كلمة
+        self.assertEqual(index_words('الة'), {'اله'})
+        self.assertEqual(query_terms('الب'), ['الب'])
+
+    def test_query_terms_strip_article(self):
+        self.assertEqual(query_terms('البيانات المتقدمة'), ['بيانات', 'متقدمه'])
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.add(('course', 1), {'kind': 'course', 'label': 'علم البيانات المتقدم', 'url': '/1/', 'score': 5})
+        self.index.add(('course', 2), {'kind': 'course', 'label': 'بيانات بايثون', 'url': '/2/', 'score': 9})
+
+    def labels(self, query):
+        return [entry['label'] for entry in self.index.match(query)]
+
+    def test_matches_words_with_article(self):
+        self.assertEqual(self.labels('بيانات'), ['بيانات بايثون', 'علم البيانات المتقدم'])
+        self.assertEqual(self.labels('متقدم'), ['علم البيانات المتقدم'])
+
+    def test_query_with_article_matches_word_without_it(self):
+        self.assertEqual(self.labels('البيانات'), ['بيانات بايثون', 'علم البيانات المتقدم'])
+
+    def test_partial_article_prefix(self):
+        self.assertEqual(self.labels('الب'), ['علم البيانات المتقدم'])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.labels('علم بيا'), ['علم البيانات المتقدم'])
+        self.assertEqual(self.labels('علم بايثون'), [])
+
+    def test_remove(self):
+        self.index.remove(('course', 2))
+        self.assertEqual(self.labels('بيانات'), ['علم البيانات المتقدم'])
+
+    def test_extend_matches_add(self):
+        index = PrefixIndex()
+        index.extend(
+            (key, dict(entry, words=None), None) for key, entry in self.index.entries.items()
+        )
+        self.assertEqual(index._words, self.index._words)
+
+        # استبدال عنصر موجود
+        index.extend([(('course', 2), {'kind': 'course', 'label': 'تحليل الصور', 'url': '/2/', 'score': 9}, None)])
+        self.assertEqual([entry['label'] for entry in index.match('بيانات')], ['علم البيانات المتقدم'])
+        self.assertEqual(index._words, sorted(index._words))
+
+
+class TypeaheadIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.course = Course.objects.create(
+            title='تحليل البيانات', slug='data', description='-', category=category,
+            instructor=instructor, price=Decimal('0'), is_active=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        typeahead._index = None
+
+    def titles(self):
+        return [entry['label'] for entry in typeahead.suggest('بيانات').get('course', [])]
+
+    def test_rename_without_shared_version_is_seen_after_max_age(self):
+        self.assertEqual(self.titles(), ['تحليل البيانات'])
+        # تعديل من عامل آخر لم يصل إصداره لهذه العملية
+        Course.objects.filter(pk=self.course.pk).update(title='تصميم الواجهات')
+        self.assertEqual(self.titles(), ['تحليل البيانات'])
+
+        with mock.patch.object(typeahead, 'INDEX_MAX_AGE', -1):
+            self.assertEqual(self.titles(), [])
+
+
+class LessonSearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.course = Course.objects.create(
+            title='بايثون', slug='python', description='-', category=category,
+            instructor=instructor, price=Decimal('0'),
+        )
+        module = CourseModule.objects.create(course=cls.course, title='الأساسيات', order=1)
+        cls.lesson = Lesson.objects.create(module=module, title='المتغيرات', content='-', order=1)
+
+    def setUp(self):
+        cache.clear()
+        lesson_search._indexes.clear()
+
+    def lesson_ids(self, query):
+        return [result['id'] for result in lesson_search.search(self.course.pk, query, full_access=True)]
+
+    def test_edit_without_shared_version_is_seen_after_max_age(self):
+        self.assertEqual(self.lesson_ids('متغيرات'), [self.lesson.pk])
+        Lesson.objects.filter(pk=self.lesson.pk).update(title='الدوال')
+        self.assertEqual(self.lesson_ids('دوال'), [])
+
+        with mock.patch.object(lesson_search, 'INDEX_MAX_AGE', -1):
+            self.assertEqual(self.lesson_ids('دوال'), [self.lesson.pk])
+
+
+class HighlightTests(SimpleTestCase):
+    def test_highlights_word_with_article(self):
+        self.assertEqual(
+            highlight('مقدمة في البرمجة بلغة بايثون', _terms('برمج')),
+            'مقدمة في <mark>البرمجة</mark> بلغة بايثون',
+        )
+
+    def test_highlights_word_with_diacritics(self):
+        self.assertEqual(
+            highlight('أساسيات البَرْمَجَة', _terms('البرمجة')),
+            'أساسيات <mark>البَرْمَجَة</mark>',
+        )
+
+    def test_escapes_html(self):
+        self.assertEqual(
+            highlight('<b>بيانات</b>', _terms('بيانات')),
+            '&lt;b&gt;<mark>بيانات</mark>&lt;/b&gt;',
+        )
+
+    def test_snippet_around_first_match(self):
+        text = 'كلمة ' * 30 + 'والبرمجة ' + 'نص ' * 30
+        snippet = highlight(text, _terms('برمجة'), radius=20)
+        self.assertTrue(snippet.startswith('…'))
+        self.assertTrue(snippet.endswith('…'))
+        self.assertIn('<mark>والبرمجة</mark>', snippet)
+        self.assertLess(len(snippet), len(text))
+
+
+class CategoryIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='برمجة', slug='programming')
+        cls.instructor = User.objects.create(username='teacher', role='instructor')
+
+    def setUp(self):
+        cache.clear()
+
+    def course_count(self):
+        return {row['slug']: row['course_count'] for row in category_index.get_index()['categories']}['programming']
+
+    def test_index_has_finite_timeout(self):
+        with mock.patch.object(category_index.cache, 'set') as cache_set:
+            category_index.get_index()
+        cache_set.assert_called_once_with(category_index.CACHE_KEY, mock.ANY, category_index.CATEGORY_INDEX_TIMEOUT)
+        self.assertIsNotNone(category_index.CATEGORY_INDEX_TIMEOUT)
+
+    def test_course_activation_refreshes_count(self):
+        self.assertEqual(self.course_count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(
+                title='بايثون', slug='python', description='-', category=self.category,
+                instructor=self.instructor, price=Decimal('0'), is_active=True,
+            )
+        self.assertEqual(self.course_count(), 1)
+
+
+class PlatformStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='برمجة', slug='programming')
+        cls.instructor = User.objects.create(username='teacher', role='instructor')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_course(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(
+                title='بايثون', slug='python', description='-', category=self.category,
+                instructor=self.instructor, price=Decimal('0'), is_active=True,
+            )
+
+    def test_shared_cache_counters_follow_signals(self):
+        with mock.patch.object(platform_stats, 'counters_are_shared', return_value=True):
+            self.assertEqual(platform_stats.get_platform_stats()['total_courses'], 0)
+            self.create_course()
+            with self.assertNumQueries(0):
+                self.assertEqual(platform_stats.get_platform_stats()['total_courses'], 1)
+
+    def test_local_cache_skips_counters_and_reads_aggregate(self):
+        self.assertEqual(platform_stats.get_platform_stats()['total_courses'], 0)
+        self.create_course()
+        # العامل الذي حفظ يرى نفس الرقم الذي تراه بقية العمال حتى إعادة القراءة
+        self.assertEqual(platform_stats.get_platform_stats()['total_courses'], 0)
+
+        # انتهاء مدة PLATFORM_STATS_LOCAL_TIMEOUT
+        cache.delete(platform_stats.FRESH_KEY)
+        self.assertEqual(platform_stats.get_platform_stats()['total_courses'], 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class CourseListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='برمجة', slug='programming')
+        cls.instructor = User.objects.create(username='teacher', role='instructor')
+        cls.create_courses(range(12))
+
+    @classmethod
+    def create_courses(cls, numbers):
+        # bulk_create لا يطلق إشارات فتبقى أعداد الأوجه المخزنة قديمة
+        Course.objects.bulk_create(
+            Course(
+                title=f'دورة {i}', slug=f'course-{i}', description='-', category=cls.category,
+                instructor=cls.instructor, price=Decimal('0'), is_active=True,
+            )
+            for i in numbers
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.instructor)
+
+    def test_pages_follow_queryset_when_facets_are_stale(self):
+        url = reverse('courses:course_list')
+        self.assertEqual(self.client.get(url).context['paginator'].num_pages, 1)
+
+        self.create_courses(range(12, 14))
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['courses']), 2)
+
+
+class DiscountScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.campaign_course, cls.manual_course = [
+            Course.objects.create(
+                title=title, slug=slug, description='-', category=cls.category,
+                instructor=instructor, price=Decimal('499.00'),
+            )
+            for title, slug in (('دورة الحملة', 'campaign'), ('دورة الخصم اليدوي', 'manual'))
+        ]
+        Course.objects.filter(pk=cls.manual_course.pk).update(
+            discount_percent=10,
+            discount_start_date=cls.now + timedelta(days=1),
+            discount_end_date=cls.now + timedelta(days=5),
+        )
+
+    def campaign(self, percent, hours):
+        return DiscountCampaign.objects.create(
+            name=f'{percent}%', discount_percent=percent, category=self.category,
+            start_date=self.now - timedelta(hours=1), end_date=self.now + timedelta(hours=hours),
+        )
+
+    def test_campaign_keeps_manual_discount(self):
+        self.campaign(50, hours=1)
+        run_discount_schedule(self.now)
+        run_discount_schedule(self.now + timedelta(hours=2))
+
+        manual = Course.objects.get(pk=self.manual_course.pk)
+        self.assertEqual(manual.discount_percent, 10)
+        self.assertEqual(manual.discount_end_date, self.now + timedelta(days=5))
+        self.assertIsNone(manual.discount_campaign_id)
+
+    def test_running_campaign_takes_over_after_larger_one_ends(self):
+        self.campaign(50, hours=1)
+        smaller = self.campaign(20, hours=48)
+        run_discount_schedule(self.now)
+        self.assertEqual(Course.objects.get(pk=self.campaign_course.pk).discount_percent, 50)
+
+        run_discount_schedule(self.now + timedelta(hours=2))
+        course = Course.objects.get(pk=self.campaign_course.pk)
+        self.assertEqual((course.discount_percent, course.discount_campaign_id), (20, smaller.pk))
+
+    def test_effective_price_has_two_decimal_places(self):
+        self.campaign(15, hours=1)
+        run_discount_schedule(self.now)
+        price = Course.objects.with_effective_price(self.now).get(pk=self.campaign_course.pk).effective_price
+        self.assertEqual(str(price), '424.15')
+
+
+class ClaimVideoJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='تصميم', slug='design')
+        instructor = User.objects.create(username='designer', role='instructor')
+        course = Course.objects.create(
+            title='تصميم', slug='design', description='-', category=category,
+            instructor=instructor, price=Decimal('0'),
+        )
+        module = CourseModule.objects.create(course=course, title='الوحدة الأولى', order=1)
+        cls.lesson = Lesson.objects.create(module=module, title='مقدمة', content='-', order=1)
+
+    def processing_job(self, seconds_ago, attempts=1):
+        return VideoJob.objects.create(
+            lesson=self.lesson, source='lessons/intro.mp4', status='processing', attempts=attempts,
+            started_at=timezone.now() - timedelta(seconds=seconds_ago),
+        )
+
+    def test_running_job_is_not_claimed(self):
+        self.processing_job(seconds_ago=60)
+        self.assertIsNone(claim_next_job())
+
+    def test_stale_job_is_reclaimed(self):
+        job = self.processing_job(seconds_ago=VIDEO_JOB_TIMEOUT + 60)
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+        self.assertGreater(claimed.started_at, timezone.now() - timedelta(seconds=60))
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job = self.processing_job(seconds_ago=VIDEO_JOB_TIMEOUT + 60, attempts=VIDEO_JOB_MAX_ATTEMPTS)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_satisfiable_ranges(self):
+        self.assertEqual(_parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(_parse_range('bytes=500-', 1000), (500, 999))
+        self.assertEqual(_parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(_parse_range('bytes=-5000', 1000), (0, 999))
+        self.assertEqual(_parse_range('bytes=900-5000', 1000), (900, 999))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=5-2', 'bytes=-0', 'bytes=-', 'items=0-1', 'bytes=0-1,5-6'):
+            with self.subTest(header=header):
+                self.assertIsNone(_parse_range(header, 1000))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False, PROTECTED_MEDIA_ACCEL_PREFIX='')
+class LessonVideoTests(TestCase):
+    CONTENT = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        os.makedirs(os.path.join(cls.media_root, 'lessons'))
+        with open(os.path.join(cls.media_root, 'lessons', 'intro.mp4'), 'wb') as video:
+            video.write(cls.CONTENT)
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='تصميم', slug='design')
+        instructor = User.objects.create(username='designer', role='instructor')
+        course = Course.objects.create(
+            title='تصميم', slug='design', description='-', category=category,
+            instructor=instructor, price=Decimal('100'), is_active=True,
+        )
+        module = CourseModule.objects.create(course=course, title='الوحدة الأولى', order=1)
+        cls.lesson = Lesson.objects.create(module=module, title='مقدمة', content='-', order=1)
+        # update بدلاً من save حتى لا تُنشأ مهمة تحويل
+        Lesson.objects.filter(pk=cls.lesson.pk).update(video_file='lessons/intro.mp4')
+        cls.student = User.objects.create(username='student')
+        cls.enrollment = Enrollment.objects.create(user=cls.student, course=course, status='enrolled')
+        cls.url = reverse('courses:lesson_video', args=[cls.lesson.pk])
+
+    def get(self, anonymous=False, **headers):
+        if not anonymous:
+            self.client.force_login(self.student)
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=3600')
+
+    def test_partial_range(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+    def test_open_ended_range(self):
+        response = self.get(Range='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[1000:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_stale_if_range_returns_full_file(self):
+        response = self.get(Range='bytes=10-19', **{'If-Range': '"old-etag"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(**{'If-None-Match': etag}).status_code, 304)
+
+    def test_requires_active_enrollment(self):
+        for status in ('pending', 'cancelled'):
+            with self.subTest(status=status):
+                Enrollment.objects.filter(pk=self.enrollment.pk).update(status=status)
+                self.assertEqual(self.get().status_code, 403)
+
+    def test_anonymous_only_free_lessons(self):
+        self.assertEqual(self.get(anonymous=True).status_code, 403)
+        Lesson.objects.filter(pk=self.lesson.pk).update(is_free=True)
+        response = self.get(anonymous=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+
+class VideoUrlTests(SimpleTestCase):
+    VIDEO_ID = 'dQw4w9WgXcQ'
+
+    def test_youtube_link_forms(self):
+        urls = [
+            f'https://www.youtube.com/watch?v={self.VIDEO_ID}',
+            f'https://m.youtube.com/watch?feature=share&v={self.VIDEO_ID}&list=PL1',
+            f'https://youtu.be/{self.VIDEO_ID}?si=abc',
+            f'https://www.youtube.com/embed/{self.VIDEO_ID}',
+            f'https://www.youtube-nocookie.com/embed/{self.VIDEO_ID}',
+            f'https://www.youtube.com/v/{self.VIDEO_ID}',
+            f'https://www.youtube.com/shorts/{self.VIDEO_ID}',
+            f'https://www.youtube.com/live/{self.VIDEO_ID}',
+            f'https://www.youtube.com/attribution_link?a=x&u=/watch%3Fv%3D{self.VIDEO_ID}%26feature%3Dshare',
+            f'  {self.VIDEO_ID}  ',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(parse_video_url(url), VideoRef('youtube', self.VIDEO_ID, 0))
+
+    def test_start_time(self):
+        base = f'https://www.youtube.com/watch?v={self.VIDEO_ID}'
+        self.assertEqual(parse_video_url(f'https://youtu.be/{self.VIDEO_ID}?t=90').start, 90)
+        self.assertEqual(parse_video_url(f'{base}&t=1m30s').start, 90)
+        self.assertEqual(parse_video_url(f'{base}#t=1h2m3s').start, 3723)
+        self.assertEqual(parse_video_url(f'https://www.youtube.com/embed/{self.VIDEO_ID}?start=15').start, 15)
+        # time_continue ليس وقت بداية
+        self.assertEqual(parse_video_url(f'https://www.youtube.com/watch?time_continue=5&v={self.VIDEO_ID}').start, 0)
+
+    def test_vimeo(self):
+        self.assertEqual(parse_video_url('https://vimeo.com/123456'), VideoRef('vimeo', '123456', 0))
+        self.assertEqual(parse_video_url('https://player.vimeo.com/video/123456#t=30s'), VideoRef('vimeo', '123456', 30))
+        self.assertEqual(parse_video_url('https://vimeo.com/channels/staffpicks/123456').video_id, '123456')
+        self.assertEqual(course_extras.youtube_embed_id('https://vimeo.com/123456'), '')
+
+    def test_not_a_video(self):
+        for url in (
+            '', None, 'https://www.youtube.com/playlist?list=PL123', 'https://www.youtube.com/@channel',
+            'https://example.com/video.mp4', 'short-id', 'https://example.com/watch?x=1',
+        ):
+            with self.subTest(url=url):
+                self.assertIsNone(parse_video_url(url))
+
+    def test_is_youtube_url_checks_the_host(self):
+        self.assertTrue(is_youtube_url(f'https://youtu.be/{self.VIDEO_ID}'))
+        self.assertTrue(is_youtube_url('https://www.youtube.com/@channel'))
+        self.assertTrue(is_youtube_url('https://www.youtube.com/playlist?list=PL123'))
+        # معرف مجرد أو رابط Vimeo ليس رابط يوتيوب
+        self.assertFalse(is_youtube_url(self.VIDEO_ID))
+        self.assertFalse(is_youtube_url('https://vimeo.com/123456'))
+        self.assertFalse(is_youtube_url(None))
+        self.assertIs(course_extras.is_youtube_url('https://www.youtube.com/@channel'), True)
+
+    def test_template_filters(self):
+        self.assertTrue(course_extras.is_valid_youtube_url(f'https://youtu.be/{self.VIDEO_ID}'))
+        self.assertFalse(course_extras.is_valid_youtube_url('https://youtu.be/abc'))
+        self.assertTrue(course_extras.is_valid_video_url('https://cdn.example.com/intro.MP4'))
+        self.assertTrue(course_extras.is_valid_video_url('https://vimeo.com/123456'))
+        self.assertFalse(course_extras.is_valid_video_url('https://example.com/page'))
+        self.assertEqual(
+            course_extras.get_youtube_thumbnail(self.VIDEO_ID, 'large'),
+            f'https://img.youtube.com/vi/{self.VIDEO_ID}/hqdefault.jpg',
+        )
+
+
+class VideoEmbedFieldsTests(TestCase):
+    def test_lesson_stores_embed_id_on_save(self):
+        category = Category.objects.create(name='تصميم', slug='design')
+        instructor = User.objects.create(username='designer', role='instructor')
+        course = Course.objects.create(
+            title='تصميم', slug='design', description='-', category=category,
+            instructor=instructor, price=Decimal('0'),
+        )
+        module = CourseModule.objects.create(course=course, title='الوحدة الأولى', order=1)
+        lesson = Lesson.objects.create(
+            module=module, title='مقدمة', content='-', order=1,
+            video_url='https://youtu.be/dQw4w9WgXcQ?t=1m',
+        )
+        lesson.refresh_from_db()
+        self.assertEqual((lesson.video_embed_id, lesson.video_start), ('dQw4w9WgXcQ', 60))
+
+        lesson.video_url = 'https://vimeo.com/123456'
+        lesson.save(update_fields=['video_url'])
+        lesson.refresh_from_db()
+        self.assertEqual((lesson.video_embed_id, lesson.video_start), ('', 0))
+
+
+class ReviewCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        review = Review(id=42, helpful_count=7, created_at=timezone.now())
+        for sort, values in (
+            ('newest', [review.created_at, 42]),
+            ('helpful', [7, review.created_at, 42]),
+        ):
+            with self.subTest(sort=sort):
+                cursor = review_feed.encode_cursor(review, sort)
+                self.assertNotIn('=', cursor)
+                self.assertEqual(review_feed.decode_cursor(cursor, sort), values)
+
+    def test_invalid_cursors(self):
+        newest = review_feed.encode_cursor(Review(id=1, helpful_count=0, created_at=timezone.now()), 'newest')
+        cursors = [
+            'not-a-cursor', '', '%%%',
+            # مؤشر ترتيب آخر (عدد قيم مختلف)
+            newest,
+        ]
+        cursors += [
+            review_feed.base64.urlsafe_b64encode(review_feed.json.dumps(values).encode()).decode()
+            for values in (None, {}, ['x', 1, 2], [1, 'yesterday', 2], [1, '2024-01-01T00:00:00', [3]])
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    review_feed.decode_cursor(cursor, 'helpful')
+
+
+class ReviewFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.course = Course.objects.create(
+            title='بايثون', slug='python', description='-', category=category,
+            instructor=instructor, price=Decimal('0'), is_active=True,
+        )
+        now = timezone.now()
+        users = [User.objects.create(username=f'student{i}') for i in range(9)]
+        # تعادل في helpful_count وفي created_at حتى يُختبر كسر التعادل بالـ id
+        reviews = Review.objects.bulk_create(
+            Review(user=user, course=cls.course, rating=i % 5 + 1, comment='-', helpful_count=i % 3)
+            for i, user in enumerate(users)
+        )
+        for i, review in enumerate(reviews):
+            Review.objects.filter(pk=review.pk).update(created_at=now - timedelta(days=i // 2))
+
+    def setUp(self):
+        cache.clear()
+
+    def all_pages(self, sort, ratings=None):
+        ids, cursor = [], None
+        while True:
+            reviews, cursor = review_feed.get_page(self.course.pk, sort, ratings, cursor, limit=2)
+            ids += [review.pk for review in reviews]
+            if cursor is None:
+                return ids
+
+    def test_pages_match_full_ordering(self):
+        for sort, ordering in (
+            ('newest', ['-created_at', '-id']),
+            ('helpful', ['-helpful_count', '-created_at', '-id']),
+        ):
+            with self.subTest(sort=sort):
+                expected = list(Review.objects.order_by(*ordering).values_list('pk', flat=True))
+                self.assertEqual(self.all_pages(sort), expected)
+
+    def test_pages_with_rating_filter(self):
+        expected = list(
+            Review.objects.filter(rating__in=[1, 5]).order_by('-helpful_count', '-created_at', '-id')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(self.all_pages('helpful', [1, 5]), expected)
+
+    def test_after_condition(self):
+        for sort, spec in review_feed.SORTS.items():
+            fields = [field for field, _ in spec]
+            ordered = list(Review.objects.order_by(*(f'-{field}' for field in fields)))
+            for position, review in enumerate(ordered):
+                with self.subTest(sort=sort, position=position):
+                    values = [getattr(review, field) for field in fields]
+                    after = Review.objects.filter(review_feed._after(sort, values)).order_by(
+                        *(f'-{field}' for field in fields)
+                    )
+                    self.assertEqual(list(after), ordered[position + 1:])
+
+    def test_histogram_follows_new_review(self):
+        histogram = review_feed.rating_histogram(self.course.pk)
+        self.assertEqual(histogram['total'], 9)
+        self.assertEqual(histogram['counts'], {1: 2, 2: 2, 3: 2, 4: 2, 5: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=User.objects.create(username='late'), course=self.course, rating=5, comment='-')
+        histogram = review_feed.rating_histogram(self.course.pk)
+        self.assertEqual((histogram['total'], histogram['counts'][5]), (10, 2))
+        self.assertEqual(histogram['average'], 3.0)
+
+    @override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+    def test_api_rejects_invalid_cursor(self):
+        url = reverse('courses:ajax_course_reviews', args=[self.course.pk])
+        self.assertEqual(self.client.get(url, {'cursor': 'broken'}).status_code, 400)
+        data = self.client.get(url, {'sort': 'helpful', 'limit': 4}).json()
+        self.assertEqual(len(data['results']), 4)
+        next_page = self.client.get(url, {'sort': 'helpful', 'limit': 4, 'cursor': data['next_cursor']}).json()
+        self.assertNotIn('histogram', next_page)
+        self.assertFalse({r['id'] for r in data['results']} & {r['id'] for r in next_page['results']})
+
+
+class CoursePageInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.course = Course.objects.create(
+            title='بايثون', slug='python', description='-', category=category,
+            instructor=instructor, price=Decimal('0'), is_active=True,
+        )
+        cls.student = User.objects.create(username='student')
+
+    def setUp(self):
+        cache.clear()
+        self.version = cache.get_or_set(course_page._version_key(self.course.pk), 1, timeout=None)
+
+    def assertInvalidated(self, expected, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        version = cache.get(course_page._version_key(self.course.pk))
+        self.assertEqual(version != self.version, expected)
+        self.version = version
+
+    def enroll(self, status):
+        return Enrollment.objects.create(user=self.student, course=self.course, status=status)
+
+    def test_status_changes_into_and_out_of_enrolled(self):
+        enrollment = self.enroll('pending')
+        self.version = cache.get(course_page._version_key(self.course.pk))
+        for status, expected in (('enrolled', True), ('completed', True), ('cancelled', False), ('enrolled', True)):
+            with self.subTest(status=status):
+                enrollment.status = status
+                self.assertInvalidated(expected, enrollment.save)
+
+    def test_other_saves_keep_page(self):
+        self.assertInvalidated(True, lambda: self.enroll('enrolled'))
+        enrollment = Enrollment.objects.get()
+        enrollment.progress = 40
+        self.assertInvalidated(False, enrollment.save)
+        # حالة مؤجلة (deferred) لا تُحمّل ولا تُعتبر تغييراً
+        enrollment = Enrollment.objects.only('progress').get()
+        with self.assertNumQueries(1):
+            self.assertInvalidated(False, lambda: enrollment.save(update_fields=['progress']))
+
+    def test_delete(self):
+        self.assertInvalidated(False, lambda: self.enroll('pending').delete())
+        self.assertInvalidated(True, lambda: self.enroll('enrolled'))
+        self.assertInvalidated(True, lambda: Enrollment.objects.get().delete())
+        self.assertInvalidated(False, lambda: None)
+
+
+class CourseCardDiscountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        now = timezone.now()
+        windows = {
+            'active': (25, now - timedelta(days=1), now + timedelta(days=5, hours=12)),
+            'ending': (10, now - timedelta(days=1), now + timedelta(hours=5, minutes=30)),
+            'expired': (25, now - timedelta(days=10), now - timedelta(days=1)),
+            'future': (25, now + timedelta(days=1), now + timedelta(days=10)),
+            'no-dates': (25, None, None),
+            'no-end': (25, now - timedelta(days=1), None),
+            'zero': (0, now - timedelta(days=1), now + timedelta(days=5)),
+        }
+        for slug, (percent, start, end) in windows.items():
+            Course.objects.create(
+                title=slug, slug=slug, description='-', category=category, instructor=instructor,
+                price=Decimal('199.99'), is_active=True, discount_percent=percent,
+                discount_start_date=start, discount_end_date=end,
+            )
+
+    def test_card_matches_course(self):
+        courses = {course.slug: course for course in Course.objects.all()}
+        cards = get_cards(Course.objects.all())
+        self.assertEqual(len(cards), len(courses))
+        for card in cards:
+            course = courses[card.slug]
+            with self.subTest(course=card.slug):
+                self.assertEqual(card.has_discount, bool(course.has_discount))
+                self.assertEqual(card.discounted_price, course.discounted_price)
+                self.assertEqual(card.discount_ends_in, course.discount_ends_in)
+
+        active = {card.slug for card in cards if card.has_discount}
+        self.assertEqual(active, {'active', 'ending'})
+        self.assertEqual(courses['active'].discounted_price, Decimal('199.99') * 75 / 100)
+        self.assertEqual(courses['future'].discounted_price, Decimal('199.99'))
+
+    def test_card_matches_effective_price_annotation(self):
+        """السعر المحسوب في قاعدة البيانات (للفلترة والترتيب) يطابق البطاقة بعد التقريب"""
+        cards = {card.slug: card for card in get_cards(Course.objects.all())}
+        for course in Course.objects.with_effective_price():
+            with self.subTest(course=course.slug):
+                card = cards[course.slug]
+                self.assertEqual(card.has_discount, course.has_discount)
+                self.assertEqual(card.discounted_price.quantize(Decimal('0.01')), course.discounted_price)
+
+
+class SeedScaleDataTests(TransactionTestCase):
+    # الأمر يضبط PRAGMA في SQLite ولا يسمح بذلك داخل transaction
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidates_derived_caches(self):
+        index = typeahead.get_index()
+        facets_version = cache.get_or_set(facets.VERSION_KEY, 1, timeout=None)
+        tags = [page_cache.model_tag(model) for model in (Category, Course, Review)]
+        tag_versions = page_cache.get_tag_versions(tags)
+        cache.set(shelves._key('popular'), [], timeout=None)
+
+        call_command('seed_scale_data', scale=0.0001, progress=10, stdout=StringIO())
+
+        self.assertIsNot(typeahead.get_index(), index)
+        self.assertTrue(typeahead.suggest(Course.objects.get().title))
+        self.assertNotEqual(cache.get(facets.VERSION_KEY), facets_version)
+        self.assertIsNone(cache.get(shelves._key('popular')))
+        self.assertNotEqual(page_cache.get_tag_versions(tags), tag_versions)
+
+
+class ShelfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        cls.instructor = User.objects.create(username='teacher', role='instructor', first_name='أحمد')
+        specs = [
+            # (slug, price, rating, students, featured, active)
+            ('free', '0', 3.5, 50, False, True),
+            ('popular', '99', 4.0, 900, True, True),
+            ('top', '199', 4.9, 10, False, True),
+            ('new', '149', 0, 0, True, True),
+            ('hidden', '0', 5.0, 5000, True, False),
+        ]
+        for slug, price, rating, students, featured, active in specs:
+            Course.objects.create(
+                title=slug, slug=slug, description='-', category=category, instructor=cls.instructor,
+                price=Decimal(price), rating=rating, students_count=students, is_featured=featured, is_active=active,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def slugs(self, name):
+        return [card.slug for card in shelves.get_shelf(name, limit=10)]
+
+    def test_shelf_contents(self):
+        self.assertEqual(self.slugs('popular'), ['popular', 'free', 'top', 'new'])
+        self.assertEqual(self.slugs('top_rated'), ['top', 'popular', 'free'])
+        self.assertEqual(self.slugs('free'), ['free'])
+        self.assertEqual(set(self.slugs('featured')), {'popular', 'new'})
+        self.assertEqual(len(self.slugs('latest')), 4)
+
+    def test_cached_until_invalidated(self):
+        shelves.get_shelf('popular')
+        with self.assertNumQueries(0):
+            self.assertEqual(shelves.get_shelf('popular', limit=1)[0].instructor.get_full_name(), 'أحمد')
+
+        # تحديث last_login فقط لا يبطل الرفوف
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            shelves.get_shelf('popular')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.first_name = 'محمود'
+            self.instructor.save()
+        self.assertEqual(shelves.get_shelf('popular', limit=1)[0].instructor.get_full_name(), 'محمود')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.filter(slug='hidden').get().save()
+        with self.assertNumQueries(1):
+            shelves.get_shelf('popular')
+
+
+class ComputeSimilaritiesTests(SimpleTestCase):
+    def test_shrunk_cosine(self):
+        interactions = {
+            1: {'a': 1.0, 'b': 1.0},
+            2: {'a': 1.0, 'b': 1.0},
+            3: {'b': 1.0, 'c': 0.3},
+        }
+        neighbors = compute_similarities(interactions, top_k=5, shrinkage=5)
+        # cosine(a, b) = 2 / (√2 · √3) مع دعم مستخدمَين: × 2 / (2 + 5)
+        self.assertAlmostEqual(dict(neighbors['a'])['b'], 2 / (2 ** 0.5 * 3 ** 0.5) * 2 / 7)
+        self.assertAlmostEqual(dict(neighbors['a'])['b'], dict(neighbors['b'])['a'])
+        self.assertEqual([course for course, _ in neighbors['b']], ['a', 'c'])
+        self.assertNotIn('c', dict(neighbors['a']))
+
+    def test_top_k(self):
+        interactions = {user: {course: 1.0 for course in range(user + 2)} for user in range(6)}
+        neighbors = compute_similarities(interactions, top_k=2)
+        self.assertTrue(all(len(scored) <= 2 for scored in neighbors.values()))
+        self.assertEqual([course for course, _ in neighbors[0]], [1, 2])
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        programming = Category.objects.create(name='برمجة', slug='programming')
+        design = Category.objects.create(name='تصميم', slug='design')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.courses = {}
+        for slug, category, level, students in (
+            ('python', programming, 'beginner', 10),
+            ('django', programming, 'intermediate', 20),
+            ('sql', programming, 'advanced', 30),
+            ('go', programming, 'advanced', 5),
+            ('photoshop', design, 'advanced', 900),
+        ):
+            cls.courses[slug] = Course.objects.create(
+                title=slug, slug=slug, description='-', category=category, instructor=instructor,
+                level=level, price=Decimal('0'), students_count=students, is_active=True,
+            )
+        for i, slugs in enumerate((['python', 'django'], ['python', 'django'], ['django', 'sql'])):
+            user = User.objects.create(username=f'student{i}')
+            for slug in slugs:
+                Enrollment.objects.create(user=user, course=cls.courses[slug], status='enrolled')
+        rebuild_similarity_table()
+
+    def test_similarity_table(self):
+        ranks = list(
+            CourseSimilarity.objects.filter(course=self.courses['django'])
+            .order_by('rank').values_list('similar_course__slug', 'rank')
+        )
+        self.assertEqual(ranks, [('python', 1), ('sql', 2)])
+        self.assertFalse(CourseSimilarity.objects.filter(course=self.courses['go']).exists())
+
+    def test_related_courses_with_fallback(self):
+        related = CourseService.get_related_courses(self.courses['python'], limit=3)
+        # الجار الوحيد ثم نفس التصنيف أو المستوى بالأعلى تقييماً ثم الأكثر طلاباً
+        self.assertEqual([card.slug for card in related], ['django', 'sql', 'go'])
+
+    def test_recommendations(self):
+        user = User.objects.create(username='newcomer')
+        Favorite.objects.create(user=user, course=self.courses['python'])
+        recommended = CourseService.get_course_recommendations(user, limit=3)
+        self.assertEqual([card.slug for card in recommended], ['django', 'sql', 'go'])
+
+        Enrollment.objects.create(user=user, course=self.courses['django'], status='enrolled')
+        recommended = CourseService.get_course_recommendations(user, limit=4)
+        self.assertEqual([card.slug for card in recommended], ['sql', 'go', 'photoshop'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class AsyncViewTests(TestCase):
+    AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='برمجة', slug='programming')
+        instructor = User.objects.create(username='teacher', role='instructor')
+        cls.course = Course.objects.create(
+            title='بايثون', slug='python', description='-', category=category,
+            instructor=instructor, price=Decimal('0'), is_active=True,
+        )
+        module = CourseModule.objects.create(course=cls.course, title='وحدة', order=1)
+        cls.lesson = Lesson.objects.create(module=module, title='درس', content='-', order=1)
+        cls.student = User.objects.create(username='student')
+        cls.enrollment = Enrollment.objects.create(user=cls.student, course=cls.course, status='enrolled')
+        cls.review = Review.objects.create(user=instructor, course=cls.course, rating=5, comment='-')
+
+    async def test_login_required(self):
+        response = await self.async_client.post(reverse('courses:ajax_toggle_favorite'), headers=self.AJAX)
+        self.assertEqual(response.status_code, 302)
+
+    async def test_cart_count(self):
+        response = await self.async_client.get(reverse('courses:cart_count'))
+        self.assertEqual(response.json(), {'count': 0, 'status': 'success'})
+
+    async def test_toggle_favorite(self):
+        await self.async_client.aforce_login(self.student)
+        url = reverse('courses:ajax_toggle_favorite')
+        self.assertEqual((await self.async_client.post(url, {'course_id': self.course.pk})).status_code, 400)
+
+        for expected in (True, False):
+            response = await self.async_client.post(url, {'course_id': self.course.pk}, headers=self.AJAX)
+            self.assertIs(response.json()['is_favorite'], expected)
+            self.assertIs(await Favorite.objects.filter(user=self.student).aexists(), expected)
+
+    async def test_lesson_progress_requires_enrollment(self):
+        url = reverse('courses:ajax_update_lesson_progress')
+        data = {'lesson_id': self.lesson.pk, 'position': 125}
+        await self.async_client.aforce_login(self.student)
+        self.assertEqual((await self.async_client.post(url, data, headers=self.AJAX)).json()['status'], 'success')
+        progress = await LessonProgress.objects.aget(enrollment=self.enrollment, lesson=self.lesson)
+        self.assertEqual(progress.last_watched_position, 125)
+
+        await self.async_client.aforce_login(await User.objects.acreate(username='visitor'))
+        self.assertEqual((await self.async_client.post(url, data, headers=self.AJAX)).status_code, 400)
+
+    async def test_course_stats(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('courses:ajax_get_course_stats', args=[self.course.pk]))
+        self.assertEqual(response.json(), {
+            'total_students': 1, 'total_reviews': 1, 'avg_rating': 5.0, 'total_lessons': 1, 'total_modules': 1,
+        })
+
+    async def test_review_helpful(self):
+        url = reverse('courses:ajax_review_helpful', args=[self.review.pk])
+        await self.async_client.aforce_login(self.student)
+        self.assertEqual((await self.async_client.post(url)).json(), {'status': 'success', 'voted': True, 'helpful_count': 1})
+        self.assertEqual((await self.async_client.post(url)).json()['helpful_count'], 0)
+
+        await self.async_client.aforce_login(await User.objects.aget(username='teacher'))
+        self.assertEqual((await self.async_client.post(url)).status_code, 400)
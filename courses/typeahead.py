@@ -0,0 +1,328 @@
+"""
+فهرس بادئات في الذاكرة للبحث الفوري (عناوين الدورات، المدربين، التصنيفات)
+
+- النصوص تُوحد قبل الفهرسة والبحث (normalize): حذف التشكيل والتطويل،
+  توحيد أشكال الألف والياء والتاء المربوطة والأرقام العربية.
+- كل كلمة تبدأ بأداة التعريف ("ال"، "وال"، "بال"، "لل"...) تُفهرس أيضاً
+  بدونها، وتُحذف من كلمات الاستعلام، فيطابق "بيانات" عنوان "علم البيانات"
+  ويطابق "البيانات" كلمة "بيانات".
+- كل كلمة من كل عنصر تُخزن في قائمة مرتبة (كلمة، مفتاح العنصر)، والبحث
+  ببادئة هو نطاق bisect فيها بدون أي استعلام.
+- الفهرس لكل عملية (worker). تغير دورة/تصنيف/مدرب يُطبق على فهرس العملية
+  الحالية مباشرة ويرفع رقم إصدار في الكاش؛ مع كاش مشترك (Redis في
+  docker-compose.yml) تلاحظ بقية العمليات اختلاف الإصدار عند الطلب التالي
+  فتعيد بناء فهرسها. مع كاش خاص بكل عملية (locmem) لا يصل الإصدار للعمليات
+  الأخرى، لذلك يُعاد بناء الفهرس أيضاً إذا تجاوز عمره TYPEAHEAD_INDEX_MAX_AGE.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.urls import reverse
+
+from .category_index import get_categories
+
+VERSION_KEY = 'courses:typeahead:version'
+INDEX_MAX_AGE = getattr(settings, 'TYPEAHEAD_INDEX_MAX_AGE', 300)
+MIN_QUERY_LENGTH = 2
+RESULTS_PER_KIND = 5
+
+# علامات التشكيل والتطويل (نطاق لاستخدامه داخل [])
+ARABIC_MARKS = r'\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640'
+_DIACRITICS = re.compile(f'[{ARABIC_MARKS}]')
+_TRANSLATION = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+})
+_WORD = re.compile(r'\w+')
+# أداة التعريف مع حروف العطف/الجر المتصلة، إذا بقي بعدها حرفان على الأقل
+_ARTICLE = re.compile(r'^(?:[وفبك]?ال|لل)(?=\w{2})')
+
+
+def normalize(text):
+    """توحيد النص العربي/اللاتيني للمقارنة"""
+    text = _DIACRITICS.sub('', text or '').translate(_TRANSLATION).casefold()
+    return ' '.join(_WORD.findall(text))
+
+
+def strip_article(word):
+    """الكلمة (الموحدة) بدون أداة التعريف في بدايتها"""
+    return _ARTICLE.sub('', word)
+
+
+def index_words(text):
+    """كلمات النص الموحدة، وكل كلمة معرفة بـ"ال" بالصيغتين"""
+    words = set()
+    for word in normalize(text).split():
+        words.add(word)
+        words.add(strip_article(word))
+    return words
+
+
+def query_terms(query):
+    """كلمات الاستعلام الموحدة بدون أداة التعريف"""
+    return [strip_article(word) for word in normalize(query).split()]
+
+
+class PrefixIndex:
+    """قائمة مرتبة من (كلمة، مفتاح) مع بيانات كل عنصر"""
+
+    def __init__(self):
+        self.entries = {}
+        self._words = []
+        self._lock = threading.Lock()
+
+    def add(self, key, entry, text=None):
+        """text: النص المفهرس (الافتراضي: entry['label'])"""
+        with self._lock:
+            self._remove(key)
+            entry['words'] = index_words(entry['label'] if text is None else text)
+            self.entries[key] = entry
+            for word in entry['words']:
+                insort(self._words, (word, key))
+
+    def extend(self, items):
+        """
+        إضافة مجموعة عناصر [(key, entry, text)] مع ترتيب القائمة مرة واحدة
+        (insort لكل كلمة عند بناء الفهرس كاملاً يجعل البناء O(n²))
+        """
+        with self._lock:
+            for key, entry, text in items:
+                self._remove(key)
+                entry['words'] = index_words(entry['label'] if text is None else text)
+                self.entries[key] = entry
+                self._words.extend((word, key) for word in entry['words'])
+            self._words.sort()
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for word in entry['words']:
+            position = bisect_left(self._words, (word, key))
+            if position < len(self._words) and self._words[position] == (word, key):
+                del self._words[position]
+
+    def match(self, query):
+        """العناصر التي تبدأ إحدى كلماتها بكل كلمة من الاستعلام (الأعلى score أولاً)"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        # المرشحون من أطول كلمة (أضيق نطاق)، ثم التحقق من بقية الكلمات
+        longest = max(terms, key=len)
+        with self._lock:
+            keys = set()
+            position = bisect_left(self._words, (longest,))
+            while position < len(self._words) and self._words[position][0].startswith(longest):
+                keys.add(self._words[position][1])
+                position += 1
+            matches = [
+                self.entries[key] for key in keys
+                if all(any(word.startswith(term) for word in self.entries[key]['words']) for term in terms)
+            ]
+        return sorted(matches, key=lambda entry: (-entry['score'], entry['label']))
+
+    def search(self, query, limit=RESULTS_PER_KIND):
+        """أفضل limit نتيجة من كل نوع"""
+        results = {}
+        for entry in self.match(query):
+            bucket = results.setdefault(entry['kind'], [])
+            if len(bucket) < limit:
+                bucket.append({'label': entry['label'], 'url': entry['url']})
+        return results
+
+
+# ==================== بناء العناصر ====================
+
+def _course_entries(queryset):
+    for course in queryset.filter(is_active=True).values('id', 'title', 'slug', 'students_count'):
+        yield ('course', course['id']), {
+            'kind': 'course',
+            'label': course['title'],
+            'url': reverse('courses:course_detail', args=[course['slug']]),
+            'score': course['students_count'],
+        }
+
+
+def _instructor_entries(queryset):
+    instructors = (
+        queryset.filter(role='instructor', is_active=True)
+        .annotate(active_courses=Count('courses_taught', filter=Q(courses_taught__is_active=True)))
+        .filter(active_courses__gt=0)
+        .values('id', 'username', 'first_name', 'last_name', 'active_courses')
+    )
+    for instructor in instructors:
+        name = f"{instructor['first_name']} {instructor['last_name']}".strip() or instructor['username']
+        yield ('instructor', instructor['id']), {
+            'kind': 'instructor',
+            'label': name,
+            'url': reverse('courses:instructor_profile', args=[instructor['id']]),
+            'score': instructor['active_courses'],
+        }
+
+
+def _category_entries(categories):
+    course_list = reverse('courses:course_list')
+    for category in categories:
+        yield ('category', category.id), {
+            'kind': 'category',
+            'label': category.name,
+            'url': f'{course_list}?category={category.slug}',
+            'score': category.course_count,
+        }
+
+
+def build_index():
+    """بناء الفهرس كاملاً (استعلام للدورات واستعلام للمدربين)"""
+    from .models import Course, User
+
+    index = PrefixIndex()
+    index.extend(
+        (key, entry, None)
+        for entries in (
+            _course_entries(Course.objects.all()),
+            _instructor_entries(User.objects.all()),
+            _category_entries(get_categories(with_courses=True)),
+        )
+        for key, entry in entries
+    )
+    return index
+
+
+# ==================== فهرس العملية الحالية ====================
+
+_index = None
+_version = None
+_built_at = 0.0
+_state_lock = threading.Lock()
+
+
+def _current_version():
+    # قيمة ابتدائية فريدة حتى لا يطابق إصدار جديد (بعد مسح الكاش) إصداراً قديماً
+    return cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+
+
+def _is_expired():
+    return time.monotonic() - _built_at > INDEX_MAX_AGE
+
+
+def get_index():
+    global _index, _version, _built_at
+    version = _current_version()
+    if _index is None or _version != version or _is_expired():
+        index = build_index()
+        with _state_lock:
+            _index, _version, _built_at = index, version, time.monotonic()
+    return _index
+
+
+def suggest(query, limit=RESULTS_PER_KIND):
+    if len(normalize(query)) < MIN_QUERY_LENGTH:
+        return {}
+    return get_index().search(query, limit)
+
+
+async def asuggest(query, limit=RESULTS_PER_KIND):
+    """نسخة async: الفهرس المتزامن يُقرأ مباشرة، وإعادة البناء في thread"""
+    if len(normalize(query)) < MIN_QUERY_LENGTH:
+        return {}
+    if _index is None or _is_expired() or await cache.aget(VERSION_KEY) != _version:
+        return await sync_to_async(suggest)(query, limit)
+    return _index.search(query, limit)
+
+
+def _publish(apply):
+    """
+    بعد نجاح الـ transaction: رفع الإصدار المشترك، وتطبيق التغيير على فهرس
+    هذه العملية إن كان متزامناً (وإلا يُعاد بناؤه عند القراءة التالية)
+    """
+    def run():
+        global _version
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            return
+        with _state_lock:
+            if _index is not None and _version == version - 1:
+                apply(_index)
+                _version = version
+
+    transaction.on_commit(run)
+
+
+def invalidate():
+    """إعادة بناء الفهرس في كل العمليات (بعد تغييرات لا تطلق signals مثل bulk_create)"""
+    def run():
+        global _index
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            pass
+        with _state_lock:
+            _index = None
+
+    transaction.on_commit(run)
+
+
+def _refresh(index, key, entries):
+    entries = dict(entries)
+    if key in entries:
+        index.add(key, entries[key])
+    else:
+        index.remove(key)
+
+
+def update_course(course, previous_instructor_id=None):
+    """previous_instructor_id: المدرب السابق إذا نُقلت الدورة لمدرب آخر"""
+    from .models import Course, User
+
+    instructor_ids = {course.instructor_id, previous_instructor_id} - {None}
+
+    def apply(index):
+        _refresh(index, ('course', course.pk), _course_entries(Course.objects.filter(pk=course.pk)))
+        for instructor_id in instructor_ids:
+            _refresh(index, ('instructor', instructor_id), _instructor_entries(User.objects.filter(pk=instructor_id)))
+        _refresh_categories(index)
+
+    _publish(apply)
+
+
+def remove_course(course):
+    from .models import User
+
+    def apply(index):
+        index.remove(('course', course.pk))
+        _refresh(index, ('instructor', course.instructor_id), _instructor_entries(User.objects.filter(pk=course.instructor_id)))
+        _refresh_categories(index)
+
+    _publish(apply)
+
+
+def update_instructor(user):
+    from .models import User
+
+    _publish(lambda index: _refresh(index, ('instructor', user.pk), _instructor_entries(User.objects.filter(pk=user.pk))))
+
+
+def _refresh_categories(index):
+    """التصنيفات تُقرأ من category_index (يُبطل قبل هذا الاستدعاء في courses.signals)"""
+    for key in [key for key in index.entries if key[0] == 'category']:
+        index.remove(key)
+    index.extend((key, entry, None) for key, entry in _category_entries(get_categories(with_courses=True)))
+
+
+def update_categories():
+    _publish(_refresh_categories)
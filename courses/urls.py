@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
 from .views import CustomLoginView
 
 app_name = 'courses'
@@ -26,6 +26,9 @@ urlpatterns = [
     path('course/<slug:course_slug>/lesson/<int:lesson_id>/', views.lesson_view, name='lesson_view'),
     path('lesson/<int:lesson_id>/complete/', views.mark_lesson_complete, name='mark_lesson_complete'),
     path('course/<int:course_id>/contact/', views.contact_about_course, name='contact_about_course'),
+    path('lesson/<int:lesson_id>/video/', views.lesson_video, name='lesson_video'),
+    path('lesson/<int:lesson_id>/hls/<path:path>', views.lesson_hls, name='lesson_hls'),
+    path('course/<slug:slug>/preview-video/', views.course_preview_video, name='course_preview_video'),
 
     # ==================== User Actions ====================
     path('course/<slug:slug>/favorite/', views.toggle_favorite, name='toggle_favorite'),
@@ -92,12 +95,16 @@ urlpatterns = [
     path('admin/stats/', views.admin_stats_view, name='admin_stats'),
 
     # ==================== AJAX Endpoints ====================
-    path('ajax/toggle-favorite/', views.ajax_toggle_favorite, name='ajax_toggle_favorite'),
-    path('ajax/update-lesson-progress/', views.ajax_update_lesson_progress, name='ajax_update_lesson_progress'),
-    path('ajax/course-stats/<int:course_id>/', views.ajax_get_course_stats, name='ajax_get_course_stats'),
-    path('ajax/dashboard-stats/', views.ajax_get_dashboard_stats, name='ajax_dashboard_stats'),
+    path('ajax/toggle-favorite/', async_views.ajax_toggle_favorite, name='ajax_toggle_favorite'),
+    path('ajax/update-lesson-progress/', async_views.ajax_update_lesson_progress, name='ajax_update_lesson_progress'),
+    path('ajax/course-stats/<int:course_id>/', async_views.ajax_get_course_stats, name='ajax_get_course_stats'),
+    path('ajax/dashboard-stats/', async_views.ajax_get_dashboard_stats, name='ajax_dashboard_stats'),
     path('ajax/chart-data/', views.ajax_get_chart_data, name='ajax_chart_data'),
-    path('ajax/recent-activities/', views.ajax_get_recent_activities, name='ajax_recent_activities'),    
+    path('ajax/recent-activities/', async_views.ajax_get_recent_activities, name='ajax_recent_activities'),    
+    path('ajax/search-suggestions/', async_views.ajax_search_suggestions, name='ajax_search_suggestions'),
+    path('ajax/lesson-search/<int:course_id>/', async_views.ajax_search_lessons, name='ajax_search_lessons'),
+    path('ajax/course-reviews/<int:course_id>/', async_views.ajax_course_reviews, name='ajax_course_reviews'),
+    path('ajax/review-helpful/<int:review_id>/', async_views.ajax_review_helpful, name='ajax_review_helpful'),
     
     # ==================== Cart URLs ====================
     path('cart/', views.cart_view, name='cart_view'),
@@ -107,7 +114,7 @@ urlpatterns = [
     path('cart/clear/', views.clear_cart, name='clear_cart'),
     path('cart/submit-order/', views.submit_order, name='submit_order'),
     path('orders/', views.order_history, name='order_history'),
-    path('cart/count/', views.cart_count, name='cart_count'),
+    path('cart/count/', async_views.cart_count, name='cart_count'),
     path('order-success/', views.order_success, name='order_success'),
     
     # ==================== Admin: Orders Management ====================
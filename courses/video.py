@@ -0,0 +1,223 @@
+"""
+تحويل فيديوهات الدروس إلى HLS بعدة جودات (Adaptive Bitrate)
+
+يعتمد على ffmpeg/ffprobe محلياً. المهام تُنشأ تلقائياً عند رفع فيديو جديد
+للدرس وتُنفّذ عبر الأمر: python manage.py process_video_jobs
+
+مهمة بقيت "قيد المعالجة" أكثر من VIDEO_JOB_TIMEOUT (توقف العامل أو أُعيد
+تشغيله أثناء التحويل) يحجزها العامل التالي من جديد، حتى VIDEO_JOB_MAX_ATTEMPTS
+محاولة ثم تُعلّم فاشلة.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Lesson, VideoJob
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BINARY = getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+HLS_SEGMENT_SECONDS = getattr(settings, 'HLS_SEGMENT_SECONDS', 6)
+VIDEO_JOB_TIMEOUT = getattr(settings, 'VIDEO_JOB_TIMEOUT', 2 * 60 * 60)
+VIDEO_JOB_MAX_ATTEMPTS = getattr(settings, 'VIDEO_JOB_MAX_ATTEMPTS', 3)
+
+# (الارتفاع، معدل الفيديو kbps، معدل الصوت kbps)
+VIDEO_LADDER = getattr(settings, 'VIDEO_LADDER', [
+    (360, 800, 96),
+    (480, 1400, 128),
+    (720, 2800, 128),
+    (1080, 5000, 192),
+])
+
+
+class VideoProcessingError(Exception):
+    """فشل في تحليل أو تحويل الفيديو"""
+
+
+# ==================== ffmpeg ====================
+
+def _run(cmd):
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise VideoProcessingError(f'{cmd[0]} غير مثبت على الخادم')
+    if result.returncode != 0:
+        raise VideoProcessingError(result.stderr[-2000:])
+    return result.stdout
+
+
+def probe(path):
+    """قراءة مدة الفيديو وأبعاده"""
+    output = _run([
+        FFPROBE_BINARY, '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration',
+        '-of', 'json', path,
+    ])
+    data = json.loads(output or '{}')
+    streams = data.get('streams') or []
+    if not streams:
+        raise VideoProcessingError('لا يوجد مسار فيديو في الملف')
+    return {
+        'duration': float(data.get('format', {}).get('duration') or 0),
+        'width': int(streams[0]['width']),
+        'height': int(streams[0]['height']),
+    }
+
+
+def build_ladder(width, height):
+    """الجودات المناسبة للمصدر (بدون تكبير الصورة)"""
+    rungs = [rung for rung in VIDEO_LADDER if rung[0] <= height] or VIDEO_LADDER[:1]
+    ladder = []
+    for rung_height, video_kbps, audio_kbps in rungs:
+        rung_width = int(round(width * rung_height / height / 2)) * 2
+        ladder.append({
+            'name': f'{rung_height}p',
+            'width': rung_width,
+            'height': rung_height,
+            'video_kbps': video_kbps,
+            'audio_kbps': audio_kbps,
+        })
+    return ladder
+
+
+def transcode_rendition(source_path, out_dir, rendition):
+    """تحويل جودة واحدة إلى مقاطع HLS"""
+    target_dir = os.path.join(out_dir, rendition['name'])
+    os.makedirs(target_dir, exist_ok=True)
+    video_kbps = rendition['video_kbps']
+    _run([
+        FFMPEG_BINARY, '-y', '-v', 'error', '-i', source_path,
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', f"scale={rendition['width']}:{rendition['height']}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{video_kbps}k',
+        '-maxrate', f'{int(video_kbps * 1.07)}k',
+        '-bufsize', f'{int(video_kbps * 1.5)}k',
+        '-g', '48', '-keyint_min', '48', '-sc_threshold', '0',
+        '-c:a', 'aac', '-b:a', f"{rendition['audio_kbps']}k", '-ac', '2',
+        '-f', 'hls',
+        '-hls_time', str(HLS_SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(target_dir, 'seg_%05d.ts'),
+        os.path.join(target_dir, 'index.m3u8'),
+    ])
+
+
+def write_master_playlist(out_dir, ladder):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in ladder:
+        bandwidth = (rendition['video_kbps'] + rendition['audio_kbps']) * 1000
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},"
+            f"RESOLUTION={rendition['width']}x{rendition['height']}"
+        )
+        lines.append(f"{rendition['name']}/index.m3u8")
+    with open(os.path.join(out_dir, 'master.m3u8'), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def hls_dir_name(source):
+    """مجلد HLS بجوار الملف الأصلي: lessons/intro.mp4 => lessons/intro_hls"""
+    stem, _ext = os.path.splitext(source)
+    return f'{stem}_hls'
+
+
+# ==================== المهام ====================
+
+def enqueue(lesson):
+    """إنشاء مهمة تحويل لفيديو الدرس الحالي"""
+    if not lesson.video_file:
+        return None
+    return VideoJob.objects.create(lesson=lesson, source=lesson.video_file.name)
+
+
+def stale_q(now=None):
+    """مهام "قيد المعالجة" تجاوزت VIDEO_JOB_TIMEOUT (العامل توقف أثناء التحويل)"""
+    cutoff = (now or timezone.now()) - timedelta(seconds=VIDEO_JOB_TIMEOUT)
+    return Q(status='processing', started_at__lt=cutoff)
+
+
+def claim_next_job():
+    """حجز أقدم مهمة منتظرة أو متوقفة (آمن مع أكثر من عامل)"""
+    now = timezone.now()
+    VideoJob.objects.filter(stale_q(now), attempts__gte=VIDEO_JOB_MAX_ATTEMPTS).update(
+        status='failed',
+        error='توقفت المعالجة دون أن تكتمل بعد كل المحاولات',
+        finished_at=now,
+    )
+
+    candidates = VideoJob.objects.filter(Q(status='pending') | stale_q(now)).order_by('created_at')
+    for job in candidates[:10]:
+        # الشرط على الحالة ووقت البدء معاً: عامل واحد فقط يحجز المهمة
+        claimed = VideoJob.objects.filter(pk=job.pk, status=job.status, started_at=job.started_at).update(
+            status='processing',
+            started_at=now,
+            attempts=job.attempts + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    """تنفيذ مهمة: تحليل الفيديو، تحديث المدة، ثم التحويل إلى HLS"""
+    out_dir = None
+    try:
+        source_path = default_storage.path(job.source)
+        info = probe(source_path)
+        job.duration_seconds = info['duration']
+        job.width = info['width']
+        job.height = info['height']
+        job.save(update_fields=['duration_seconds', 'width', 'height'])
+
+        if info['duration']:
+            Lesson.objects.filter(pk=job.lesson_id).update(
+                duration_minutes=max(1, math.ceil(info['duration'] / 60))
+            )
+
+        ladder = build_ladder(info['width'], info['height'])
+        hls_dir = hls_dir_name(job.source)
+        out_dir = default_storage.path(hls_dir)
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+        os.makedirs(out_dir)
+        for rendition in ladder:
+            transcode_rendition(source_path, out_dir, rendition)
+        write_master_playlist(out_dir, ladder)
+    except Exception as exc:
+        if isinstance(exc, VideoProcessingError):
+            logger.warning('Video job %s failed: %s', job.pk, exc)
+        else:
+            logger.exception('Video job %s failed', job.pk)
+        if out_dir and os.path.isdir(out_dir):
+            shutil.rmtree(out_dir, ignore_errors=True)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    manifest = f'{hls_dir}/master.m3u8'
+    with transaction.atomic():
+        job.status = 'ready'
+        job.renditions = ladder
+        job.manifest = manifest
+        job.error = ''
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'renditions', 'manifest', 'error', 'finished_at'])
+        # لا نربط الـ manifest إذا تم استبدال الفيديو أثناء التحويل
+        Lesson.objects.filter(pk=job.lesson_id, video_file=job.source).update(hls_manifest=manifest)
+    return job
@@ -0,0 +1,83 @@
+"""
+تحليل روابط الفيديو الخارجية (YouTube / Vimeo)
+
+نمط واحد مُجمّع مسبقاً لكل صيغ الروابط، ونتيجة التحليل مخزنة في LRU cache
+لأن نفس الرابط يُحلّل أكثر من مرة أثناء عرض القوالب.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+VideoRef = namedtuple('VideoRef', ['provider', 'video_id', 'start'])
+
+VIDEO_URL_RE = re.compile(
+    r"""
+    (?:
+        (?:youtube(?:-nocookie)?\.com/
+            (?:
+                watch\?(?:.*?&)?v(?:=|%3D)
+              | attribution_link\?.*?v%3D
+              | (?:embed|v|shorts|live)/
+            )
+          | youtu\.be/
+        )
+        (?P<youtube>[\w-]+)
+      | vimeo\.com/(?:video/|channels/[\w-]+/)?(?P<vimeo>\d+)
+      | ^(?P<bare>[\w-]{11})$
+    )
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# ?t=90 أو &start=90 أو #t=1m30s
+START_RE = re.compile(r'[?&#](?:t|start)=(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?(?:&|$)')
+
+# أي رابط على نطاق يوتيوب (فيديو، قناة، قائمة تشغيل...)
+YOUTUBE_HOST_RE = re.compile(r'youtube\.com|youtu\.be')
+
+DIRECT_VIDEO_EXTENSIONS = ('.mp4', '.webm', '.ogg', '.mov', '.m3u8')
+
+
+def _parse_start(url):
+    match = START_RE.search(url)
+    if not match:
+        return 0
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@lru_cache(maxsize=4096)
+def parse_video_url(url):
+    """
+    تحليل رابط فيديو وإرجاع VideoRef(provider, video_id, start)
+    أو None إذا لم يكن الرابط من مزود معروف.
+    """
+    if not url:
+        return None
+    url = str(url).strip()
+    match = VIDEO_URL_RE.search(url)
+    if not match:
+        return None
+    if match.group('vimeo'):
+        return VideoRef('vimeo', match.group('vimeo'), _parse_start(url))
+    video_id = match.group('youtube') or match.group('bare')
+    return VideoRef('youtube', video_id, _parse_start(url))
+
+
+def youtube_id(url):
+    """معرف فيديو يوتيوب أو نص فارغ"""
+    ref = parse_video_url(url)
+    return ref.video_id if ref and ref.provider == 'youtube' else ''
+
+
+def is_youtube_url(url):
+    """
+    رابط على نطاق يوتيوب (ليس بالضرورة لفيديو: القنوات وقوائم التشغيل أيضاً).
+    المعرف المجرد ليس رابطاً؛ youtube_id يقبله.
+    """
+    return bool(url) and bool(YOUTUBE_HOST_RE.search(str(url)))
+
+
+def is_direct_video_url(url):
+    """رابط مباشر لملف فيديو"""
+    return bool(url) and any(ext in str(url).lower() for ext in DIRECT_VIDEO_EXTENSIONS)
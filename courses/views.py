@@ -4,15 +4,17 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Avg, Sum, F
 
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, Http404
 from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models.fields.files import FieldFile
 import csv
 import json
+import posixpath
 from django.views.decorators.http import require_POST
 from django.contrib.auth.views import LoginView
 from django.urls import reverse_lazy
@@ -23,6 +25,10 @@ from urllib.parse import quote
 from django.core.mail import send_mail
 from datetime import timedelta, datetime
 from django.contrib.auth import get_user_model
+from django.utils.decorators import method_decorator
+from core.db_router import use_replica
+from core.images import prefetch_manifests
+from core.page_cache import cache_page_for_anonymous
 
 from .models import (
     Course, Category, User, Enrollment, Review, 
@@ -32,6 +38,12 @@ from .services import (
     CourseService, EnrollmentService, FavoriteService, 
     ReviewService, ModuleService, LessonService
 )
+from . import course_page
+from .cards import card_values, get_cards, to_cards
+from .category_index import get_categories
+from .facets import apply_filters, get_facets, normalize_filters
+from .platform_stats import get_platform_stats
+from .streaming import serve_protected_file
 from .forms import (
     CourseForm, CategoryForm, CourseModuleForm, LessonForm,
     ReviewForm, UserRegistrationForm, UserProfileForm,
@@ -52,6 +64,12 @@ class InstructorRequiredMixin(UserPassesTestMixin):
 
 # ==================== Course Views ====================
 
+def _count_course_view(request, slug):
+    """زيادة مشاهدات الدورة عند خدمة الصفحة من الكاش"""
+    Course.objects.filter(slug=slug).update(views_count=F('views_count') + 1)
+
+
+@method_decorator(cache_page_for_anonymous(), name='dispatch')
 class CourseListView(ListView):
     model = Course
     template_name = 'courses/course_list.html'
@@ -59,57 +77,28 @@ class CourseListView(ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        queryset = CourseService.get_active_courses()
-        
-        # البحث
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(instructor__username__icontains=search)
-            )
-        
-        # تصفية حسب التصنيف
-        category = self.request.GET.get('category')
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        
-        # تصفية حسب المستوى
-        level = self.request.GET.get('level')
-        if level:
-            queryset = queryset.filter(level=level)
-        
-        # تصفية حسب السعر
-        price_min = self.request.GET.get('price_min')
-        if price_min:
-            queryset = queryset.filter(price__gte=price_min)
-        
-        price_max = self.request.GET.get('price_max')
-        if price_max:
-            queryset = queryset.filter(price__lte=price_max)
-        
-        # تصفية حسب التقييم
-        rating = self.request.GET.get('rating')
-        if rating:
-            queryset = queryset.filter(rating__gte=rating)
+        self.filters = normalize_filters(self.request.GET)
+        self.facets = get_facets(self.filters)
+        queryset = apply_filters(Course.objects.all(), self.filters)
         
         # الترتيب
         sort = self.request.GET.get('sort', '-created_at')
         if sort in ['title', '-title', 'price', '-price', 'rating', '-rating', 'created_at', '-created_at']:
-            queryset = queryset.order_by(sort)
+            # الترتيب بالسعر الذي يدفعه المستخدم فعلاً
+            queryset = queryset.order_by(sort.replace('price', 'effective_price'))
         
-        return queryset
+        # صفوف البطاقات فقط (تتحول إلى CourseCard في get_context_data)
+        return card_values(queryset, with_counts=True)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['courses'] = to_cards(context['object_list'])
         
         # إحصائيات البحث
-        context['total_courses'] = Course.objects.filter(is_active=True).count()
-        context['categories'] = Category.objects.annotate(
-            course_count=Count('courses', filter=Q(courses__is_active=True))
-        )
+        context['total_courses'] = get_platform_stats()['total_courses']
+        context['categories'] = get_categories()
         context['levels'] = Course.LEVEL_CHOICES
+        context['facets'] = self.facets['facets']
         context['search_form'] = SearchForm(self.request.GET)
         
         # حفظ معايير البحث
@@ -117,70 +106,54 @@ class CourseListView(ListView):
             'search': self.request.GET.get('search', ''),
             'category': self.request.GET.get('category', ''),
             'level': self.request.GET.get('level', ''),
+            'price_type': self.request.GET.get('price_type', ''),
+            'price_range': self.request.GET.get('price_range', ''),
             'price_min': self.request.GET.get('price_min', ''),
             'price_max': self.request.GET.get('price_max', ''),
             'rating': self.request.GET.get('rating', ''),
+            'discount': self.request.GET.get('discount', ''),
             'sort': self.request.GET.get('sort', '-created_at'),
         }
         
+        # الفلاتر في روابط الصفحات
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['filter_query'] = query.urlencode()
+        
         return context
 
+@method_decorator(cache_page_for_anonymous('courses.review', on_hit=_count_course_view), name='dispatch')
 class CourseDetailView(DetailView):
     model = Course
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
     slug_field = 'slug'
     
+    def get_queryset(self):
+        return Course.objects.select_related('category', 'instructor')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course = self.object
         
-        # زيادة عدد المشاهدات
+        # زيادة عدد المشاهدات (update حتى لا تُبطل الزيارة كاش الصفحات)
+        Course.objects.filter(pk=course.pk).update(views_count=F('views_count') + 1)
         course.views_count += 1
-        course.save(update_fields=['views_count'])
         
-        # بيانات المستخدم إذا كان مسجل الدخول
+        # الجزء العام (المنهج، الإحصائيات، الدورات المشابهة، التقييمات) من الكاش
+        context.update(course_page.get_public_context(course))
+        
+        # بيانات المستخدم إذا كان مسجل الدخول (استعلام واحد)
         if self.request.user.is_authenticated:
-            context['is_favorite'] = FavoriteService.is_favorite(self.request.user, course)
-            context['is_enrolled'] = EnrollmentService.is_enrolled(self.request.user, course)
-            context['user_review'] = ReviewService.get_user_review(self.request.user, course)
-            
-            # ✅ التحقق من وجود تسجيل سابق
-            context['existing_enrollment'] = Enrollment.objects.filter(
-                user=self.request.user,
-                course=course
-            ).first()
-            
-            # ✅ التحقق من وجود طلب شراء معلق
-            context['has_pending_order'] = Order.objects.filter(
-                user=self.request.user,
-                items__course=course,
-                status='pending'
-            ).exists()
-            
-            if context['is_enrolled']:
-                enrollment = Enrollment.objects.get(user=self.request.user, course=course)
-                context['enrollment'] = enrollment
-                context['lesson_progress'] = LessonProgress.objects.filter(
-                    enrollment=enrollment
-                ).select_related('lesson')
-        
-        # محتوى إضافي
-        context['reviews'] = ReviewService.get_course_reviews(course)
+            context.update(course_page.get_user_context(self.request.user, course))
+        
         context['review_form'] = ReviewForm()
-        context['related_courses'] = CourseService.get_related_courses(course)
-        context['modules'] = course.modules.prefetch_related('lessons').all()
         context['instructor_courses'] = Course.objects.filter(
             instructor=course.instructor,
             is_active=True
         ).exclude(id=course.id)[:3]
-        
-        # إحصائيات الدورة
-        context['total_students'] = course.enrollments.filter(status='enrolled').count()
-        context['total_reviews'] = course.reviews.count()
-        context['total_modules'] = course.modules.count()
-        context['total_lessons'] = Lesson.objects.filter(module__course=course).count()
         context['views_count'] = course.views_count  # إضافة عدد المشاهدات للقالب
+        prefetch_manifests([course.image, *(related.image for related in context['related_courses'])])
         
         return context
 
@@ -253,7 +226,9 @@ def lesson_view(request, course_slug, lesson_id):
             return redirect('courses:course_detail', slug=course_slug)
     
     # الدروس السابقة والتالية
-    all_lessons = list(Lesson.objects.filter(module__course=course).order_by('module__order', 'order'))
+    all_lessons = list(
+        Lesson.objects.filter(module__course=course).select_related('module').order_by('module__order', 'order')
+    )
     current_index = next((i for i, l in enumerate(all_lessons) if l.id == lesson.id), -1)
     
     prev_lesson = all_lessons[current_index - 1] if current_index > 0 else None
@@ -270,6 +245,61 @@ def lesson_view(request, course_slug, lesson_id):
     return render(request, 'courses/lesson.html', context)
 
 
+def _can_access_lesson(user, lesson):
+    """التحقق من صلاحية مشاهدة فيديو الدرس"""
+    if lesson.is_free:
+        return True
+    if not user.is_authenticated:
+        return False
+    course = lesson.module.course
+    if user.is_staff or user.is_admin_user() or course.instructor_id == user.id:
+        return True
+    # نفس شرط lesson_view: التسجيل المعلق أو الملغي لا يفتح الدروس المدفوعة
+    enrollment = Enrollment.objects.filter(user=user, course=course, status='enrolled').first()
+    return bool(enrollment and enrollment.has_access)
+
+
+def lesson_video(request, lesson_id):
+    """بث فيديو الدرس بعد التحقق من الاشتراك (يدعم Range)"""
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('module__course'),
+        id=lesson_id,
+        module__course__is_active=True,
+    )
+    if not lesson.video_file:
+        raise Http404
+    if not _can_access_lesson(request.user, lesson):
+        return HttpResponseForbidden('يجب التسجيل في الدورة لمشاهدة هذا الدرس')
+    cache_control = 'public, max-age=86400' if lesson.is_free else 'private, max-age=3600'
+    return serve_protected_file(request, lesson.video_file, cache_control=cache_control)
+
+
+def lesson_hls(request, lesson_id, path):
+    """تقديم ملفات HLS للدرس (master.m3u8 والجودات والمقاطع)"""
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('module__course'),
+        id=lesson_id,
+        module__course__is_active=True,
+    )
+    path = posixpath.normpath(path)
+    if not lesson.hls_manifest or path.startswith(('..', '/')):
+        raise Http404
+    if not _can_access_lesson(request.user, lesson):
+        return HttpResponseForbidden('يجب التسجيل في الدورة لمشاهدة هذا الدرس')
+    name = posixpath.join(posixpath.dirname(lesson.hls_manifest), path)
+    hls_file = FieldFile(lesson, Lesson._meta.get_field('video_file'), name)
+    cache_control = 'public, max-age=86400' if lesson.is_free else 'private, max-age=86400'
+    return serve_protected_file(request, hls_file, cache_control=cache_control)
+
+
+def course_preview_video(request, slug):
+    """بث الفيديو التعريفي للدورة (يدعم Range)"""
+    course = get_object_or_404(Course, slug=slug, is_active=True)
+    if not course.video_file:
+        raise Http404
+    return serve_protected_file(request, course.video_file, cache_control='public, max-age=86400')
+
+
 
 @login_required
 def mark_lesson_complete(request, lesson_id):
@@ -518,27 +548,16 @@ def update_avatar(request):
 
 # ==================== instructor views ====================
 
+@cache_page_for_anonymous('courses.review')
 def instructor_profile(request, instructor_id):
     """صفحة الملف الشخصي للمدرب (عامة)"""
     # جلب بيانات المدرب
     instructor = get_object_or_404(User, id=instructor_id, role='instructor')
     
-    # جلب دورات المدرب النشطة
-    courses = (
-        Course.objects
-        .filter(instructor=instructor, is_active=True)
-        .select_related('category')
-        .annotate(
-            enrolled_students=Count(
-                'enrollments',
-                filter=Q(enrollments__status='enrolled'),
-                distinct=True
-            ),
-            reviews_total=Count('reviews', distinct=True),
-            rating_avg=Avg('reviews__rating')
-        )
-        .order_by('-created_at')
-    )
+    # جلب دورات المدرب النشطة (بطاقات)
+    instructor_courses = Course.objects.filter(instructor=instructor, is_active=True)
+    courses = get_cards(instructor_courses.order_by('-created_at'), with_counts=True)
+    
     # إحصائيات المدرب
     total_students = Enrollment.objects.filter(
         course__instructor=instructor,
@@ -549,12 +568,9 @@ def instructor_profile(request, instructor_id):
     avg_rating = Review.objects.filter(course__instructor=instructor).aggregate(Avg('rating'))['rating__avg'] or 0
     
     # توزيع مستويات الدورات
-    level_distribution = {
-        'beginner': courses.filter(level='beginner').count(),
-        'intermediate': courses.filter(level='intermediate').count(),
-        'advanced': courses.filter(level='advanced').count(),
-        'all': courses.filter(level='all').count(),
-    }
+    level_distribution = {level: 0 for level, label in Course.LEVEL_CHOICES}
+    for course in courses:
+        level_distribution[course.level] += 1
     
     # آخر التقييمات على دورات المدرب
     recent_reviews = Review.objects.filter(
@@ -562,17 +578,19 @@ def instructor_profile(request, instructor_id):
     ).select_related('user', 'course').order_by('-created_at')[:5]
     
     # دورات مشابهة من مدربين آخرين (للتوصيات)
-    similar_courses = Course.objects.filter(
-        category__in=courses.values('category'),
-        is_active=True
-    ).exclude(
-        instructor=instructor
-    ).select_related('instructor', 'category').distinct()[:4]
+    similar_courses = get_cards(
+        Course.objects.filter(
+            category__in=instructor_courses.values('category'),
+            is_active=True
+        ).exclude(
+            instructor=instructor
+        )[:4]
+    )
     
     context = {
         'instructor': instructor,
         'courses': courses,
-        'total_courses': courses.count(),
+        'total_courses': len(courses),
         'total_students': total_students,
         'total_reviews': total_reviews,
         'avg_rating': round(avg_rating, 1),
@@ -646,6 +664,7 @@ def user_dashboard(request):
 
 
 @login_required
+@use_replica
 def instructor_dashboard(request):
     """لوحة تحكم المدرب"""
     if not request.user.is_instructor() and not request.user.is_admin_user():
@@ -661,12 +680,10 @@ def instructor_dashboard(request):
         status='enrolled'
     ).values('user').distinct().count()
     
-    total_revenue = sum(
-        e.course.price for e in Enrollment.objects.filter(
-            course__in=taught_courses,
-            status='enrolled'
-        )
-    )
+    total_revenue = Enrollment.objects.filter(
+        course__in=taught_courses,
+        status='enrolled'
+    ).aggregate(total=Sum('course__price'))['total'] or 0
     
     avg_rating = taught_courses.aggregate(avg=Avg('rating'))['avg'] or 0
     
@@ -677,9 +694,11 @@ def instructor_dashboard(request):
     
     # الطلاب النشطين
     active_students = User.objects.filter(
-        enrollments__course__in=taught_courses,
-        enrollments__status='enrolled'
-    ).distinct()[:5]
+        pk__in=Enrollment.objects.filter(
+            course__in=taught_courses,
+            status='enrolled'
+        ).values('user')
+    ).annotate(enrollments_count=Count('enrollments'))[:5]
     
     context = {
         'taught_courses': taught_courses,
@@ -699,6 +718,7 @@ def instructor_dashboard(request):
 
 
 @staff_member_required
+@use_replica
 def admin_dashboard(request):
     """لوحة تحكم الأدمن (كاملة وشاملة)"""
     from django.db.models import Count, Avg, Sum
@@ -761,9 +781,10 @@ def admin_dashboard(request):
     }
     
     # توزيع التصنيفات
-    category_distribution = Category.objects.annotate(
-        course_count=Count('courses')
-    ).values('name', 'course_count')
+    category_distribution = [
+        {'name': category.name, 'course_count': category.courses_count}
+        for category in get_categories()
+    ]
     
     # قائمة المستخدمين مع تحديد السوبر أدمن
     users = User.objects.all().order_by('-date_joined')[:10]  # آخر 10 مستخدمين فقط للأداء
@@ -807,7 +828,7 @@ def admin_dashboard(request):
         # بيانات الجداول
         'users': users,
         'courses': Course.objects.all().select_related('category', 'instructor')[:10],
-        'categories': Category.objects.annotate(courses_count=Count('courses'))[:10],
+        'categories': get_categories()[:10],
         'enrollments': Enrollment.objects.all().select_related('user', 'course')[:10],
         'reviews': Review.objects.all().select_related('user', 'course')[:10],
         
@@ -1093,7 +1114,7 @@ def admin_course_detail(request, course_id):
         'course': course,
         'modules': course.modules.prefetch_related('lessons').all(),
         'enrollments': course.enrollments.select_related('user'),
-        'reviews': course.reviews.select_related('user'),
+        'reviews': course.reviews.select_related('user')[:5],
         'total_students': total_students,
         'total_revenue': total_revenue,
         'total_lessons': total_lessons,
@@ -1111,7 +1132,6 @@ def admin_course_detail(request, course_id):
 def admin_course_create(request):
     """إنشاء دورة جديدة"""
     from .models import User, Course
-    from django.utils.text import slugify
     from django.db import IntegrityError
     
     # جلب قائمة المدربين للمشرفين
@@ -1154,24 +1174,8 @@ def admin_course_create(request):
                         'instructors': instructors,
                     })
                 
-                # إنشاء slug فريد
-                base_slug = slugify(course.title)
-                if not base_slug:
-                    base_slug = "course"
-                
-                slug = base_slug
-                counter = 1
-                
-                # التأكد من عدم وجود slug مكرر
-                while Course.objects.filter(slug=slug).exists():
-                    slug = f"{base_slug}-{counter}"
-                    counter += 1
-                    # منع الحلقات اللانهائية
-                    if counter > 100:
-                        slug = f"{base_slug}-{course.id if course.id else 'new'}"
-                        break
-                
-                course.slug = slug
+                # الـ slug الفريد يُولّد في Course.save (core/slugs.py)
+                course.slug = ''
                 
                 # حفظ الدورة
                 course.save()
@@ -1215,7 +1219,6 @@ def admin_course_create(request):
 def admin_course_edit(request, course_id):
     """تعديل دورة"""
     from .models import User, Course
-    from django.utils.text import slugify
     
     course = get_object_or_404(Course, id=course_id)
     
@@ -1233,19 +1236,9 @@ def admin_course_edit(request, course_id):
             try:
                 edited_course = form.save(commit=False)
                 
-                # تحديث slug إذا تغير العنوان
-                if edited_course.title != course.title:
-                    base_slug = slugify(edited_course.title)
-                    if base_slug:
-                        slug = base_slug
-                        counter = 1
-                        
-                        from .models import Course
-                        while Course.objects.filter(slug=slug).exclude(id=course_id).exists():
-                            slug = f"{base_slug}-{counter}"
-                            counter += 1
-                        
-                        edited_course.slug = slug
+                # تحديث slug إذا تغير العنوان (يُعاد توليده في Course.save)
+                if 'title' in form.changed_data:
+                    edited_course.slug = ''
                 
                 # تحديث المدرب (للمشرفين فقط)
                 if request.user.is_admin_user():
@@ -1491,7 +1484,6 @@ def admin_categories(request):
 @staff_member_required
 def admin_category_create(request):
     """إنشاء تصنيف جديد"""
-    from django.utils.text import slugify
     from .models import Category
     import os
     
@@ -1510,15 +1502,7 @@ def admin_category_create(request):
                 # فقط استخدم form.save() مباشرة
                 category = form.save(commit=False)
                 
-                # التأكد من وجود slug
-                if not category.slug:
-                    base_slug = slugify(category.name)
-                    slug = base_slug
-                    counter = 1
-                    while Category.objects.filter(slug=slug).exists():
-                        slug = f"{base_slug}-{counter}"
-                        counter += 1
-                    category.slug = slug
+                # الـ slug الفريد يُولّد في Category.save (core/slugs.py)
                 
                 # حفظ الصورة إذا وجدت
                 if 'img_gat' in request.FILES:
@@ -1557,7 +1541,6 @@ def admin_category_create(request):
 @staff_member_required
 def admin_category_edit(request, category_id):
     """تعديل تصنيف"""
-    from django.utils.text import slugify
     from .models import Category
     import os
     
@@ -1574,15 +1557,9 @@ def admin_category_edit(request, category_id):
                 # تحديث البيانات بدون حفظ الصورة
                 edited_category = form.save(commit=False)
                 
-                # تحديث slug إذا تغير الاسم
-                if edited_category.name != category.name:
-                    base_slug = slugify(edited_category.name)
-                    slug = base_slug
-                    counter = 1
-                    while Category.objects.filter(slug=slug).exclude(id=category_id).exists():
-                        slug = f"{base_slug}-{counter}"
-                        counter += 1
-                    edited_category.slug = slug
+                # تحديث slug إذا تغير الاسم (يُعاد توليده في Category.save)
+                if 'name' in form.changed_data:
+                    edited_category.slug = ''
                 
                 # التعامل مع الصورة الجديدة
                 if 'img_gat' in request.FILES:
@@ -1817,54 +1794,7 @@ def admin_review_delete(request, review_id):
 # ==================== AJAX Helpers ====================
 
 @login_required
-def ajax_get_dashboard_stats(request):
-    """API للحصول على إحصائيات لوحة التحكم"""
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.db.models import Count, Sum, Avg
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Get date range
-        days = int(request.GET.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
-        
-        stats = {
-            'users': {
-                'total': User.objects.count(),
-                'new': User.objects.filter(date_joined__gte=start_date).count(),
-                'students': User.objects.filter(role='user').count(),
-                'instructors': User.objects.filter(role='instructor').count(),
-                'admins': User.objects.filter(role='admin').count(),
-            },
-            'courses': {
-                'total': Course.objects.count(),
-                'active': Course.objects.filter(is_active=True).count(),
-                'featured': Course.objects.filter(is_featured=True).count(),
-                'new': Course.objects.filter(created_at__gte=start_date).count(),
-            },
-            'enrollments': {
-                'total': Enrollment.objects.count(),
-                'pending': Enrollment.objects.filter(status='pending').count(),
-                'enrolled': Enrollment.objects.filter(status='enrolled').count(),
-                'completed': Enrollment.objects.filter(status='completed').count(),
-                'new': Enrollment.objects.filter(enrolled_at__gte=start_date).count(),
-            },
-            'reviews': {
-                'total': Review.objects.count(),
-                'avg_rating': Review.objects.aggregate(avg=Avg('rating'))['avg'] or 0,
-                'new': Review.objects.filter(created_at__gte=start_date).count(),
-            },
-            'revenue': {
-                'total': Enrollment.objects.filter(status='enrolled').aggregate(total=Sum('course__price'))['total'] or 0,
-                'period': Enrollment.objects.filter(status='enrolled', enrolled_at__gte=start_date).aggregate(total=Sum('course__price'))['total'] or 0,
-            }
-        }
-        
-        return JsonResponse(stats)
-    
-    return JsonResponse({'error': 'Invalid request'}, status=400)
-
-@login_required
+@use_replica
 def ajax_get_chart_data(request):
     """API للحصول على بيانات الرسوم البيانية"""
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1939,48 +1869,6 @@ def ajax_get_chart_data(request):
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
-@login_required
-def ajax_get_recent_activities(request):
-    """API للحصول على أحدث الأنشطة"""
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        activities = []
-        
-        # Recent enrollments
-        enrollments = Enrollment.objects.select_related('user', 'course').order_by('-enrolled_at')[:5]
-        for enrollment in enrollments:
-            activities.append({
-                'type': 'enrollment',
-                'user': enrollment.user.get_full_name() or enrollment.user.username,
-                'course': enrollment.course.title,
-                'time': enrollment.enrolled_at.isoformat(),
-                'time_ago': timesince(enrollment.enrolled_at),
-                'icon': 'user-plus',
-                'color': 'green'
-            })
-        
-        # Recent reviews
-        reviews = Review.objects.select_related('user', 'course').order_by('-created_at')[:5]
-        for review in reviews:
-            activities.append({
-                'type': 'review',
-                'user': review.user.get_full_name() or review.user.username,
-                'course': review.course.title,
-                'rating': review.rating,
-                'time': review.created_at.isoformat(),
-                'time_ago': timesince(review.created_at),
-                'icon': 'star',
-                'color': 'yellow'
-            })
-        
-        # Sort by time
-        activities.sort(key=lambda x: x['time'], reverse=True)
-        
-        return JsonResponse({
-            'activities': activities[:10]
-        })
-    
-    return JsonResponse({'error': 'Invalid request'}, status=400)
-
 
 # ==================== Reports & Exports ====================
 
@@ -2145,6 +2033,7 @@ def ajax_get_recent_activities(request):
 
 
 @staff_member_required
+@use_replica
 def admin_reports(request):
     """صفحة التقارير والإحصائيات المتقدمة"""
     from django.db.models import Count, Sum, Avg, Q  # ✅ تأكد من استيراد Sum هنا
@@ -2308,6 +2197,7 @@ def admin_reports(request):
 
 
 @staff_member_required
+@use_replica
 def admin_export_users(request):
     """تصدير المستخدمين إلى CSV"""
     response = HttpResponse(content_type='text/csv')
@@ -2323,6 +2213,7 @@ def admin_export_users(request):
     return response
 
 @staff_member_required
+@use_replica
 def admin_export_courses(request):
     """تصدير الدورات إلى CSV"""
     response = HttpResponse(content_type='text/csv')
@@ -2341,6 +2232,7 @@ def admin_export_courses(request):
     return response
 
 @staff_member_required
+@use_replica
 def admin_export_enrollments(request):
     """تصدير التسجيلات إلى CSV"""
     response = HttpResponse(content_type='text/csv')
@@ -2357,72 +2249,6 @@ def admin_export_enrollments(request):
     
     return response
 
-# ==================== API-like Views (AJAX) ====================
-
-@login_required
-def ajax_toggle_favorite(request):
-    """API لتبديل حالة المفضلة"""
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        course_id = request.POST.get('course_id')
-        course = get_object_or_404(Course, id=course_id)
-        
-        is_favorite = FavoriteService.toggle_favorite(request.user, course)
-        
-        return JsonResponse({
-            'status': 'success',
-            'is_favorite': is_favorite,
-            'message': 'تمت الإضافة إلى المفضلة' if is_favorite else 'تمت الإزالة من المفضلة'
-        })
-    
-    return JsonResponse({'status': 'error', 'message': 'Invalid request'}, status=400)
-
-@login_required
-def ajax_update_lesson_progress(request):
-    """API لتحديث تقدم الدرس"""
-    if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        lesson_id = request.POST.get('lesson_id')
-        position = request.POST.get('position', 0)
-        
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        enrollment = Enrollment.objects.filter(
-            user=request.user,
-            course=lesson.module.course,
-            status='enrolled'
-        ).first()
-        
-        if enrollment:
-            progress, created = LessonProgress.objects.get_or_create(
-                enrollment=enrollment,
-                lesson=lesson
-            )
-            progress.last_watched_position = position
-            progress.save()
-            
-            return JsonResponse({
-                'status': 'success',
-                'position': position
-            })
-    
-    return JsonResponse({'status': 'error'}, status=400)
-
-@login_required
-def ajax_get_course_stats(request, course_id):
-    """API للحصول على إحصائيات الدورة"""
-    course = get_object_or_404(Course, id=course_id)
-    
-    stats = {
-        'total_students': course.enrollments.filter(status='enrolled').count(),
-        'total_reviews': course.reviews.count(),
-        'avg_rating': float(course.rating),
-        'total_lessons': Lesson.objects.filter(module__course=course).count(),
-        'total_modules': course.modules.count(),
-    }
-    
-    return JsonResponse(stats)
-
-
-
-
 # ==================== User Actions ====================
 
 @login_required
@@ -2690,13 +2516,13 @@ def remove_from_cart(request, course_id):
 def cart_view(request):
     """عرض محتويات السلة"""
     cart_ids = request.session.get('cart', [])
-    cart_courses = Course.objects.filter(id__in=cart_ids, is_active=True)
+    cart_courses = list(Course.objects.with_effective_price().filter(id__in=cart_ids, is_active=True))
     
     # التحقق من وجود دورات مجانية في السلة
-    free_courses_in_cart = cart_courses.filter(price=0).exists()
+    free_courses_in_cart = any(course.price == 0 for course in cart_courses)
     
-    # حساب الإجمالي (دورات مدفوعة فقط)
-    total = sum(course.price for course in cart_courses)
+    # حساب الإجمالي بالسعر بعد الخصم
+    total = sum(course.effective_price for course in cart_courses)
     
     context = {
         'cart_courses': cart_courses,
@@ -2721,9 +2547,10 @@ def update_cart_quantity(request):
         
         request.session['cart'] = cart
         
-        # حساب الإجمالي الجديد
-        cart_courses = Course.objects.filter(id__in=cart)
-        total = sum(course.price for course in cart_courses)
+        # حساب الإجمالي الجديد بالسعر بعد الخصم
+        total = Course.objects.with_effective_price().filter(id__in=cart).aggregate(
+            total=Sum('effective_price')
+        )['total'] or 0
         
         return JsonResponse({
             'status': 'success',
@@ -2740,14 +2567,6 @@ def clear_cart(request):
     return redirect('courses:cart_view')
 
 
-def cart_count(request):
-    """إرجاع عدد العناصر في السلة (لطلبات AJAX)"""
-    cart = request.session.get('cart', [])
-    return JsonResponse({
-        'count': len(cart),
-        'status': 'success'
-    })
-    
 
 # ==================== طلبات الشراء ====================
 @staff_member_required
@@ -2876,8 +2695,9 @@ def submit_order(request):
             
             cart_courses = Course.objects.filter(id__in=cart_ids, is_active=True)
         
-        # حساب الإجمالي
-        total = sum(course.price for course in cart_courses)
+        # حساب الإجمالي بالسعر بعد الخصم (نفس لحظة التسعير لكل العناصر)
+        cart_courses = list(cart_courses.with_effective_price())
+        total = sum(course.effective_price for course in cart_courses)
         
         # اسم المستخدم
         user_name = request.user.get_full_name() or request.user.username
@@ -2898,11 +2718,11 @@ def submit_order(request):
             OrderItem.objects.create(
                 order=order,
                 course=course,
-                price=course.price
+                price=course.effective_price
             )
         
         # إنشاء رسالة واتساب
-        course_list = "\n".join([f"• {course.title} - {course.price} ج.م" for course in cart_courses])
+        course_list = "\n".join([f"• {course.title} - {course.effective_price} ج.م" for course in cart_courses])
         
         message = f"""🔔 *طلب شراء جديد* 🔔
 
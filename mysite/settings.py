@@ -83,15 +83,24 @@ SITE_ID = 1
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.instrumentation.QueryInstrumentationMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware', 
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db_router.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# عمال ASGI (خدمة mysite-async) لا تخدم ملفات static، و WhiteNoise يدعم sync فقط
+# فيحول وجوده كل السلسلة إلى sync. بقية الـ middleware تدعم sync و async.
+ASGI_WORKER = config('ASGI_WORKER', default=False, cast=bool)
+if ASGI_WORKER:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 
 
 
@@ -128,6 +137,7 @@ TEMPLATES = [
                 'core.context_processors.cart_info',
                 'core.context_processors.current_year',
                 'core.context_processors.is_mobile',
+                'core.context_processors.site_content_version',
                 
                 'notifications.context_processors.notifications_processor',
 
@@ -149,6 +159,12 @@ if LOCAL := config('LOCAL', default=True, cast=bool):
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # للتجربة محلياً: نسخة من db.sqlite3 تعمل كـ replica
+    if config('REPLICA_SQLITE_NAME', default=''):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / config('REPLICA_SQLITE_NAME'),
+        }
 else:
     DATABASES = {
         'default': {
@@ -160,10 +176,108 @@ else:
             'PORT': config('DB_PORT', cast=int),
         }
     }
-    
-    
-    
-    
+    if config('REPLICA_DB_HOST', default=''):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': config('REPLICA_DB_NAME', default=DATABASES['default']['NAME']),
+            'USER': config('REPLICA_DB_USER', default=DATABASES['default']['USER']),
+            'PASSWORD': config('REPLICA_DB_PASSWORD', default=DATABASES['default']['PASSWORD']),
+            'HOST': config('REPLICA_DB_HOST'),
+            'PORT': config('REPLICA_DB_PORT', default=DATABASES['default']['PORT'], cast=int),
+        }
+
+# قراءات التقارير (@use_replica) تذهب إلى 'replica' إذا كان معرّفاً
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
+
+# =========================
+# CACHE
+# =========================
+# locmem خاص بكل عملية ويصلح للتطوير فقط. في الإنتاج (أكثر من عامل gunicorn)
+# يجب استخدام كاش مشترك حتى يصل إبطال الصفحات والفهارس لكل العمال؛
+# docker-compose.yml يضبط:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://mysite-redis:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='online-course-platform'),
+        'TIMEOUT': 300,
+    }
+}
+
+# مدة تخزين الصفحات العامة للزوار (core/page_cache.py)
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=300, cast=int)
+
+# مدة إعدادات الموقع وأجزاء الرأس والتذييل في الكاش (core/models.py, base.html).
+# التعديل يغير إصدار المحتوى فوراً مع كاش مشترك؛ مع locmem تصل بقية العمال
+# بعد هذه المدة على الأكثر
+SITE_CONTENT_CACHE_TIMEOUT = config('SITE_CONTENT_CACHE_TIMEOUT', default=300, cast=int)
+
+# إعادة حساب إحصائيات المنصة من قاعدة البيانات (courses/platform_stats.py)
+PLATFORM_STATS_RECONCILE_INTERVAL = config('PLATFORM_STATS_RECONCILE_INTERVAL', default=3600, cast=int)
+# مع كاش خاص بكل عملية (locmem) لا تُستخدم العدادات وتُعاد القراءة بعد هذه المدة
+PLATFORM_STATS_LOCAL_TIMEOUT = config('PLATFORM_STATS_LOCAL_TIMEOUT', default=60, cast=int)
+
+# أقصى مدة لفهرس التصنيفات في الكاش (courses/category_index.py)؛ الإبطال
+# يتم عند الحفظ وهذه المدة شبكة أمان فقط
+CATEGORY_INDEX_TIMEOUT = config('CATEGORY_INDEX_TIMEOUT', default=600, cast=int)
+
+# أقصى عمر لفهرس البحث الفوري في ذاكرة كل عامل (courses/typeahead.py)
+TYPEAHEAD_INDEX_MAX_AGE = config('TYPEAHEAD_INDEX_MAX_AGE', default=300, cast=int)
+
+# أقصى عمر لفهرس البحث في دروس كل دورة في ذاكرة كل عامل (courses/lesson_search.py)
+LESSON_SEARCH_INDEX_MAX_AGE = config('LESSON_SEARCH_INDEX_MAX_AGE', default=300, cast=int)
+
+# مدة صلاحية رفوف الدورات قبل إعادة بنائها (courses/shelves.py)
+SHELF_REFRESH_INTERVAL = config('SHELF_REFRESH_INTERVAL', default=900, cast=int)
+
+# مدة تخزين أعداد أوجه الكتالوج لكل مجموعة فلاتر (courses/facets.py)
+FACETS_CACHE_TIMEOUT = config('FACETS_CACHE_TIMEOUT', default=300, cast=int)
+
+# مدة تخزين الجزء العام من صفحة تفاصيل الدورة (courses/course_page.py)
+COURSE_PAGE_CACHE_TIMEOUT = config('COURSE_PAGE_CACHE_TIMEOUT', default=300, cast=int)
+
+# أقصى مدة لتوزيع نجوم تقييمات الدورة في الكاش (courses/review_feed.py)؛
+# الإبطال يتم عند حفظ/حذف تقييم وهذه المدة شبكة أمان فقط
+REVIEW_HISTOGRAM_TIMEOUT = config('REVIEW_HISTOGRAM_TIMEOUT', default=600, cast=int)
+
+
+# =========================
+# QUERY INSTRUMENTATION
+# =========================
+# عدد الاستعلامات وزمنها واكتشاف N+1 لكل طلب (core/instrumentation.py)
+QUERY_INSTRUMENTATION = config('QUERY_INSTRUMENTATION', default=DEBUG, cast=bool)
+N_PLUS_ONE_THRESHOLD = config('N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+
+# سجل الاستعلامات البطيئة في الإنتاج (core/slow_queries.py)
+# يُحفظ في جدول SlowQuery أو في ملف JSONL إذا تم ضبط SLOW_QUERY_LOG_FILE
+# (صفحة core:admin_slow_queries تقرأ ملف الخادم الحالي فقط). معطل افتراضياً
+SLOW_QUERY_LOG = config('SLOW_QUERY_LOG', default=False, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=int)
+SLOW_QUERY_SAMPLE_RATE = config('SLOW_QUERY_SAMPLE_RATE', default=1.0, cast=float)
+SLOW_QUERY_FLUSH_INTERVAL = config('SLOW_QUERY_FLUSH_INTERVAL', default=60, cast=int)
+SLOW_QUERY_LOG_FILE = config('SLOW_QUERY_LOG_FILE', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['console'],
+            'level': config('QUERY_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -233,6 +347,18 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# فيديوهات الدروس تُقدّم عبر view محمي (courses/streaming.py)
+# عند ضبط البادئة يتم تسليم البث لـ nginx عبر X-Accel-Redirect، مثال:
+#   location /protected-media/ { internal; alias /usr/src/app/media/; }
+PROTECTED_MEDIA_ACCEL_PREFIX = config('PROTECTED_MEDIA_ACCEL_PREFIX', default='')
+
+# تحويل فيديوهات الدروس إلى HLS (courses/video.py)
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+# مهمة "قيد المعالجة" أقدم من هذه المدة (ثوانٍ) تعتبر متوقفة (توقف العامل) ويُعاد حجزها
+VIDEO_JOB_TIMEOUT = config('VIDEO_JOB_TIMEOUT', default=2 * 60 * 60, cast=int)
+VIDEO_JOB_MAX_ATTEMPTS = config('VIDEO_JOB_MAX_ATTEMPTS', default=3, cast=int)
+
 # إعدادات crispy forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
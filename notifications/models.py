@@ -76,6 +76,11 @@ class Notification(models.Model):
     def get_unread_count(cls, user):
         """الحصول على عدد الإشعارات غير المقروءة"""
         return cls.objects.filter(user=user, is_read=False).count()
+
+    @classmethod
+    async def aget_unread_count(cls, user):
+        """نسخة async من get_unread_count"""
+        return await cls.objects.filter(user=user, is_read=False).acount()
     
     @classmethod
     def mark_all_as_read(cls, user):
@@ -68,12 +68,12 @@ def notifications_view(request):
 
 
 @login_required
-def notifications_count(request):
-    """API للحصول على عدد الإشعارات غير المقروءة"""
+async def notifications_count(request):
+    """API للحصول على عدد الإشعارات غير المقروءة (async للـ polling)"""
     from .models import Notification
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        unread_count = Notification.get_unread_count(request.user)
+        unread_count = await Notification.aget_unread_count(await request.auser())
         return JsonResponse({
             'status': 'success',
             'unread_count': unread_count